@@ -0,0 +1,574 @@
+from CellState import *
+from Cell import *
+from SegmentIndex import SegmentIndex
+import utils
+
+# Which packed int a trail entry restores
+TRAIL_BULBS = 0
+TRAIL_LIT = 1
+TRAIL_DOMAIN = 2
+TRAIL_UNASSIGNED = 3
+TRAIL_PLACE = 4     # a bulb was placed on this cell: undo its counter updates
+TRAIL_HASH = 5
+
+
+class BitboardState:
+    """
+    Compact search state of a puzzle.
+    Cell [row, col] maps to bit (row * cols + col), and the bulbs, lit cells, walls and
+    "bulb still in domain" flags are each kept as one packed integer.
+    Copying a state for a new branch therefore only copies a handful of ints; the wall layout
+    (wall values, wall neighbours, lines of sight) lives in a SegmentIndex shared between copies.
+
+    A state can also be searched in place: after enable_trail(), every change made by set_cell_value
+    and domain_change pushes the old value onto an undo trail, and undo_to(mark) rolls back to a mark.
+
+    Running counters make the goal and validity tests O(1): bulbs next to each wall, how many times each
+    cell is lit, open cells left unlit, walls not yet at their value, walls over their value, and segments
+    holding more than one bulb. They are updated when a bulb is placed or removed. Set check_counters to
+    True to cross-check every test against the full-scan functions of utils.
+
+    After enable_reasons(), the state also records why each cell got its bulb or lost Bulb from its domain,
+    as a bitmask of decision levels (bit L set for the decision made at depth L of the search, 0 for what
+    follows from the puzzle alone). When propagate finds a dead end, conflict holds the decision levels
+    that caused it, -1 meaning "all of them".
+
+    After enable_hash(), zobrist is a 64-bit Zobrist hash of the bulbs and of the cells that lost Bulb from
+    their domain (which is all a node's subtree depends on), updated with each change and kept on the trail.
+
+    After enable_stats(stats), calls to propagate and domain_change are counted in a SearchStats.
+    """
+
+    __slots__ = ('index', 'rows', 'cols', 'walls', 'open_cells', 'wall_cells', 'sight',
+                 'bulbs', 'lit', 'domain', 'unassigned', 'trail',
+                 'wall_bulbs', 'illumination', 'segment_bulbs',
+                 'unlit_count', 'unsatisfied_walls', 'overfull_walls', 'crowded_segments', 'reasons', 'conflict',
+                 'zobrist', 'stats', 'context')
+
+    check_counters = False
+
+    def __init__(self, puzzle, empty_cells=None, index=None):
+        """
+        Build the state from a (possibly pre-processed) puzzle
+        :param puzzle: List[List[Cell]] - The puzzle, or None for the blank puzzle described by the index
+        :param empty_cells: List[List[int]] - positions of the cells still to assign, all open non-bulb cells if None
+        :param index: SegmentIndex - line-of-sight index of the puzzle, built here if None
+        """
+        if index is None:
+            index = SegmentIndex(puzzle)
+        rows, cols = index.rows, index.cols
+        self.index = index
+        self.rows = rows
+        self.cols = cols
+        self.walls = index.walls
+        self.open_cells = index.open_cells
+        self.wall_cells = index.wall_cells
+        self.sight = index.sight
+
+        self.wall_bulbs = bytearray(len(index.wall_cells))
+        self.illumination = bytearray(rows * cols)
+        self.segment_bulbs = bytearray(len(index.segment_cells))
+        self.unlit_count = self.open_cells.bit_count()
+        self.unsatisfied_walls = sum(1 for wall_value in index.wall_values if wall_value != 0)
+        self.overfull_walls = 0
+        self.crowded_segments = 0
+
+        self.bulbs = 0
+        self.lit = 0
+        self.domain = 0
+        if puzzle is None:
+            self.domain = self.open_cells
+        for row in range(rows if puzzle is not None else 0):
+            for col in range(cols):
+                cell = puzzle[row][col]
+                if not cell.is_wall():
+                    if cell.is_bulb():
+                        self.bulbs |= 1 << (row * cols + col)
+                        self.lit |= (1 << (row * cols + col)) | self.sight[row * cols + col]
+                        self.count_bulb(row * cols + col, 1)
+                    if cell.domain_contain(CellState.BULB):
+                        self.domain |= 1 << (row * cols + col)
+
+        if empty_cells is None:
+            self.unassigned = self.open_cells & ~self.bulbs
+        else:
+            self.unassigned = 0
+            for row, col in empty_cells:
+                self.unassigned |= 1 << (row * cols + col)
+        self.trail = None
+        self.reasons = None
+        self.conflict = -1
+        self.zobrist = None
+        self.stats = None
+        self.context = None
+
+    def copy(self):
+        """
+        Return a new state sharing the wall layout, with its own bulbs, lit cells and domains
+        :return: BitboardState
+        """
+        new_state = BitboardState.__new__(BitboardState)
+        for slot in BitboardState.__slots__:
+            setattr(new_state, slot, getattr(self, slot))
+        new_state.trail = None
+        new_state.wall_bulbs = self.wall_bulbs[:]
+        new_state.illumination = self.illumination[:]
+        new_state.segment_bulbs = self.segment_bulbs[:]
+        if self.reasons is not None:
+            new_state.reasons = self.reasons[:]
+        return new_state
+
+    def count_bulb(self, position, step):
+        """
+        Update the running counters for a bulb placed on (step = 1) or removed from (step = -1) a cell
+        :param position: int - flat index of the cell
+        :param step: int - 1 or -1
+        """
+        index = self.index
+        wall_bulbs = self.wall_bulbs
+        wall_values = index.wall_values
+        for wall_id in index.walls_around[position]:
+            before = wall_bulbs[wall_id]
+            after = before + step
+            wall_bulbs[wall_id] = after
+            if before == wall_values[wall_id]:
+                self.unsatisfied_walls += 1
+            elif after == wall_values[wall_id]:
+                self.unsatisfied_walls -= 1
+            # a wall is overfull while its count is above its value: count the crossings of that line only
+            if before <= wall_values[wall_id] < after:
+                self.overfull_walls += 1
+            elif after <= wall_values[wall_id] < before:
+                self.overfull_walls -= 1
+
+        segment_bulbs = self.segment_bulbs
+        illumination = self.illumination
+        for segment_id in (index.row_segment[position], index.col_segment[position]):
+            segment_bulbs[segment_id] += step
+            if step > 0 and segment_bulbs[segment_id] == 2:
+                self.crowded_segments += 1
+            elif step < 0 and segment_bulbs[segment_id] == 1:
+                self.crowded_segments -= 1
+
+            # The cell itself is in both segments, light it only once
+            for other in index.segment_cells[segment_id]:
+                if other == position and segment_id == index.col_segment[position]:
+                    continue
+                if step > 0:
+                    illumination[other] += 1
+                    if illumination[other] == 1:
+                        self.unlit_count -= 1
+                else:
+                    illumination[other] -= 1
+                    if illumination[other] == 0:
+                        self.unlit_count += 1
+
+    def enable_trail(self):
+        """
+        Record every following change on an undo trail, so the state can be searched in place
+        """
+        self.trail = []
+
+    def enable_reasons(self):
+        """
+        Record, from now on, the decision levels behind every bulb and every domain reduction
+        Reasons need no undo: a cell's reason is only read while its bulb or domain reduction is in place,
+        and it is written again whenever that happens anew.
+        """
+        self.reasons = [0] * (self.rows * self.cols)
+
+    def enable_hash(self):
+        """
+        Start keeping the Zobrist hash of the state, from the keys of its SegmentIndex
+        """
+        self.zobrist = self.compute_hash()
+
+    def enable_stats(self, stats):
+        """
+        Count the calls to propagate and domain_change in stats, and let the search functions fill in the rest
+        :param stats: SearchStats
+        """
+        self.stats = stats
+
+    def enable_search(self, context):
+        """
+        Give the state the SearchContext of the search running on it, where the search keeps what it learns
+        :param context: SearchContext
+        """
+        self.context = context
+
+    def compute_hash(self):
+        """
+        :return: int - the Zobrist hash of the state, computed from scratch
+        """
+        bulb_keys, removed_keys = self.index.zobrist_keys()
+        zobrist = 0
+        for position in range(self.rows * self.cols):
+            if (self.bulbs >> position) & 1:
+                zobrist ^= bulb_keys[position]
+            if (self.open_cells & ~self.domain) >> position & 1:
+                zobrist ^= removed_keys[position]
+        return zobrist
+
+    def reason_of(self, mask):
+        """
+        :param mask: int - cells holding a bulb or having lost Bulb from their domain
+        :return: int - the decision levels behind all of them, -1 if reasons are not recorded
+        """
+        reasons = self.reasons
+        if reasons is None:
+            return -1
+        reason = 0
+        while mask:
+            low = mask & -mask
+            reason |= reasons[low.bit_length() - 1]
+            mask ^= low
+        return reason
+
+    def mark(self):
+        """
+        :return: int - a position on the trail to undo back to
+        """
+        return len(self.trail)
+
+    def undo_to(self, mark):
+        """
+        Pop the trail back to the given mark, restoring each packed int it recorded
+        :param mark: int - a value returned by mark()
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            old_value = trail.pop()
+            slot = trail.pop()
+            if slot == TRAIL_DOMAIN:
+                self.domain = old_value
+            elif slot == TRAIL_UNASSIGNED:
+                self.unassigned = old_value
+            elif slot == TRAIL_BULBS:
+                self.bulbs = old_value
+            elif slot == TRAIL_PLACE:
+                self.count_bulb(old_value, -1)
+            elif slot == TRAIL_HASH:
+                self.zobrist = old_value
+            else:
+                self.lit = old_value
+
+    def is_wall(self, row, col):
+        return (self.walls >> (row * self.cols + col)) & 1 == 1
+
+    def is_bulb(self, row, col):
+        return (self.bulbs >> (row * self.cols + col)) & 1 == 1
+
+    def domain_contain(self, row, col, value):
+        if value == CellState.BULB:
+            return (self.domain >> (row * self.cols + col)) & 1 == 1
+        return value == CellState.EMPTY and not self.is_wall(row, col)
+
+    def get_cell_domain(self, row, col):
+        """
+        Domain of an open cell, in the same order as Cell.get_cell_domain
+        :return: List[str]
+        """
+        if self.is_wall(row, col):
+            return [CellState.WALL]
+        if self.domain_contain(row, col, CellState.BULB):
+            return [CellState.BULB, CellState.EMPTY]
+        return [CellState.EMPTY]
+
+    def set_cell_value(self, row, col, value, reason=0):
+        """
+        Assign BULB or EMPTY to an open cell.
+        A cell set to EMPTY also gives up BULB, so it no longer counts as a free spot for its walls.
+        :param reason: int - the decision levels behind this value, kept if reasons are recorded
+        """
+        bit = 1 << (row * self.cols + col)
+        if self.reasons is not None:
+            self.reasons[row * self.cols + col] = reason
+        trail = self.trail
+        if trail is not None:
+            trail.append(TRAIL_UNASSIGNED)
+            trail.append(self.unassigned)
+        self.unassigned &= ~bit
+
+        if self.zobrist is not None:
+            if trail is not None:
+                trail.append(TRAIL_HASH)
+                trail.append(self.zobrist)
+            if value == CellState.BULB:
+                self.zobrist ^= self.index.bulb_keys[row * self.cols + col]
+            elif self.domain & bit:
+                self.zobrist ^= self.index.removed_keys[row * self.cols + col]
+
+        if value == CellState.BULB:
+            if trail is not None:
+                trail.append(TRAIL_BULBS)
+                trail.append(self.bulbs)
+                trail.append(TRAIL_LIT)
+                trail.append(self.lit)
+                trail.append(TRAIL_PLACE)
+                trail.append(row * self.cols + col)
+            self.bulbs |= bit
+            self.lit |= bit | self.sight[row * self.cols + col]
+            self.count_bulb(row * self.cols + col, 1)
+        elif value == CellState.EMPTY:
+            if trail is not None:
+                trail.append(TRAIL_DOMAIN)
+                trail.append(self.domain)
+            self.domain &= ~bit
+
+    def domain_change(self, row, col, value):
+        """
+        If the new value of [row, col] is Bulb, take Bulb out of the domain of every cell it can "see"
+        If the new value is Empty, nothing to do
+        """
+        if self.stats is not None:
+            self.stats.domain_changes += 1
+        if value == CellState.BULB:
+            position = row * self.cols + col
+            if self.trail is not None:
+                self.trail.append(TRAIL_DOMAIN)
+                self.trail.append(self.domain)
+            if self.reasons is not None:
+                reasons = self.reasons
+                reason = reasons[position]
+                cleared = self.domain & self.sight[position]
+                while cleared:
+                    low = cleared & -cleared
+                    reasons[low.bit_length() - 1] = reason
+                    cleared ^= low
+            if self.zobrist is not None:
+                if self.trail is not None:
+                    self.trail.append(TRAIL_HASH)
+                    self.trail.append(self.zobrist)
+                removed_keys = self.index.removed_keys
+                zobrist = self.zobrist
+                cleared = self.domain & self.sight[position]
+                while cleared:
+                    low = cleared & -cleared
+                    zobrist ^= removed_keys[low.bit_length() - 1]
+                    cleared ^= low
+                self.zobrist = zobrist
+            self.domain &= ~self.sight[position]
+
+    def propagate(self, changed):
+        """
+        Draw every forced consequence of the last changes, until nothing more follows
+        Only what the changed cells can affect is looked at again: the walls next to them, and the unlit cells
+        of their row and column segments.
+        - a wall with its bulbs already around it gets Empty on its other free neighbours
+        - a wall with exactly as many free neighbours as bulbs still missing gets bulbs on all of them
+        - an unlit cell that only one cell (itself included) can still light gets a bulb on that cell
+        Every change goes through set_cell_value / domain_change, so it is on the trail if one is enabled, and
+        comes with its reason if reasons are recorded.
+        :param changed: int - mask of the cells whose value or domain just changed
+        :return: bool - False if a wall can no longer get its bulbs or an unlit cell can no longer be lit,
+                 the reason of the dead end then being in conflict
+        """
+        if self.stats is not None:
+            self.stats.propagations += 1
+        index = self.index
+        walls_around = index.walls_around
+        row_segment = index.row_segment
+        col_segment = index.col_segment
+        segment_masks = index.segment_masks
+        wall_cells = self.wall_cells
+        sight = self.sight
+        cols = self.cols
+        open_cells = self.open_cells
+
+        while changed:
+            wall_ids = set()
+            watched = 0
+            while changed:
+                low = changed & -changed
+                position = low.bit_length() - 1
+                wall_ids.update(walls_around[position])
+                if row_segment[position] >= 0:
+                    watched |= segment_masks[row_segment[position]] | segment_masks[col_segment[position]]
+                changed ^= low
+
+            for wall_id in wall_ids:
+                _, wall_value, neighbours = wall_cells[wall_id]
+                free = self.domain & neighbours & ~self.bulbs
+                missing = wall_value - self.wall_bulbs[wall_id]
+                free_count = free.bit_count()
+                if missing < 0:
+                    self.conflict = self.reason_of(neighbours & self.bulbs)
+                    return False
+                if free_count < missing:
+                    self.conflict = self.reason_of(neighbours & open_cells & ~self.domain)
+                    return False
+                if free and (missing == 0 or free_count == missing):
+                    # Saturated: its bulbs empty the rest; tight: the neighbours it lost force the rest
+                    if missing == 0:
+                        value = CellState.EMPTY
+                        reason = self.reason_of(neighbours & self.bulbs)
+                    else:
+                        value = CellState.BULB
+                        reason = self.reason_of(neighbours & open_cells & ~self.domain)
+                    before = self.domain
+                    while free:
+                        low = free & -free
+                        row, col = divmod(low.bit_length() - 1, cols)
+                        self.set_cell_value(row, col, value, reason)
+                        self.domain_change(row, col, value)
+                        free ^= low
+                    changed |= (before ^ self.domain) | (neighbours & self.bulbs)
+
+            unlit = watched & ~self.lit
+            while unlit:
+                low = unlit & -unlit
+                position = low.bit_length() - 1
+                unlit ^= low
+                if (self.lit >> position) & 1:     # lit by a bulb forced earlier in this loop
+                    continue
+                support = (sight[position] | low) & self.domain
+                if not support:
+                    self.conflict = self.reason_of(sight[position] | low)
+                    return False
+                if support & (support - 1) == 0:
+                    before = self.domain
+                    row, col = divmod(support.bit_length() - 1, cols)
+                    self.set_cell_value(row, col, CellState.BULB, self.reason_of((sight[position] | low) & ~support))
+                    self.domain_change(row, col, CellState.BULB)
+                    changed |= (before ^ self.domain) | support
+
+        return True
+
+    def components(self):
+        """
+        Split what is left to decide into independent parts
+        Two candidate cells (unassigned, Bulb still in domain) belong to the same part if they share a row or
+        column segment, are free neighbours of the same unsatisfied wall, or could both light the same unlit
+        cell. A decision in one part, and everything propagate draws from it, never reaches another part.
+        :return: List[(int, int, List[int])] - for each part, smallest first: its candidate cells, the unlit
+                 cells only it can light, and the positions in wall_cells of the unsatisfied walls around it
+        """
+        index = self.index
+        candidates = self.unassigned & self.domain
+        parent = {}
+
+        def find(position):
+            root = position
+            while parent[root] != root:
+                root = parent[root]
+            while parent[position] != root:
+                parent[position], position = root, parent[position]
+            return root
+
+        def join(mask):
+            if not mask:
+                return
+            first = find((mask & -mask).bit_length() - 1)
+            mask &= mask - 1
+            while mask:
+                low = mask & -mask
+                other = find(low.bit_length() - 1)
+                if other != first:
+                    parent[other] = first
+                mask ^= low
+
+        mask = candidates
+        while mask:
+            low = mask & -mask
+            parent[low.bit_length() - 1] = low.bit_length() - 1
+            mask ^= low
+
+        for segment_mask in index.segment_masks:
+            join(segment_mask & candidates)
+        for wall_id, (_, wall_value, neighbours) in enumerate(self.wall_cells):
+            if self.wall_bulbs[wall_id] < wall_value:
+                join(neighbours & candidates)
+        unlit = self.open_cells & ~self.lit
+        mask = unlit
+        while mask:
+            low = mask & -mask
+            join((self.sight[low.bit_length() - 1] | low) & candidates)
+            mask ^= low
+
+        parts = {}
+        for position in parent:
+            root = find(position)
+            parts[root] = parts.get(root, 0) | (1 << position)
+
+        components = []
+        for cells in parts.values():
+            part_unlit = 0
+            mask = unlit
+            while mask:
+                low = mask & -mask
+                if (self.sight[low.bit_length() - 1] | low) & cells:
+                    part_unlit |= low
+                mask ^= low
+            walls = [wall_id for wall_id, (_, wall_value, neighbours) in enumerate(self.wall_cells)
+                     if self.wall_bulbs[wall_id] < wall_value and neighbours & cells]
+            components.append((cells, part_unlit, walls))
+        components.sort(key=lambda component: component[0].bit_count())
+        return components
+
+    def no_empty_domain(self, empty_cells=None):
+        """
+        Check all empty cells' domain. Domains must have size > 0
+        Empty is never taken out of an open cell's domain, so this only fails on a cell that is not open
+        :param empty_cells: List[List[int]] - positions of empty cells, the unassigned cells of this state if None
+        :return: bool
+        """
+        if empty_cells is None:
+            return self.unassigned & ~self.open_cells == 0
+        for row, col in empty_cells:
+            if not (self.open_cells >> (row * self.cols + col)) & 1:
+                return False
+        return True
+
+    def check_wall_feasibility(self):
+        """
+        Return True if for each wall, the number of cells around it that could accept a bulb is >= wall value
+        :return: bool
+        """
+        domain = self.domain
+        for _, wall_value, neighbours in self.wall_cells:
+            if (domain & neighbours).bit_count() < wall_value:
+                return False
+        return True
+
+    def is_state_valid(self):
+        """
+        Check that no wall has more bulbs around it than its value, and that no 2 bulbs "see" each other
+        No 2 bulbs see each other exactly when no segment holds more than one bulb
+        :return: bool
+        """
+        valid = self.overfull_walls == 0 and self.crowded_segments == 0
+        if BitboardState.check_counters:
+            assert valid == utils.is_state_valid(self.to_cells(), self.index), 'validity counters are off'
+            assert self.zobrist is None or self.zobrist == self.compute_hash(), 'Zobrist hash is off'
+        return valid
+
+    def is_solved(self):
+        """
+        Every wall has exactly its value of bulbs around it, the bulbs are valid and every open cell is lit
+        :return: bool
+        """
+        solved = self.unlit_count == 0 and self.unsatisfied_walls == 0 and self.crowded_segments == 0
+        if BitboardState.check_counters:
+            assert solved == utils.is_solved(self.to_cells(), self.index), 'goal counters are off'
+            assert (self.unlit_count == 0) == (self.lit == self.open_cells), 'illumination counters are off'
+        return solved
+
+    def to_cells(self):
+        """
+        Turn this state back into a Cell grid, for printing
+        :return: List[List[Cell]]
+        """
+        cells = [[Cell(row, col, CellState.EMPTY) for col in range(self.cols)] for row in range(self.rows)]
+        for index, wall_value, _ in self.wall_cells:
+            cells[index // self.cols][index % self.cols] = Cell(index // self.cols, index % self.cols, str(wall_value))
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if self.is_wall(row, col):
+                    continue
+                if self.is_bulb(row, col):
+                    cells[row][col].set_cell_value(CellState.BULB)
+                if not self.domain_contain(row, col, CellState.BULB):
+                    cells[row][col].remove_bulb_from_domain()
+        return cells
+
@@ -0,0 +1,141 @@
+import heapq
+import random
+
+
+class CellQueue:
+    """
+    Bucketed priority queue of the candidate cells of a BitboardState (unassigned cells that can still take
+    a bulb), keyed by live, domain-aware scores:
+        + H1: how tight the unsatisfied walls next to the cell are (5 - spare free neighbours, for each),
+              plus its edge/corner score (most constrained)
+        + H2: how many unlit cells a bulb there would newly light (most constraining)
+        + H3: H1 first, then H2 to break ties (hybrid)
+    Each bucket is the bitboard of the cells with that score, and a max-heap holds each score whose bucket
+    is not empty (empty buckets are dropped lazily, when they reach the top).
+
+    The queue keeps a snapshot of the state it last scored. On each select(), it only rescores the cells
+    whose score can have moved since: cells that became or stopped being candidates, the neighbours of walls
+    whose neighbourhood changed, and the cells sharing a segment with a cell whose lighting changed. The
+    snapshot is diffed against the state as it is, so undoing the trail needs nothing from the queue.
+    """
+
+    def __init__(self, state, heuristic):
+        """
+        :param state: BitboardState - the state the queue follows
+        :param heuristic: String - "H1", "H2", or "H3"
+        """
+        self.state = state
+        self.heuristic = heuristic
+        self.index = state.index
+        self.scores = [-1] * (state.rows * state.cols)
+        self.buckets = {}
+        self.heap = []
+        self.in_heap = set()
+
+        self.candidates = 0
+        self.bulbs = state.bulbs
+        self.domain = state.domain
+        self.lit = state.lit
+        self.rescore(state, state.unassigned & state.domain)
+        self.candidates = state.unassigned & state.domain
+
+    def score(self, state, position):
+        index = self.index
+        if self.heuristic == 'H2':
+            return ((index.sight[position] | (1 << position)) & ~state.lit).bit_count()
+
+        tightness = index.edge_constraints[position]
+        for wall_id in index.walls_around[position]:
+            _, wall_value, neighbours = index.wall_cells[wall_id]
+            missing = wall_value - state.wall_bulbs[wall_id]
+            if missing > 0:
+                tightness += 5 - ((state.domain & neighbours & ~state.bulbs).bit_count() - missing)
+        if self.heuristic == 'H1':
+            return tightness
+        return tightness * (state.rows + state.cols) + (
+            (index.sight[position] | (1 << position)) & ~state.lit).bit_count()
+
+    def move(self, position, score):
+        """
+        Put a cell in the bucket of its new score, -1 to take it out of the queue
+        """
+        buckets = self.buckets
+        old_score = self.scores[position]
+        if old_score == score:
+            return
+        bit = 1 << position
+        if old_score >= 0:
+            buckets[old_score] ^= bit
+        if score >= 0:
+            if score not in self.in_heap:
+                self.in_heap.add(score)
+                heapq.heappush(self.heap, -score)
+            buckets[score] = buckets.get(score, 0) | bit
+        self.scores[position] = score
+
+    def rescore(self, state, cells):
+        """
+        :param cells: int - bitboard of the cells to rescore; those that are not candidates leave the queue
+        """
+        candidates = state.unassigned & state.domain
+        while cells:
+            low = cells & -cells
+            position = low.bit_length() - 1
+            cells ^= low
+            self.move(position, self.score(state, position) if candidates & low else -1)
+
+    def sync(self):
+        """
+        Bring the queue up to date with its state
+        """
+        state = self.state
+        index = self.index
+        candidates = state.unassigned & state.domain
+        touched = candidates ^ self.candidates
+
+        if self.heuristic != 'H2':
+            changed = (state.domain ^ self.domain) | (state.bulbs ^ self.bulbs)
+            walls_seen = set()
+            while changed:
+                low = changed & -changed
+                changed ^= low
+                for wall_id in index.walls_around[low.bit_length() - 1]:
+                    if wall_id not in walls_seen:
+                        walls_seen.add(wall_id)
+                        touched |= index.wall_cells[wall_id][2]
+
+        if self.heuristic != 'H1':
+            relit = state.lit ^ self.lit
+            while relit:
+                low = relit & -relit
+                position = low.bit_length() - 1
+                relit ^= low
+                touched |= (index.segment_masks[index.row_segment[position]]
+                            | index.segment_masks[index.col_segment[position]])
+
+        self.rescore(state, touched & (candidates | self.candidates))
+        self.candidates = candidates
+        self.bulbs = state.bulbs
+        self.domain = state.domain
+        self.lit = state.lit
+
+    def select(self, rng=random):
+        """
+        The best candidate, ties broken uniformly at random
+        :param rng: random.Random - source of the tie-breaks
+        :return: int - bit index of the cell, or -1 if there is no candidate
+        """
+        self.sync()
+        heap = self.heap
+        buckets = self.buckets
+        while heap:
+            bucket = buckets.get(-heap[0], 0)
+            if bucket:
+                break
+            self.in_heap.discard(-heapq.heappop(heap))
+        else:
+            return -1
+
+        for _ in range(rng.randrange(bucket.bit_count())):
+            bucket &= bucket - 1
+        return (bucket & -bucket).bit_length() - 1
@@ -0,0 +1,88 @@
+from CellState import *
+
+
+class NogoodStore:
+    """
+    Bounded store of learned nogoods for one puzzle.
+    A nogood is a set of bulbs that no solution holds all at once, kept as a bitboard of their positions.
+    Once the store is full, the half of it that pruned least is dropped (the oldest first among equals),
+    so nogoods that keep cutting branches stay and one-off ones make room.
+    """
+
+    def __init__(self, limit=500, max_size=12):
+        """
+        :param limit: int - number of nogoods kept at most
+        :param max_size: int - longer nogoods are not worth checking and are not learned
+        """
+        self.limit = limit
+        self.max_size = max_size
+        self.nogoods = []
+        self.hits = []
+        self.known = set()
+        self.learned = 0
+        self.pruned = 0
+        self.evicted = 0
+
+    def clear(self):
+        """
+        Forget everything, before moving on to another puzzle (nogoods only hold for the one they came from)
+        """
+        self.nogoods = []
+        self.hits = []
+        self.known = set()
+        self.learned = 0
+        self.pruned = 0
+        self.evicted = 0
+
+    def add(self, nogood):
+        """
+        :param nogood: int - bitboard of bulbs that cannot all be in a solution
+        """
+        if nogood in self.known or nogood.bit_count() > self.max_size:
+            return
+        if len(self.nogoods) >= self.limit:
+            self.reduce()
+        self.nogoods.append(nogood)
+        self.hits.append(0)
+        self.known.add(nogood)
+        self.learned += 1
+
+    def reduce(self):
+        """
+        Drop the half of the store that pruned least, and halve the hits of the rest so old hits fade
+        """
+        keep = sorted(range(len(self.nogoods)), key=lambda i: self.hits[i], reverse=True)[:self.limit // 2]
+        keep.sort()
+        self.evicted += len(self.nogoods) - len(keep)
+        self.nogoods = [self.nogoods[i] for i in keep]
+        self.hits = [self.hits[i] // 2 for i in keep]
+        self.known = set(self.nogoods)
+
+    def prune(self, state, new_bulbs):
+        """
+        Check the nogoods touched by the bulbs just placed
+        A nogood with all its bulbs placed kills the branch; one with all but one placed takes Bulb out of the
+        domain of the last cell, which is then set to Empty.
+        :param state: BitboardState - The current state of the puzzle, with its reasons recorded
+        :param new_bulbs: int - bitboard of the bulbs placed since the last check
+        :return: (bool, int) - False if a nogood is violated (its reason then in state.conflict), and the mask
+                 of the cells set to Empty
+        """
+        changed = 0
+        for i, nogood in enumerate(self.nogoods):
+            if not nogood & new_bulbs:
+                continue
+            rest = nogood & ~state.bulbs
+            if rest == 0:
+                self.hits[i] += 1
+                self.pruned += 1
+                state.conflict = state.reason_of(nogood)
+                return False, changed
+            if rest & (rest - 1) == 0 and state.domain & rest:
+                self.hits[i] += 1
+                self.pruned += 1
+                position = rest.bit_length() - 1
+                state.set_cell_value(position // state.cols, position % state.cols, CellState.EMPTY,
+                                     state.reason_of(nogood & ~rest))
+                changed |= rest
+        return True, changed
@@ -0,0 +1,61 @@
+import time
+
+
+class SearchBudget:
+    """
+    The limits of one search, and the number of nodes it has visited so far.
+    Each call to the solver gets its own (and its own SearchContext), so searches running side by side never share
+    a counter.
+    """
+
+    __slots__ = ('node_limit', 'deadline', 'cancel', 'progress', 'progress_every', 'nodes')
+
+    def __init__(self, node_limit=500000, deadline=None, cancel=None, progress=None, progress_every=10000):
+        """
+        :param node_limit: int - give up on reaching this many nodes, None for no limit
+        :param deadline: float - time.perf_counter() value after which the search gives up, None for no deadline
+        :param cancel: callable - cancellation token, polled every 1024 nodes: the search gives up once it
+                       returns True (e.g. the is_set of a threading.Event), None if the search cannot be cancelled
+        :param progress: callable - called with the node count every progress_every nodes (e.g.
+                         SearchBudget.print_progress), None to stay quiet
+        :param progress_every: int
+        """
+        self.node_limit = node_limit
+        self.deadline = deadline
+        self.cancel = cancel
+        self.progress = progress
+        self.progress_every = progress_every
+        self.nodes = 0
+
+    @classmethod
+    def within(cls, node_limit=500000, time_limit=None, cancel=None, progress=None):
+        """
+        :param time_limit: float - seconds the search may take from now, None for no deadline
+        :return: SearchBudget
+        """
+        return cls(node_limit, time.perf_counter() + time_limit if time_limit else None, cancel, progress)
+
+    @staticmethod
+    def print_progress(nodes):
+        print('\rAlready processed {} nodes.'.format(nodes))
+
+    def spend(self):
+        """
+        Count one more node
+        :return: Str - the message the search gives up with if the budget is spent, None otherwise
+        """
+        self.nodes += 1
+        nodes = self.nodes
+
+        if self.progress is not None and nodes % self.progress_every == 0:
+            self.progress(nodes)
+
+        if nodes == self.node_limit:
+            return 'Too many nodes. Timeout!'
+
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            return 'Deadline reached. Timeout!'
+
+        if self.cancel is not None and nodes % 1024 == 0 and self.cancel():
+            return 'Cancelled.'
+        return None
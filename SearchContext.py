@@ -0,0 +1,52 @@
+from NogoodStore import NogoodStore
+
+
+class SearchContext:
+    """
+    What the in-place search learns and keeps track of while it solves one puzzle: its nogoods, the cell decided
+    at each depth of the current branch, its transposition table, its CellQueue, the part of the puzzle being
+    searched, and its counters. Each search has its own (see start_search), so searches running side by side,
+    in threads or not, never see each other's.
+    It also holds the settings the search runs with, taken from forward_checking's when it starts: changing
+    those afterwards (or resuming another search) does not affect a search already running.
+    """
+
+    def __init__(self, use_propagation=True, probe_limit=0, use_cell_queue=True):
+        """
+        :param use_propagation: bool - run BitboardState.propagate after every decision
+        :param probe_limit: int - cells probed at each node, 0 to turn probing off
+        :param use_cell_queue: bool - pick cells from a CellQueue instead of scanning with select_next_cell
+        """
+        self.use_propagation = use_propagation
+        self.probe_limit = probe_limit
+        self.use_cell_queue = use_cell_queue
+        self.nogoods = NogoodStore()    # nogoods learned on the puzzle
+        self.decision_cells = []        # bit index of the cell decided at each depth of the current branch
+        self.transposition_table = None     # a TranspositionTable, if the search hashes its states
+        self.cell_queue = None          # the CellQueue of the state being searched
+        self.component_goal = None      # (unlit cells, wall positions) the part being searched must light and satisfy
+        self.backjump_count = 0     # nodes left early because their decision was not in the conflict
+        self.probe_count = 0        # values tried by the probes
+        self.probe_fixes = 0        # values the probes ruled out
+        self.probe_time = 0.0       # seconds spent probing
+
+    def clear(self):
+        """
+        Forget what was learned and counted, before moving on to another puzzle (or starting it over)
+        """
+        self.nogoods.clear()
+        self.decision_cells = []
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        self.cell_queue = None
+        self.component_goal = None
+        self.backjump_count = 0
+        self.probe_count = 0
+        self.probe_fixes = 0
+        self.probe_time = 0.0
+
+    def __getstate__(self):
+        # The CellQueue is rebuilt from the state on first use: a checkpoint or a worker process does not need it
+        state = dict(self.__dict__)
+        state['cell_queue'] = None
+        return state
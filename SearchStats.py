@@ -0,0 +1,76 @@
+import time
+
+
+class SearchStats:
+    """
+    Counters of one in-place search: nodes, backtracks, calls to propagate and domain_change, the deepest
+    decision level reached, and the seconds spent picking cells (by heuristic) and checking states (by check).
+    They are filled in by a BitboardState after enable_stats(stats) and by the search functions working on
+    it; a state without stats skips all of it, so turning stats off costs one test per node.
+
+    With a trace file, every sample_every-th node also writes one JSON line of the counters so far, to
+    follow a long search without slowing it down much.
+    """
+
+    __slots__ = ('nodes', 'backtracks', 'propagations', 'domain_changes', 'max_depth', 'timers',
+                 'trace', 'sample_every', 'starting_time')
+
+    def __init__(self, trace=None, sample_every=1000):
+        """
+        :param trace: file - open text file the samples are written to, None for no trace
+        :param sample_every: int - nodes between two samples
+        """
+        self.nodes = 0
+        self.backtracks = 0
+        self.propagations = 0
+        self.domain_changes = 0
+        self.max_depth = 0
+        self.timers = {}
+        self.trace = trace
+        self.sample_every = sample_every
+        self.starting_time = time.perf_counter()
+
+    def enter(self, depth, state):
+        """
+        Count a node of the search
+        :param depth: int - its decision level
+        :param state: BitboardState - the state at that node
+        """
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.trace is not None and self.nodes % self.sample_every == 0:
+            self.write('sample', depth=depth, bulbs=state.bulbs.bit_count(),
+                       unassigned=(state.unassigned & state.domain).bit_count())
+
+    def timed(self, name, function, *args):
+        """
+        Call function(*args) and add the seconds it took to the timer of that name
+        :return: what the function returned
+        """
+        starting_time = time.perf_counter()
+        result = function(*args)
+        self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - starting_time
+        return result
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'propagations': self.propagations,
+            'domain_changes': self.domain_changes,
+            'max_depth': self.max_depth,
+            'timers': dict(self.timers),
+        }
+
+    def write(self, event, **fields):
+        """
+        Write one line to the trace: the event, the seconds since the search started, the counters and the fields
+        """
+        if self.trace is None:
+            return
+        import json     # only traced searches need it, so importing the solver does not pay for it
+        record = {'event': event, 'elapsed': time.perf_counter() - self.starting_time}
+        record.update(self.as_dict())
+        record.update(fields)
+        self.trace.write(json.dumps(record) + '\n')
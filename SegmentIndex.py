@@ -0,0 +1,203 @@
+import random
+
+
+class SegmentIndex:
+    """
+    Line-of-sight index of a puzzle, built once since walls never move during a solve.
+    A segment is a maximal horizontal or vertical run of non-wall cells; a bulb lights exactly its row
+    segment and its column segment. Cell [row, col] is stored at flat index (row * cols + col), and for
+    each cell the index keeps its row and column segment IDs (-1 on walls), its visible-cell count and the
+    static scores used by the heuristics.
+    """
+
+    def __init__(self, puzzle):
+        """
+        :param puzzle: List[List[Cell]] - The puzzle, as returned by read_file
+        """
+        self.build(len(puzzle), len(puzzle[0]), puzzle_clues(puzzle))
+
+    @classmethod
+    def from_clues(cls, rows, cols, clues):
+        """
+        Build the index straight from the wall layout, without a grid of Cells
+        :param rows: int
+        :param cols: int
+        :param clues: List[int] - for each flat index, the wall's value, or -1 for an open cell
+        :return: SegmentIndex
+        """
+        index = cls.__new__(cls)
+        index.build(rows, cols, clues)
+        return index
+
+    def build(self, rows, cols, clues):
+        self.rows = rows
+        self.cols = cols
+        self.clues = clues
+
+        self.walls = 0
+        for position in range(rows * cols):
+            if clues[position] >= 0:
+                self.walls |= 1 << position
+        self.open_cells = ((1 << (rows * cols)) - 1) & ~self.walls
+
+        self.segment_cells = []     # flat indices of the cells of each segment
+        self.segment_masks = []     # the same cells as a bitset
+        self.row_segment = [-1] * (rows * cols)
+        self.col_segment = [-1] * (rows * cols)
+
+        for row in range(rows):
+            col = 0
+            while col < cols:
+                if clues[row * cols + col] >= 0:
+                    col += 1
+                    continue
+                segment_id = len(self.segment_cells)
+                cells = []
+                while col < cols and clues[row * cols + col] < 0:
+                    cells.append(row * cols + col)
+                    self.row_segment[row * cols + col] = segment_id
+                    col += 1
+                self.add_segment(cells)
+
+        for col in range(cols):
+            row = 0
+            while row < rows:
+                if clues[row * cols + col] >= 0:
+                    row += 1
+                    continue
+                segment_id = len(self.segment_cells)
+                cells = []
+                while row < rows and clues[row * cols + col] < 0:
+                    cells.append(row * cols + col)
+                    self.col_segment[row * cols + col] = segment_id
+                    row += 1
+                self.add_segment(cells)
+
+        # What a bulb on each open cell would light, the cell itself excluded
+        self.sight = [0] * (rows * cols)
+        self.visible_count = [0] * (rows * cols)
+        for index in range(rows * cols):
+            if self.row_segment[index] >= 0:
+                self.sight[index] = (self.segment_masks[self.row_segment[index]]
+                                     | self.segment_masks[self.col_segment[index]]) & ~(1 << index)
+                self.visible_count[index] = (len(self.segment_cells[self.row_segment[index]])
+                                             + len(self.segment_cells[self.col_segment[index]]) - 2)
+
+        # Walls as (flat index, value, mask of the up-to-4 neighbours), and the static heuristic scores
+        self.wall_cells = []
+        self.neighbours = [[] for _ in range(rows * cols)]
+        self.adjacent_walls = [0] * (rows * cols)
+        self.edge_constraints = [0] * (rows * cols)
+        directions = [(-1, 0), (1, 0), (0, 1), (0, -1)]
+        for row in range(rows):
+            for col in range(cols):
+                index = row * cols + col
+                mask = 0
+                for x_direct, y_direct in directions:
+                    x_temp, y_temp = row + x_direct, col + y_direct
+                    if 0 <= x_temp < rows and 0 <= y_temp < cols:
+                        self.neighbours[index].append(x_temp * cols + y_temp)
+                        mask |= 1 << (x_temp * cols + y_temp)
+                if clues[index] >= 0:
+                    self.wall_cells.append((index, clues[index], mask))
+                else:
+                    self.adjacent_walls[index] = (mask & self.walls).bit_count()
+                    self.edge_constraints[index] = edge_corner_score(rows, cols, row, col)
+
+        # For each cell, the positions in wall_cells of the walls next to it
+        self.walls_around = [[] for _ in range(rows * cols)]
+        for wall_id, (index, _, _) in enumerate(self.wall_cells):
+            for other in self.neighbours[index]:
+                self.walls_around[other].append(wall_id)
+        self.wall_values = [wall_value for _, wall_value, _ in self.wall_cells]
+
+        self.bulb_keys = None
+        self.removed_keys = None
+
+    def zobrist_keys(self, seed=0x5eed):
+        """
+        Random 64-bit keys of each cell for the Zobrist hash of a BitboardState, drawn on first use
+        :return: (List[int], List[int]) - the key of a bulb on each cell, and of each cell losing Bulb from its domain
+        """
+        if self.bulb_keys is None:
+            rng = random.Random(seed)
+            self.bulb_keys = [rng.getrandbits(64) for _ in range(self.rows * self.cols)]
+            self.removed_keys = [rng.getrandbits(64) for _ in range(self.rows * self.cols)]
+        return self.bulb_keys, self.removed_keys
+
+    def symmetries(self):
+        """
+        The rotations and reflections of the grid that map the puzzle onto itself (every wall onto a wall of
+        the same value), the identity left out. They map every solution onto a solution.
+        :return: List[List[int]] - for each, the flat index each cell goes to
+        """
+        clues = self.clues
+        return [permutation for new_rows, new_cols, permutation in dihedral_maps(self.rows, self.cols)[1:]
+                if (new_rows, new_cols) == (self.rows, self.cols)
+                and all(clues[permutation[position]] == clue for position, clue in enumerate(clues))]
+
+    def add_segment(self, cells):
+        mask = 0
+        for index in cells:
+            mask |= 1 << index
+        self.segment_cells.append(cells)
+        self.segment_masks.append(mask)
+
+
+def puzzle_clues(puzzle):
+    """
+    :param puzzle: List[List[Cell]]
+    :return: List[int] - for each flat index, the wall's value, or -1 for an open cell
+    """
+    return [int(cell.get_cell_value()) if cell.is_wall() else -1 for row in puzzle for cell in row]
+
+
+def dihedral_maps(rows, cols):
+    """
+    The 8 rotations and reflections of a rows x cols grid, the identity first
+    :return: List[(int, int, List[int])] - for each, the rows and cols of the image, and the flat index
+             (in the image) each cell goes to
+    """
+    maps = []
+    for transpose in (False, True):
+        new_rows, new_cols = (cols, rows) if transpose else (rows, cols)
+        for flip_rows in (False, True):
+            for flip_cols in (False, True):
+                permutation = []
+                for row in range(rows):
+                    for col in range(cols):
+                        new_row, new_col = (col, row) if transpose else (row, col)
+                        if flip_rows:
+                            new_row = new_rows - 1 - new_row
+                        if flip_cols:
+                            new_col = new_cols - 1 - new_col
+                        permutation.append(new_row * new_cols + new_col)
+                maps.append((new_rows, new_cols, permutation))
+    return maps
+
+
+def map_mask(mask, permutation):
+    """
+    :param mask: int - a bitboard
+    :param permutation: List[int] - the flat index each cell goes to
+    :return: int - the bitboard of the images of its cells
+    """
+    image = 0
+    while mask:
+        low = mask & -mask
+        image |= 1 << permutation[low.bit_length() - 1]
+        mask ^= low
+    return image
+
+
+def edge_corner_score(rows, cols, row, col):
+    """
+    0 for a cell in the middle, 1 on an edge, 2 in a corner (same scale as utils.edge_corner_constraints)
+    """
+    on_row_edge = row == 0 or row == rows - 1
+    on_col_edge = col == 0 or col == cols - 1
+    if on_row_edge and on_col_edge:
+        return 2
+    if on_row_edge or on_col_edge:
+        return 1
+    return 0
@@ -0,0 +1,126 @@
+from SegmentIndex import dihedral_maps, map_mask
+from collections import OrderedDict
+
+import hashlib
+import sqlite3
+
+
+class SolutionCache:
+    """
+    Cache of the answers of the solver, shared by all the puzzles that are rotations or reflections of each other.
+    A puzzle is looked up by its canonical form: of its 8 images under the rotations and reflections of the grid,
+    the one whose text comes first. Answers are kept for the canonical form, so the bulbs of a solution are mapped
+    into its frame when stored, and back into the frame of the puzzle asked about when found.
+    Answers live in a memory tier of bounded size, the least recently used dropped first, and, if a path is given,
+    in a sqlite file that keeps them all from one run to the next. Found on disk, an answer comes back into memory.
+    """
+
+    def __init__(self, size=10000, path=None):
+        """
+        :param size: int - answers kept in memory at most
+        :param path: Str - path of the sqlite file of the disk tier, None to keep the cache in memory only
+        """
+        self.size = size
+        self.path = path
+        self.memory = OrderedDict()
+        self.maps = {}
+        self.database = None
+        if path is not None:
+            self.database = sqlite3.connect(path, timeout=30)
+            self.database.execute('PRAGMA journal_mode=WAL')
+            self.database.execute('CREATE TABLE IF NOT EXISTS solutions '
+                                  '(key BLOB PRIMARY KEY, status TEXT NOT NULL, bulbs BLOB)')
+            self.database.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def canonical(self, rows, cols, clues):
+        """
+        :param clues: List[int] - for each flat index, the wall's value, or -1 for an open cell
+        :return: (bytes, List[int]) - the key of the canonical form, and the flat index (in the canonical form)
+                 each cell of the puzzle goes to
+        """
+        maps = self.maps.get((rows, cols))
+        if maps is None:
+            maps = self.maps[(rows, cols)] = dihedral_maps(rows, cols)
+        best = None
+        for new_rows, new_cols, permutation in maps:
+            image = bytearray(b'_' * (rows * cols))
+            for position, clue in enumerate(clues):
+                if clue >= 0:
+                    image[permutation[position]] = 48 + clue
+            text = b'%d %d\n' % (new_rows, new_cols) + bytes(image)
+            if best is None or text < best[0]:
+                best = (text, permutation)
+        return hashlib.blake2b(best[0], digest_size=16).digest(), best[1]
+
+    def lookup(self, rows, cols, clues):
+        """
+        :return: (Str, int) - the status of the puzzle (a SolveResult status) and the bulbs of its solution in
+                 its own frame (None unless solved), or None if the puzzle is not in the cache
+        """
+        key, permutation = self.canonical(rows, cols, clues)
+        answer = self.memory.get(key)
+        if answer is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+        elif self.database is not None:
+            row = self.database.execute('SELECT status, bulbs FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                answer = (row[0], None if row[1] is None else int.from_bytes(row[1], 'little'))
+                self.remember(key, answer)
+                self.disk_hits += 1
+        if answer is None:
+            self.misses += 1
+            return None
+
+        status, bulbs = answer
+        if bulbs is not None:
+            inverse = [0] * len(permutation)
+            for position, image in enumerate(permutation):
+                inverse[image] = position
+            bulbs = map_mask(bulbs, inverse)
+        return status, bulbs
+
+    def store(self, rows, cols, clues, status, bulbs=None):
+        """
+        :param status: Str - the status of the puzzle, only stored if it is final (see SolveResult.FINAL)
+        :param bulbs: int - the bulbs of its solution, None unless solved
+        """
+        key, permutation = self.canonical(rows, cols, clues)
+        if bulbs is not None:
+            bulbs = map_mask(bulbs, permutation)
+        self.remember(key, (status, bulbs))
+        if self.database is not None:
+            self.database.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)',
+                                  (key, status, None if bulbs is None else
+                                   bulbs.to_bytes((rows * cols + 7) // 8, 'little')))
+            self.database.commit()
+        self.stores += 1
+
+    def remember(self, key, answer):
+        """
+        Put an answer in the memory tier, dropping the least recently used one if it is full
+        """
+        self.memory[key] = answer
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.size:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'stores': self.stores, 'evictions': self.evictions, 'entries': len(self.memory),
+                'hit_rate': self.hit_rate()}
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
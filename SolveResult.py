@@ -0,0 +1,60 @@
+class SolveResult:
+    """
+    How a call to the solver ended: its status, the solved puzzle if any, the nodes it visited and the
+    seconds it took. message keeps the solver's own words, for printing, and stats the SearchStats of the
+    search if it was instrumented.
+    """
+
+    SOLVED = 'solved'
+    FAILURE = 'failure'     # the whole tree was searched: the puzzle has no solution
+    NODE_LIMIT = 'node_limit'
+    DEADLINE = 'deadline'
+    CANCELLED = 'cancelled'
+    INVALID = 'invalid'     # the puzzle breaks a rule before any search
+    ABORTED = 'aborted'     # bad arguments, e.g. an unknown heuristic
+    FINAL = (SOLVED, FAILURE, INVALID)      # the statuses that do not depend on the budget of the search
+
+    # The messages the search functions return, and the status each stands for
+    MESSAGES = {
+        'backtrack': FAILURE,
+        'failure': FAILURE,
+        'Too many nodes. Timeout!': NODE_LIMIT,
+        'Deadline reached. Timeout!': DEADLINE,
+        'Cancelled.': CANCELLED,
+        'Failure: Puzzle not valid after pre_processing': INVALID,
+        'Abort!!': ABORTED,
+    }
+
+    __slots__ = ('status', 'solution', 'nodes', 'elapsed', 'message', 'stats')
+
+    def __init__(self, status, solution=None, nodes=0, elapsed=0.0, message=None, stats=None):
+        """
+        :param status: Str - one of the statuses above
+        :param solution: List[List[Cell]] - the solved puzzle, None unless solved
+        :param nodes: int - nodes visited
+        :param elapsed: float - seconds taken
+        :param message: Str - what the solver said
+        :param stats: SearchStats - counters of the search, None if it was not instrumented
+        """
+        self.status = status
+        self.solution = solution
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.message = message if message is not None else status
+        self.stats = stats
+
+    @classmethod
+    def from_search(cls, result, nodes=0, elapsed=0.0, stats=None):
+        """
+        :param result: what a search function returned: the solved puzzle (List[List[Cell]]) or one of its messages
+        :return: SolveResult
+        """
+        if isinstance(result, str):
+            return cls(cls.MESSAGES.get(result, cls.FAILURE), None, nodes, elapsed, result, stats)
+        return cls(cls.SOLVED, result, nodes, elapsed, '*** Done! ***', stats)
+
+    def is_solved(self):
+        return self.status == SolveResult.SOLVED
+
+    def __repr__(self):
+        return 'SolveResult({}, {} nodes, {:.3f} s)'.format(self.status, self.nodes, self.elapsed)
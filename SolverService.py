@@ -0,0 +1,228 @@
+from batch import solve_task
+from corpus_index import puzzle_hash
+from forward_checking import *
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+
+import asyncio
+import json
+import os
+
+
+def parse_request_puzzle(text):
+    """
+    Read the one puzzle of a request, in the format read_file reads
+    :param text: Str
+    :return: (List[List[Cell]], bytes) - the puzzle and its hash, the same for any spacing of the header line
+    """
+
+    puzzles = list(parse_puzzle_lines(iter(text.encode('ascii').splitlines(True))))
+    if len(puzzles) != 1:
+        raise ValueError('expected one puzzle, got {}'.format(len(puzzles)))
+    puzzle = puzzles[0][1]
+    rows, cols = len(puzzle), len(puzzle[0])
+    lines = ['{} {}'.format(rows, cols).encode('ascii')]
+    for row in puzzle:
+        if len(row) != cols or any(cell.get_cell_value() not in '_01234' for cell in row):
+            raise ValueError('bad grid line')
+        lines.append(''.join(cell.get_cell_value() for cell in row).encode('ascii'))
+    return puzzle, puzzle_hash(lines)
+
+
+def warm_up():
+    return os.getpid()
+
+
+class SolverService:
+    """
+    Long-running local solver: requests come in as JSON lines over a Unix socket (or a TCP port on localhost),
+    wait in one queue, and are solved by a pool of worker processes started up front, one request per worker
+    at a time. Each request has a deadline counted from its arrival, so the time it spends queued counts, and
+    a request still queued at its deadline is answered without being solved. Final answers (solved, no
+    solution, invalid) are cached by the hash of the puzzle, and a puzzle already being solved is not solved
+    twice: a repeat with the same heuristic and no more time or nodes than a request in flight waits for its
+    answer (which, if not final, the repeat's own budget would not have got either). Other repeats are queued.
+
+    A request: {"puzzle": "<rows> <cols>\\n<grid lines>", "heuristic": "H1", "seconds": 10, "node_limit": 500000,
+    "id": anything to echo back}, or {"command": "stats"}. The answer is one JSON line: the stats of batch.py's
+    solve_task (status, nodes, seconds, solution...), plus the id, the hash, "cached" and the seconds queued.
+    """
+
+    def __init__(self, workers=None, node_limit=500000, seconds=10.0, cache_size=10000):
+        """
+        :param workers: int - number of worker processes, one per core if None
+        :param node_limit: int - node budget of a request that does not set its own
+        :param seconds: float - deadline of a request that does not set its own
+        :param cache_size: int - answers kept at most, the least recently used dropped first
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.node_limit = node_limit
+        self.seconds = seconds
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.solving = {}
+        self.queue = None
+        self.executor = None
+        self.counts = {'requests': 0, 'cache_hits': 0, 'joined': 0, 'solved': 0, 'expired': 0, 'errors': 0}
+
+    async def start(self):
+        """
+        Start the worker processes and the tasks feeding them
+        """
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        await asyncio.gather(*[loop.run_in_executor(self.executor, warm_up) for _ in range(self.workers)])
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+
+    def close(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def dispatch(self):
+        """
+        Hand the queued requests to the pool one at a time, with what is left of their deadline
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            key, puzzle, heuristic, node_limit, deadline, arrival, future = await self.queue.get()
+            remaining = deadline - time.perf_counter()
+            queued = time.perf_counter() - arrival
+            if remaining <= 0:
+                self.counts['expired'] += 1
+                answer = {'status': SolveResult.DEADLINE, 'nodes': 0, 'seconds': 0.0}
+            else:
+                try:
+                    answer = await loop.run_in_executor(self.executor, solve_task, key.hex(), puzzle, heuristic,
+                                                        node_limit, remaining, 0)
+                    self.counts['solved'] += 1
+                except Exception as error:
+                    answer = {'status': SolveResult.ABORTED, 'error': str(error)}
+            answer['hash'] = key.hex()
+            answer.pop('puzzle', None)
+            answer['queued'] = queued
+            future.set_result(answer)
+
+    async def solve(self, request):
+        """
+        :param request: dict - a decoded request line
+        :return: dict - its answer
+        """
+        if request.get('command') == 'stats':
+            return dict(self.counts, queue=self.queue.qsize(), cached=len(self.cache), workers=self.workers)
+
+        self.counts['requests'] += 1
+        arrival = time.perf_counter()
+        try:
+            puzzle, key = parse_request_puzzle(request['puzzle'])
+            heuristic = request.get('heuristic', 'H1')
+            if heuristic not in ('H1', 'H2', 'H3'):
+                raise ValueError('unknown heuristic {}'.format(heuristic))
+            seconds = request.get('seconds', self.seconds)
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not seconds >= 0:
+                raise ValueError('seconds must be a number >= 0')
+            node_limit = request.get('node_limit', self.node_limit)
+            if isinstance(node_limit, bool) or not isinstance(node_limit, int) or node_limit <= 0:
+                raise ValueError('node_limit must be an integer > 0')
+        except (KeyError, ValueError, IndexError, UnicodeError, TypeError, AttributeError) as error:
+            self.counts['errors'] += 1
+            return {'status': SolveResult.ABORTED, 'error': 'bad request: {}'.format(error)}
+
+        answer = self.cache.get(key)
+        if answer is not None:
+            self.cache.move_to_end(key)
+            self.counts['cache_hits'] += 1
+            return dict(answer, cached=True, queued=0.0)
+
+        future = self.joinable(key, heuristic, node_limit, seconds)
+        if future is not None:
+            self.counts['joined'] += 1
+        else:
+            # registered and queued with no await in between: once registered, the solve is sure to be answered
+            future = asyncio.get_running_loop().create_future()
+            solve = (future, heuristic, node_limit, seconds)
+            self.solving.setdefault(key, []).append(solve)
+            future.add_done_callback(lambda done: self.finish(key, solve))
+            self.queue.put_nowait((key, puzzle, heuristic, node_limit, arrival + seconds, arrival, future))
+        # shielded: a request that goes away does not cancel the solve, which still answers the ones that joined it
+        answer = await asyncio.shield(future)
+        return dict(answer, cached=False)
+
+    def joinable(self, key, heuristic, node_limit, seconds):
+        """
+        :return: Future - the answer of a solve of the puzzle in flight, with the same heuristic and at least this
+                 node limit and these seconds, None if there is none
+        """
+        for future, solve_heuristic, solve_node_limit, solve_seconds in self.solving.get(key, ()):
+            if solve_heuristic == heuristic and node_limit <= solve_node_limit and seconds <= solve_seconds:
+                return future
+        return None
+
+    def finish(self, key, solve):
+        """
+        Forget the solve as in flight, and cache its answer if it is final
+        """
+        solves = self.solving[key]
+        solves.remove(solve)
+        if not solves:
+            del self.solving[key]
+        future = solve[0]
+        if future.cancelled():
+            return
+        answer = future.result()
+        if answer['status'] in SolveResult.FINAL:
+            self.cache[key] = answer
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    async def handle(self, reader, writer):
+        """
+        Serve one connection: each request line is answered as soon as it is done, not in order (echo an id to
+        match them up)
+        """
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):     # a line over the stream limit, or the client went away
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                pending.add(asyncio.create_task(self.answer(line, writer)))
+                pending = {task for task in pending if not task.done()}
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def answer(self, line, writer):
+        """
+        Answer one request line with one JSON line, whatever goes wrong with it
+        """
+        request = None
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict):
+                answer = await self.solve(request)
+            else:
+                answer = {'status': SolveResult.ABORTED, 'error': 'bad request: not an object'}
+        except ValueError as error:
+            answer = {'status': SolveResult.ABORTED, 'error': 'bad request: {}'.format(error)}
+        except Exception as error:
+            answer = {'status': SolveResult.ABORTED, 'error': 'internal error: {!r}'.format(error)}
+        if isinstance(request, dict) and 'id' in request:
+            answer['id'] = request['id']
+        try:
+            text = json.dumps(answer)
+        except (TypeError, ValueError):     # an id that does not go back into JSON
+            answer.pop('id', None)
+            text = json.dumps(answer)
+        try:
+            writer.write(text.encode('ascii') + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
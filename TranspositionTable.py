@@ -0,0 +1,60 @@
+from array import array
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of the Zobrist hashes of states already known to fail, for one puzzle.
+    The table has a power-of-two number of slots, indexed by the low bits of the hash, and each slot keeps
+    the full 64-bit hash so that another state landing on the same slot is not mistaken for it. A new entry
+    always replaces the old one. The slots live in one array, so the memory used is known up front:
+    8 bytes per slot, whatever the size of the grid.
+    """
+
+    def __init__(self, size=1 << 16):
+        """
+        :param size: int - number of slots, rounded up to a power of two
+        """
+        size = 1 << max(0, size - 1).bit_length()
+        self.mask = size - 1
+        self.slots = array('Q', bytes(8 * size))
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        """
+        Empty the table and its counters, before moving on to another puzzle
+        """
+        self.slots = array('Q', bytes(8 * len(self.slots)))
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def contains(self, zobrist):
+        """
+        :param zobrist: int - hash of a state
+        :return: bool - True if that state is known to fail
+        """
+        self.lookups += 1
+        if zobrist != 0 and self.slots[zobrist & self.mask] == zobrist:
+            self.hits += 1
+            return True
+        return False
+
+    def store(self, zobrist):
+        """
+        :param zobrist: int - hash of a state that failed
+        """
+        slot = zobrist & self.mask
+        if self.slots[slot] != 0 and self.slots[slot] != zobrist:
+            self.overwrites += 1
+        self.slots[slot] = zobrist
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def memory_bytes(self):
+        return self.slots.itemsize * len(self.slots)
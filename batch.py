@@ -0,0 +1,192 @@
+import forward_checking as fc
+from forward_checking import *
+from corpus_index import read_puzzle_at, iter_shard, shard_range
+from binary_format import BinaryPuzzle, is_binary_file, iter_binary
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import itertools
+import json
+import os
+
+
+def solve_task(key, puzzle, heuristic, node_limit, time_limit, seed, instrument=False):
+    """
+    Solve one puzzle in a worker process, with its own node budget and wall-clock deadline
+    Return the stats of this puzzle
+    :param key: the key of the puzzle in its file
+    :param puzzle: List[List[Cell]] or BinaryPuzzle - The puzzle
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param node_limit: int - give up after this many nodes
+    :param time_limit: float - give up after this many seconds, no deadline if None
+    :param seed: int - seed of the heuristic tie-breaks
+    :param instrument: bool - count the search's backtracks, propagations etc. (see SearchStats) in the stats
+    :return: dict
+    """
+
+    random.seed(seed)
+    search_stats = SearchStats() if instrument else None
+
+    if isinstance(puzzle, BinaryPuzzle):
+        rows, cols = puzzle.rows, puzzle.cols
+        starting_time = time.perf_counter()
+        budget = SearchBudget.within(node_limit, time_limit)
+        state = puzzle.state()
+        if search_stats is not None:
+            state.enable_stats(search_stats)
+        solution = fc.solve_state(state, heuristic, budget=budget)
+        if isinstance(solution, BitboardState):
+            solution = solution.to_cells()
+        result = SolveResult.from_search(solution, budget.nodes, time.perf_counter() - starting_time)
+    else:
+        rows, cols = len(puzzle), len(puzzle[0])
+        result = solve_puzzle(puzzle, heuristic, node_limit=node_limit, time_limit=time_limit, stats=search_stats)
+
+    stats = {
+        'puzzle': key,
+        'rows': rows,
+        'cols': cols,
+        'heuristic': heuristic,
+        'status': result.status,
+        'nodes': result.nodes,
+        'seconds': result.elapsed,
+        'worker': os.getpid(),
+    }
+    if search_stats is not None:
+        stats['search'] = search_stats.as_dict()
+    if fc.solution_cache is not None:
+        stats['cache'] = fc.solution_cache.as_dict()
+    if result.is_solved():
+        stats['solution'] = [''.join(cell.get_cell_value() for cell in row) for row in result.solution]
+    return stats
+
+
+def open_solution_cache(size, path):
+    """
+    Initializer of a worker process: give its solve_puzzle a SolutionCache
+    """
+
+    fc.solution_cache = SolutionCache(size, path)
+
+
+def solve_batch(puzzles, heuristic, workers=None, node_limit=500000, time_limit=None, seed=0, instrument=False,
+                cache_size=None, cache_path=None):
+    """
+    Fan the puzzles out to a process pool and yield each puzzle's stats as soon as it is done
+    Only a few puzzles per worker are in flight at a time, so puzzles can come from a lazy iterator
+    :param puzzles: iterable of (key, List[List[Cell]] or BinaryPuzzle) - e.g. iter_puzzles(path), iter_binary(path)
+                    or read_file(file_name).items()
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param workers: int - number of worker processes, one per core if None
+    :param node_limit: int - node budget of each puzzle
+    :param time_limit: float - seconds each puzzle may take, no deadline if None
+    :param seed: int - seed of the heuristic tie-breaks
+    :param instrument: bool - add the counters of each search to its stats, under "search"
+    :param cache_size: int - give each worker a SolutionCache of this many entries in memory (text puzzles only),
+                       whose counters are added to the stats of each puzzle, under "cache"; None for no cache
+    :param cache_path: Str - sqlite file of the disk tier of the caches, shared by the workers, None for none
+    :return: generator of dict, in completion order
+    """
+
+    workers = workers or os.cpu_count() or 1
+    puzzles = iter(puzzles)
+    initializer, initargs = None, ()
+    if cache_size is not None:
+        initializer, initargs = open_solution_cache, (cache_size, cache_path)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = set()
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 4 * workers:
+                try:
+                    key, puzzle = next(puzzles)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(solve_task, key, puzzle, heuristic, node_limit, time_limit, seed,
+                                            instrument))
+
+            if pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+    arg_parser.add_argument('-w', action='store', dest='workers', type=int, default=None)
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-t', action='store', dest='time_limit', type=float, default=None)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+    arg_parser.add_argument('-i', action='store', dest='puzzle_number', type=int, default=None)
+    arg_parser.add_argument('-S', action='store', dest='shard', type=str, default=None)
+    arg_parser.add_argument('-j', action='store', dest='json_path', type=str, default=None)
+    arg_parser.add_argument('-k', action='store', dest='cache_path', type=str, default=None)
+    arg_parser.add_argument('-K', action='store', dest='cache_size', type=int, default=None)
+
+    arguments = arg_parser.parse_args(argv)
+    path = puzzle_path(arguments.file_name)
+
+    # Puzzles are read lazily, so the workers start on the first ones while the rest of the file is read
+    # Binary files are not parsed at all: records are skipped by their header and decoded by the worker
+    if is_binary_file(path):
+        puzzles = iter_binary(path)
+        if arguments.puzzle_number is not None:
+            puzzles = itertools.islice(puzzles, arguments.puzzle_number, arguments.puzzle_number + 1)
+        elif arguments.shard is not None:
+            shard, shards = arguments.shard.split('/')
+            puzzles = list(puzzles)
+            first, last = shard_range(len(puzzles), int(shard), int(shards))
+            puzzles = puzzles[first:last]
+    elif arguments.puzzle_number is not None:
+        puzzles = [(arguments.puzzle_number, read_puzzle_at(path, arguments.puzzle_number))]
+    elif arguments.shard is not None:
+        shard, shards = arguments.shard.split('/')
+        puzzles = iter_shard(path, int(shard), int(shards))
+    else:
+        puzzles = iter_puzzles(path)
+
+    # With -j, each puzzle's stats, search counters included, are also written as one JSON line
+    json_file = open(arguments.json_path, 'w') if arguments.json_path else None
+    # -k and/or -K give the workers a solution cache (-K entries in memory, 10000 by default; -k the sqlite file)
+    cache_size = arguments.cache_size
+    if cache_size is None and arguments.cache_path is not None:
+        cache_size = 10000
+    count = {}
+    caches = {}
+    starting_time = time.perf_counter()
+    for stats in solve_batch(puzzles, arguments.heuristic, arguments.workers, arguments.node_limit,
+                             arguments.time_limit, arguments.seed, json_file is not None, cache_size,
+                             arguments.cache_path):
+        count[stats['status']] = count.get(stats['status'], 0) + 1
+        if 'cache' in stats:
+            caches[stats['worker']] = stats['cache']
+        print('Puzzle {} ({}x{}): {}, {} nodes, {:.3f} seconds.'.format(
+            stats['puzzle'], stats['rows'], stats['cols'], stats['status'], stats['nodes'], stats['seconds']))
+        if json_file is not None:
+            json_file.write(json.dumps(stats) + '\n')
+    ending_time = time.perf_counter()
+    if json_file is not None:
+        json_file.close()
+
+    print('{} puzzles in {:.3f} seconds: {}'.format(
+        sum(count.values()), ending_time - starting_time,
+        ', '.join('{} {}'.format(number, status) for status, number in sorted(count.items()))))
+    if caches:
+        totals = {name: sum(cache[name] for cache in caches.values())
+                  for name in ('memory_hits', 'disk_hits', 'misses', 'evictions')}
+        lookups = totals['memory_hits'] + totals['disk_hits'] + totals['misses']
+        print('Cache: {} memory hits, {} disk hits, {} misses ({:.1%} hit rate), {} evictions.'.format(
+            totals['memory_hits'], totals['disk_hits'], totals['misses'],
+            (totals['memory_hits'] + totals['disk_hits']) / lookups if lookups else 0.0, totals['evictions']))
+
+
+if __name__ == '__main__':
+    main()
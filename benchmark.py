@@ -0,0 +1,404 @@
+import forward_checking as fc
+from forward_checking import *
+from generator import generate_puzzle
+from queue import LifoQueue
+
+import json
+import math
+import platform
+import subprocess
+import tracemalloc
+
+
+def run_engine(puzzle, heuristic, engine, node_limit=3000, seed=0):
+    """
+    Search the raw puzzle (no pre-processing, so there is a tree to walk) with one engine
+    Return the number of nodes visited and the time it took
+    :param puzzle: List[List[Cell]] - The puzzle, left untouched
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param engine: Str - "cell", "bitboard" or "trail"
+    :param node_limit: int - stop the search after this many nodes
+    :param seed: int - seed of the heuristic tie-breaks
+    :return: (int, float)
+    """
+
+    puzzle = copy.deepcopy(puzzle)
+    empty_cells = get_empty_cells(puzzle)
+    wall_cells = get_wall_cells(puzzle)
+    random.seed(seed)
+    budget = SearchBudget(node_limit)
+
+    starting_time = time.perf_counter()
+    if engine == 'cell':
+        fc.forward_checking(puzzle, empty_cells, wall_cells,
+                            LifoQueue(maxsize=len(puzzle) * len(puzzle[0])), heuristic, budget=budget)
+    elif engine == 'bitboard':
+        fc.forward_checking_bitboard(BitboardState(puzzle, empty_cells), empty_cells, heuristic, budget)
+    else:
+        state = BitboardState(puzzle, empty_cells)
+        state.enable_search(SearchContext())
+        state.enable_trail()
+        fc.forward_checking_in_place(state, heuristic, random.Random(seed), budget=budget)
+    ending_time = time.perf_counter()
+
+    return budget.nodes, ending_time - starting_time
+
+
+def compare_engines(file_name, heuristic, engines, node_limit):
+    """
+    Print the nodes per second of each engine on every puzzle of the file
+    :param file_name: Str - a file in data/
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param engines: List[str] - the engines to compare
+    :param node_limit: int - stop each search after this many nodes
+    """
+
+    puzzle_dict = read_file(file_name)
+
+    for i in puzzle_dict.keys():
+        print('Puzzle {} of {} ({}):'.format(i, file_name, heuristic))
+        for engine in engines:
+            nodes, elapsed = run_engine(puzzle_dict[i], heuristic, engine, node_limit)
+            print('  {:<9} {:>8} nodes in {:8.3f} s = {:>9.0f} nodes/s'.format(
+                engine, nodes, elapsed, nodes / elapsed))
+
+
+def compare_probing(file_name, heuristic, probe_limit, node_limit, seed=0):
+    """
+    Solve every puzzle of the file with and without probing, and print how many nodes probing saved
+    against how much time it spent, to decide whether a corpus is worth probing
+    :param file_name: Str - a file in data/
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param probe_limit: int - cells probed at each node
+    :param node_limit: int - stop each search after this many nodes
+    :param seed: int - seed of the heuristic tie-breaks
+    """
+
+    puzzle_dict = read_file(file_name)
+    total_saved = 0
+    total_time = 0.0
+
+    for i in puzzle_dict.keys():
+        runs = []
+        for limit in (0, probe_limit):
+            fc.probe_limit = limit
+            context = SearchContext()
+            random.seed(seed)
+            result = solve_puzzle(copy.deepcopy(puzzle_dict[i]), heuristic, node_limit=node_limit, context=context)
+            runs.append((result.nodes, result.elapsed))
+        fc.probe_limit = 0
+
+        saved = runs[0][0] - runs[1][0]
+        total_saved += saved
+        total_time += runs[1][1] - runs[0][1]
+        print('Puzzle {} of {} ({}, k={}): {} -> {} nodes ({} saved), {:.3f} -> {:.3f} s; '
+              '{} probes ruled out {} values in {:.3f} s'.format(
+                  i, file_name, heuristic, probe_limit, runs[0][0], runs[1][0], saved, runs[0][1], runs[1][1],
+                  context.probe_count, context.probe_fixes, context.probe_time))
+
+    print('Probing saved {} nodes for {:+.3f} seconds overall.'.format(total_saved, total_time))
+
+
+def compare_transposition(file_name, heuristic, slots, node_limit, seed=0):
+    """
+    Solve every puzzle of the file with and without the transposition table, and print its hit rate
+    :param file_name: Str - a file in data/
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param slots: int - size of the table
+    :param node_limit: int - stop each search after this many nodes
+    :param seed: int - seed of the heuristic tie-breaks
+    """
+
+    puzzle_dict = read_file(file_name)
+    table_slots = fc.transposition_slots
+    fc.transposition_slots = slots
+
+    for i in puzzle_dict.keys():
+        runs = []
+        for use_transposition in (False, True):
+            fc.use_transposition = use_transposition
+            context = SearchContext()
+            random.seed(seed)
+            result = solve_puzzle(copy.deepcopy(puzzle_dict[i]), heuristic, node_limit=node_limit, context=context)
+            runs.append((result.nodes, result.elapsed))
+
+        table_stats = context.transposition_table
+        print('Puzzle {} of {} ({}): {} -> {} nodes, {:.3f} -> {:.3f} s; {} lookups, {} hits ({:.1%}), '
+              '{} stores, {} overwrites, {} KiB'.format(
+                  i, file_name, heuristic, runs[0][0], runs[1][0], runs[0][1], runs[1][1], table_stats.lookups,
+                  table_stats.hits, table_stats.hit_rate(), table_stats.stores, table_stats.overwrites,
+                  table_stats.memory_bytes() // 1024))
+
+    fc.use_transposition = False
+    fc.transposition_slots = table_slots
+
+
+def percentile(values, fraction):
+    """
+    :param values: List[float]
+    :param fraction: float - 0.5 for the median, 0.95 for the 95th percentile
+    :return: float - the nearest-rank percentile of the values
+    """
+
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def run_suite(file_names=None, heuristics=('H1', 'H2', 'H3'), seeds=(0, 1, 2), repeats=3, node_limit=500000):
+    """
+    Solve every puzzle of every file with each heuristic, once per seed and repeat, and sum up each
+    (file, heuristic) pair: median and 95th percentile of the time to solve the whole file, nodes,
+    nodes per second, and the peak memory of one more (untimed) run under tracemalloc
+    Node counts only depend on the seed, so they are the same for every repeat.
+    :param file_names: List[str] - files in data/, every .txt file there if None
+    :param heuristics: List[str]
+    :param seeds: List[int] - seeds of the heuristic tie-breaks
+    :param repeats: int - runs per seed
+    :param node_limit: int - node budget of each puzzle
+    :return: dict - the settings and one entry per (file, heuristic), ready for json.dump
+    """
+
+    if file_names is None:
+        file_names = sorted(name for name in os.listdir(os.getcwd() + '/data/') if name.endswith('.txt'))
+    suite = {
+        'settings': {'files': list(file_names), 'heuristics': list(heuristics), 'seeds': list(seeds),
+                     'repeats': repeats, 'node_limit': node_limit},
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': [],
+    }
+
+    for file_name in file_names:
+        puzzle_dict = read_file(file_name)
+        for heuristic in heuristics:
+            times = []
+            nodes = []
+            statuses = {}
+            for seed in seeds:
+                for _ in range(repeats):
+                    elapsed, total_nodes, run_statuses = run_file(puzzle_dict, heuristic, seed, node_limit)
+                    times.append(elapsed)
+                    nodes.append(total_nodes)
+                    statuses = run_statuses
+
+            tracemalloc.start()
+            run_file(puzzle_dict, heuristic, seeds[0], node_limit)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            median_seconds = percentile(times, 0.5)
+            entry = {
+                'file': file_name,
+                'heuristic': heuristic,
+                'puzzles': len(puzzle_dict),
+                'runs': len(times),
+                'median_seconds': median_seconds,
+                'p95_seconds': percentile(times, 0.95),
+                'nodes': percentile(nodes, 0.5),
+                'nodes_per_second': percentile(nodes, 0.5) / median_seconds if median_seconds > 0 else 0.0,
+                'peak_memory_kib': peak_memory // 1024,
+                'statuses': statuses,
+            }
+            suite['results'].append(entry)
+            print('{:<20} {}: {:>8.3f} s median, {:>8.3f} s p95, {:>8} nodes, {:>9.0f} nodes/s, {:>6} KiB'.format(
+                file_name, heuristic, entry['median_seconds'], entry['p95_seconds'], entry['nodes'],
+                entry['nodes_per_second'], entry['peak_memory_kib']))
+    return suite
+
+
+def run_file(puzzle_dict, heuristic, seed, node_limit):
+    """
+    Solve every puzzle of a file once
+    :return: (float, int, dict) - the seconds spent solving (copying the puzzles left out), the nodes, and
+             how many puzzles ended with each status
+    """
+
+    elapsed = 0.0
+    nodes = 0
+    statuses = {}
+    for i in puzzle_dict.keys():
+        puzzle = copy.deepcopy(puzzle_dict[i])
+        random.seed(seed)
+        result = solve_puzzle(puzzle, heuristic, node_limit=node_limit, rng=random.Random(seed))
+        elapsed += result.elapsed
+        nodes += result.nodes
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    return elapsed, nodes, statuses
+
+
+def cold_start(file_name, heuristic='H1', repeats=10):
+    """
+    Time a fresh "python -m forward_checking -f json" process, from its launch to the first solution it writes
+    (the first puzzle of the file), against an interpreter that does nothing
+    The solver is run with -m so that it loads from its cached bytecode: run as a script, the file is compiled
+    again at every launch.
+    :param file_name: Str - a file whose first puzzle is small, e.g. a 6x6 one
+    :param repeats: int - processes launched of each
+    :return: (List[float], List[float]) - the sorted times of the solver and of the bare interpreter, in seconds
+    """
+
+    def first_line(command):
+        starting_time = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   cwd=os.path.dirname(os.path.abspath(fc.__file__)))
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - starting_time
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        if not line and command[1] != '-c':
+            raise RuntimeError('the solver wrote nothing')
+        return elapsed
+
+    solver = [sys.executable, '-m', 'forward_checking', '-p', os.path.abspath(puzzle_path(file_name)), '-h', heuristic,
+              '-f', 'json']
+    bare = [sys.executable, '-c', 'print()']
+    return (sorted(first_line(solver) for _ in range(repeats)),
+            sorted(first_line(bare) for _ in range(repeats)))
+
+
+def scaling_series(sizes, heuristics=('H1', 'H2', 'H3'), count=5, seed=0, wall_density=0.2, node_limit=500000):
+    """
+    Generate count puzzles of each size (the same ones for every heuristic) and record, for each size and
+    heuristic, the median time and nodes to solve one, to see how the solver scales with the grid
+    :param sizes: List[int] - side lengths of the square grids
+    :param heuristics: List[str]
+    :param count: int - puzzles per size
+    :param seed: int - seed of the generator and of the heuristic tie-breaks
+    :param wall_density: float - share of the cells that are walls
+    :param node_limit: int - node budget of each puzzle
+    :return: dict - the settings and one entry per (size, heuristic), ready for json.dump
+    """
+
+    series = {
+        'settings': {'sizes': list(sizes), 'heuristics': list(heuristics), 'count': count, 'seed': seed,
+                     'wall_density': wall_density, 'node_limit': node_limit},
+        'results': [],
+    }
+    for size in sizes:
+        rng = random.Random(seed * 1000003 + size)
+        puzzles = [generate_puzzle(size, size, wall_density, 0.5, rng)[0] for _ in range(count)]
+        for heuristic in heuristics:
+            times = []
+            nodes = []
+            solved = 0
+            for clues in puzzles:
+                starting_time = time.perf_counter()
+                budget = SearchBudget(node_limit)
+                state = BitboardState(None, index=SegmentIndex.from_clues(size, size, clues))
+                result = fc.solve_state(state, heuristic, random.Random(seed), budget)
+                times.append(time.perf_counter() - starting_time)
+                nodes.append(budget.nodes)
+                solved += isinstance(result, BitboardState)
+            entry = {'size': size, 'heuristic': heuristic, 'median_seconds': percentile(times, 0.5),
+                     'median_nodes': percentile(nodes, 0.5), 'solved': solved, 'puzzles': count}
+            series['results'].append(entry)
+            print('{:>3}x{:<3} {}: {:>8.3f} s, {:>8} nodes median, {}/{} solved'.format(
+                size, size, heuristic, entry['median_seconds'], entry['median_nodes'], solved, count))
+    return series
+
+
+def compare_suites(baseline, current, tolerance=0.1, min_seconds=0.01):
+    """
+    Compare two results of run_suite, entry by entry
+    A pair regresses if its median time grows by more than the tolerance, if it needs more nodes, or if
+    fewer of its puzzles get solved. Timings are only comparable between runs on the same machine.
+    :param baseline: dict - the stored results
+    :param current: dict - the new results
+    :param tolerance: float - slowdown allowed on the median time, as a fraction
+    :param min_seconds: float - slowdown always allowed, in seconds, so that files solved in a few
+                        milliseconds do not fail on timer noise
+    :return: List[str] - one line per regression, empty if there is none
+    """
+
+    regressions = []
+    baseline_entries = {(entry['file'], entry['heuristic']): entry for entry in baseline['results']}
+    for entry in current['results']:
+        old = baseline_entries.get((entry['file'], entry['heuristic']))
+        if old is None:
+            continue
+        name = '{} {}'.format(entry['file'], entry['heuristic'])
+        if entry['median_seconds'] > max(old['median_seconds'] * (1 + tolerance), old['median_seconds'] + min_seconds):
+            regressions.append('{}: median time {:.3f} s -> {:.3f} s ({:+.0%})'.format(
+                name, old['median_seconds'], entry['median_seconds'],
+                entry['median_seconds'] / old['median_seconds'] - 1 if old['median_seconds'] > 0 else 1))
+        if entry['nodes'] > old['nodes']:
+            regressions.append('{}: {} -> {} nodes'.format(name, old['nodes'], entry['nodes']))
+        if entry['statuses'].get('solved', 0) < old['statuses'].get('solved', 0):
+            regressions.append('{}: {} -> {} puzzles solved'.format(
+                name, old['statuses'].get('solved', 0), entry['statuses'].get('solved', 0)))
+    return regressions
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str, default=None)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default=None)
+    arg_parser.add_argument('-e', action='store', dest='engines', type=str, default='cell,bitboard,trail')
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=3000)
+    arg_parser.add_argument('-k', action='store', dest='probe_limit', type=int, default=0)
+    arg_parser.add_argument('-T', action='store', dest='table_slots', type=int, default=0)
+    arg_parser.add_argument('-S', action='store_true', dest='suite')
+    arg_parser.add_argument('-r', action='store', dest='repeats', type=int, default=3)
+    arg_parser.add_argument('-s', action='store', dest='seeds', type=str, default='0,1,2')
+    arg_parser.add_argument('-o', action='store', dest='output', type=str, default=None)
+    arg_parser.add_argument('-b', action='store', dest='baseline', type=str, default=None)
+    arg_parser.add_argument('-c', action='store', dest='current', type=str, default=None)
+    arg_parser.add_argument('-x', action='store', dest='tolerance', type=float, default=0.1)
+    arg_parser.add_argument('-m', action='store', dest='min_seconds', type=float, default=0.01)
+    arg_parser.add_argument('-G', action='store', dest='sizes', type=str, default=None)
+    arg_parser.add_argument('-Z', action='store', dest='cold_starts', type=int, default=0)
+
+    arguments = arg_parser.parse_args(argv)
+    if arguments.cold_starts > 0:
+        solver, bare = cold_start(arguments.file_name or 'lightupPuzzles.txt', arguments.heuristic or 'H1',
+                                  arguments.cold_starts)
+        print('Cold start to first solution: {:.1f} ms median, {:.1f} ms best (interpreter alone: {:.1f} ms '
+              'median).'.format(1000 * solver[len(solver) // 2], 1000 * solver[0], 1000 * bare[len(bare) // 2]))
+        return
+    if arguments.sizes:
+        heuristics = [arguments.heuristic] if arguments.heuristic else ['H1', 'H2', 'H3']
+        series = scaling_series([int(size) for size in arguments.sizes.split(',')], heuristics,
+                                seed=int(arguments.seeds.split(',')[0]), node_limit=arguments.node_limit)
+        if arguments.output:
+            with open(arguments.output, 'w') as file:
+                json.dump(series, file, indent=1)
+        return
+    if arguments.suite or arguments.current:
+        if arguments.current:
+            with open(arguments.current) as file:
+                suite = json.load(file)
+        else:
+            heuristics = [arguments.heuristic] if arguments.heuristic else ['H1', 'H2', 'H3']
+            files = [arguments.file_name] if arguments.file_name else None
+            seeds = [int(seed) for seed in arguments.seeds.split(',')]
+            suite = run_suite(files, heuristics, seeds, arguments.repeats, arguments.node_limit)
+        if arguments.output:
+            with open(arguments.output, 'w') as file:
+                json.dump(suite, file, indent=1)
+        if arguments.baseline:
+            with open(arguments.baseline) as file:
+                baseline = json.load(file)
+            regressions = compare_suites(baseline, suite, arguments.tolerance, arguments.min_seconds)
+            for regression in regressions:
+                print('REGRESSION ' + regression)
+            print('{} regressions against {}.'.format(len(regressions), arguments.baseline))
+            if regressions:
+                sys.exit(1)
+        return
+
+    file_name = arguments.file_name or '48W.txt'
+    heuristic = arguments.heuristic or 'H1'
+    if arguments.table_slots > 0:
+        compare_transposition(file_name, heuristic, arguments.table_slots, arguments.node_limit)
+    elif arguments.probe_limit > 0:
+        compare_probing(file_name, heuristic, arguments.probe_limit, arguments.node_limit)
+    else:
+        compare_engines(file_name, heuristic, arguments.engines.split(','), arguments.node_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+from forward_checking import *
+
+import struct
+
+# File layout: magic, then one record per puzzle, back to back:
+#   (rows, cols, flags) header
+#   one nibble per cell, two cells per byte, the even flat index in the low nibble:
+#   0 to 4 for a numbered wall, OPEN_NIBBLE for an open cell
+#   if flags has HAS_SOLUTION, the bulbs of the solution as a little-endian bitset of rows * cols bits
+BINARY_MAGIC = b'LUPBIN1\0'
+RECORD_HEADER = struct.Struct('<HHB')
+HAS_SOLUTION = 1
+OPEN_NIBBLE = 15
+
+# The two clues packed in each possible byte, low nibble first
+BYTE_CLUES = [(low if low != OPEN_NIBBLE else -1, high if high != OPEN_NIBBLE else -1)
+              for high in range(16) for low in range(16)]
+
+
+class BinaryPuzzle:
+    """
+    One record of a binary puzzle file. The record is kept as it is in the file (a memoryview of the
+    mapped file when read by iter_binary), and nothing is decoded until the solver asks for it.
+    """
+
+    __slots__ = ('rows', 'cols', 'flags', 'record')
+
+    def __init__(self, record):
+        """
+        :param record: bytes or memoryview - the record, from its header to the end of its solution bitset
+        """
+        self.rows, self.cols, self.flags = RECORD_HEADER.unpack_from(record)
+        self.record = record
+
+    def __reduce__(self):
+        # A memoryview of the mapped file cannot be pickled, so a record sent to a worker process is copied
+        return BinaryPuzzle, (bytes(self.record),)
+
+    def clues(self):
+        """
+        :return: List[int] - for each flat index, the wall's value, or -1 for an open cell
+        """
+        size = self.rows * self.cols
+        start = RECORD_HEADER.size
+        clues = []
+        for byte in self.record[start:start + (size + 1) // 2]:
+            clues += BYTE_CLUES[byte]
+        del clues[size:]
+        return clues
+
+    def solution_bulbs(self):
+        """
+        :return: int - the bulbs of the stored solution as a bitboard, None if the record has no solution
+        """
+        if not self.flags & HAS_SOLUTION:
+            return None
+        start = RECORD_HEADER.size + (self.rows * self.cols + 1) // 2
+        return int.from_bytes(self.record[start:start + solution_size(self.rows, self.cols)], 'little')
+
+    def state(self):
+        """
+        :return: BitboardState - the blank puzzle, ready for solve_state
+        """
+        return BitboardState(None, index=SegmentIndex.from_clues(self.rows, self.cols, self.clues()))
+
+    def to_cells(self):
+        """
+        :return: List[List[Cell]] - the puzzle as read_file would have returned it
+        """
+        clues = self.clues()
+        return [[Cell(row, col, str(clues[row * self.cols + col]) if clues[row * self.cols + col] >= 0
+                      else CellState.EMPTY) for col in range(self.cols)] for row in range(self.rows)]
+
+
+def solution_size(rows, cols):
+    return (rows * cols + 7) // 8
+
+
+def record_size(rows, cols, flags):
+    size = RECORD_HEADER.size + (rows * cols + 1) // 2
+    if flags & HAS_SOLUTION:
+        size += solution_size(rows, cols)
+    return size
+
+
+def encode_puzzle(rows, cols, clues, bulbs=None):
+    """
+    Pack one puzzle, and optionally its solution, into a record
+    :param rows: int
+    :param cols: int
+    :param clues: List[int] - for each flat index, the wall's value, or -1 for an open cell
+    :param bulbs: int - the bulbs of its solution as a bitboard, or None
+    :return: bytes
+    """
+    flags = HAS_SOLUTION if bulbs is not None else 0
+    nibbles = [clue if clue >= 0 else OPEN_NIBBLE for clue in clues]
+    if len(nibbles) % 2:
+        nibbles.append(OPEN_NIBBLE)
+    record = RECORD_HEADER.pack(rows, cols, flags) + bytes(
+        nibbles[i] | (nibbles[i + 1] << 4) for i in range(0, len(nibbles), 2))
+    if bulbs is not None:
+        record += bulbs.to_bytes(solution_size(rows, cols), 'little')
+    return record
+
+
+def is_binary_file(path):
+    """
+    :param path: Str - path of a puzzle file, or "-" for stdin
+    :return: bool - True if it is in the binary format
+    """
+    if path == '-':
+        return False
+    with open(path, 'rb') as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def iter_binary(path):
+    """
+    Yield the puzzles of a binary file without copying them: the file is memory-mapped and each
+    BinaryPuzzle holds a memoryview of its own record. The mapping is closed once the last view is dropped.
+    :param path: Str - path of the binary file
+    :return: generator of (int, BinaryPuzzle) - the puzzle number and the puzzle
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= len(BINARY_MAGIC):
+            return
+        data = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError('{} is not a binary puzzle file'.format(path))
+
+    count = 0
+    offset = len(BINARY_MAGIC)
+    while offset < len(data):
+        rows, cols, flags = RECORD_HEADER.unpack_from(data, offset)
+        size = record_size(rows, cols, flags)
+        yield count, BinaryPuzzle(data[offset:offset + size])
+        count += 1
+        offset += size
+
+
+def text_to_binary(text_path, binary_path):
+    """
+    Convert a text puzzle file to the binary format
+    A "# Solution" block right after a puzzle (as in lightupPuzzles.txt) is kept as the puzzle's solution.
+    :param text_path: Str - path of the text file, or "-" for stdin
+    :param binary_path: Str - path of the binary file to write
+    :return: int - the number of puzzles converted
+    """
+    source = sys.stdin.buffer if text_path == '-' else open(text_path, 'rb')
+    count = 0
+    with source, open(binary_path, 'wb') as output:
+        output.write(BINARY_MAGIC)
+        lines = iter(source.readline, b'')
+        pending = None      # the last puzzle read, written once we know whether a solution follows it
+
+        for line in lines:
+            if line[:1] == b'#':
+                if pending is not None and b'solution' in line.lower():
+                    rows, cols, clues = pending
+                    bulbs = 0
+                    for row in range(rows):
+                        solution_line = next(lines).lstrip(b'#').strip()
+                        for col in range(cols):
+                            if solution_line[col:col + 1] == CellState.BULB.encode():
+                                bulbs |= 1 << (row * cols + col)
+                    output.write(encode_puzzle(rows, cols, clues, bulbs))
+                    pending = None
+                continue
+            if not line.strip():
+                continue
+
+            if pending is not None:
+                output.write(encode_puzzle(*pending))
+            header = line.split()
+            rows, cols = int(header[0]), int(header[1])
+            clues = []
+            for _ in range(rows):
+                grid_line = next(lines)
+                clues += [int(grid_line[col:col + 1]) if grid_line[col:col + 1].isdigit() else -1
+                          for col in range(cols)]
+            pending = (rows, cols, clues)
+            count += 1
+
+        if pending is not None:
+            output.write(encode_puzzle(*pending))
+    return count
+
+
+def binary_to_text(binary_path, text_path):
+    """
+    Convert a binary puzzle file back to the text format, solutions as "# Solution" blocks
+    :param binary_path: Str - path of the binary file
+    :param text_path: Str - path of the text file to write, or "-" for stdout
+    :return: int - the number of puzzles converted
+    """
+    output = sys.stdout if text_path == '-' else open(text_path, 'w')
+    count = 0
+    for _, puzzle in iter_binary(binary_path):
+        output.write(puzzle_text(puzzle.rows, puzzle.cols, puzzle.clues(), puzzle.solution_bulbs()))
+        count += 1
+    if output is not sys.stdout:
+        output.close()
+    return count
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-o', action='store', dest='output', type=str)
+
+    arguments = arg_parser.parse_args(argv)
+    path = puzzle_path(arguments.file_name)
+
+    # The direction of the conversion follows the format of the input
+    if is_binary_file(path):
+        count = binary_to_text(path, arguments.output)
+    else:
+        count = text_to_binary(path, arguments.output)
+    print('Converted {} puzzles.'.format(count), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+from utils import *
+
+import hashlib
+import struct
+
+# Sidecar layout: magic, then (corpus size, corpus mtime_ns, number of puzzles), then one fixed-size record
+# per puzzle: (byte offset of its header line, rows, cols, 8-byte hash of its header and grid lines)
+INDEX_MAGIC = b'LUPIDX1\0'
+INDEX_HEADER = struct.Struct('<QqQ')
+INDEX_RECORD = struct.Struct('<QHH8s')
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def puzzle_hash(lines):
+    """
+    Content hash of a puzzle
+    :param lines: List[bytes] - its header line and grid lines, as they appear in the file
+    :return: bytes - 8 bytes
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for line in lines:
+        digest.update(line.rstrip(b'\r\n'))
+        digest.update(b'\n')
+    return digest.digest()
+
+
+def build_corpus_index(path):
+    """
+    Scan the corpus once and write its sidecar index next to it
+    :param path: Str - path of the corpus file
+    :return: List[(int, int, int, bytes)] - (offset, rows, cols, hash) of each puzzle
+    """
+    entries = []
+    with open(path, 'rb', buffering=1 << 20) as file:
+        offset = 0
+        line = file.readline()
+        while line:
+            if line[:1] == b'#' or not line.strip():
+                offset += len(line)
+                line = file.readline()
+                continue
+
+            header = line.split()
+            rows, cols = int(header[0]), int(header[1])
+            lines = [line]
+            for _ in range(rows):
+                lines.append(file.readline())
+            entries.append((offset, rows, cols, puzzle_hash(lines)))
+
+            offset += sum(len(puzzle_line) for puzzle_line in lines)
+            line = file.readline()
+
+    status = os.stat(path)
+    with open(index_path(path), 'wb') as file:
+        file.write(INDEX_MAGIC)
+        file.write(INDEX_HEADER.pack(status.st_size, status.st_mtime_ns, len(entries)))
+        for entry in entries:
+            file.write(INDEX_RECORD.pack(*entry))
+
+    return entries
+
+
+def load_corpus_index(path):
+    """
+    Return the index of the corpus, from its sidecar if that still matches the corpus' size and
+    modification time, else rebuilt (and rewritten). Records are checked against their hash when a puzzle is read.
+    :param path: Str - path of the corpus file
+    :return: List[(int, int, int, bytes)] - (offset, rows, cols, hash) of each puzzle
+    """
+    status = os.stat(path)
+    try:
+        with open(index_path(path), 'rb') as file:
+            data = file.read()
+    except OSError:
+        return build_corpus_index(path)
+
+    if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+        return build_corpus_index(path)
+    size, mtime_ns, count = INDEX_HEADER.unpack_from(data, len(INDEX_MAGIC))
+    start = len(INDEX_MAGIC) + INDEX_HEADER.size
+    if size != status.st_size or mtime_ns != status.st_mtime_ns or len(data) != start + count * INDEX_RECORD.size:
+        return build_corpus_index(path)
+
+    return [INDEX_RECORD.unpack_from(data, start + i * INDEX_RECORD.size) for i in range(count)]
+
+
+def read_indexed_lines(file, entry):
+    """
+    Read the header and grid lines of one puzzle at its offset, and check them against the hash of its record
+    :param file: the corpus, opened in binary mode
+    :param entry: (int, int, int, bytes) - the puzzle's record in the corpus index
+    :return: List[bytes] - its lines, or None if they do not hash to the record's (the index is stale)
+    """
+    offset, rows, cols, digest = entry
+    file.seek(offset)
+    lines = [file.readline() for _ in range(rows + 1)]
+    if puzzle_hash(lines) != digest:
+        return None
+    return lines
+
+
+def read_puzzle_at(path, number, entries=None):
+    """
+    Jump straight to one puzzle of the corpus, without parsing the ones before it
+    The puzzle is checked against the hash of its record: an index loaded here is rebuilt if it does not match
+    (the corpus changed but kept its size and modification time), a given one raises ValueError.
+    :param path: Str - path of the corpus file
+    :param number: int - the puzzle number, as in read_file / iter_puzzles
+    :param entries: the corpus index, loaded if None
+    :return: List[List[Cell]]
+    """
+    rebuild = entries is None
+    if rebuild:
+        entries = load_corpus_index(path)
+    with open(path, 'rb') as file:
+        lines = read_indexed_lines(file, entries[number])
+        if lines is None and rebuild:
+            entries = build_corpus_index(path)
+            lines = read_indexed_lines(file, entries[number])
+    if lines is None:
+        raise ValueError('stale index for {}: puzzle {} does not match its hash'.format(path, number))
+
+    for _, puzzle in parse_puzzle_lines(iter(lines), number):
+        return puzzle
+
+
+def shard_range(count, shard, shards):
+    """
+    The puzzle numbers [first, last) of one of `shards` even, contiguous shards of `count` puzzles
+    """
+    return count * shard // shards, count * (shard + 1) // shards
+
+
+def iter_shard(path, shard, shards, entries=None):
+    """
+    Yield the puzzles of one shard of the corpus, seeking straight to its first puzzle
+    Each puzzle is checked against the hash of its record, as in read_puzzle_at.
+    :param path: Str - path of the corpus file
+    :param shard: int - which shard, from 0 to shards - 1
+    :param shards: int - number of shards the corpus is split into
+    :param entries: the corpus index, loaded if None
+    :return: generator of (int, List[List[Cell]]) - the puzzle number in the whole corpus and the puzzle
+    """
+    rebuild = entries is None
+    if rebuild:
+        entries = load_corpus_index(path)
+    first, last = shard_range(len(entries), shard, shards)
+
+    with open(path, 'rb', buffering=1 << 20) as file:
+        for number in range(first, last):
+            lines = read_indexed_lines(file, entries[number])
+            if lines is None and rebuild:
+                entries = build_corpus_index(path)
+                rebuild = False
+                lines = read_indexed_lines(file, entries[number])
+            if lines is None:
+                raise ValueError('stale index for {}: puzzle {} does not match its hash'.format(path, number))
+
+            for _, puzzle in parse_puzzle_lines(iter(lines), number):
+                yield number, puzzle
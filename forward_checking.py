@@ -1,17 +1,35 @@
 from heuristics import *
-from queue import LifoQueue
-import numpy as np
+from BitboardState import *
+from SegmentIndex import map_mask, puzzle_clues
+from SearchContext import SearchContext
+from TranspositionTable import TranspositionTable
+from CellQueue import CellQueue
+from SearchBudget import SearchBudget
+from SearchStats import SearchStats
+from SolveResult import SolveResult
 
 import argparse
 import sys
 import random
 import time
 import copy
+import os
+import itertools
 
-node_count = 0
+use_propagation = True      # run BitboardState.propagate after every decision of the in-place search
+probe_limit = 0     # cells probed at each node of the in-place search, 0 to turn probing off
+use_backjumping = True      # record reasons, backjump and learn nogoods in the in-place search
+use_transposition = False   # hash the states of the in-place search and skip those known to fail
+transposition_slots = 1 << 16   # size of the transposition table of each search (8 bytes a slot)
+use_cell_queue = True       # pick cells from a CellQueue of live scores instead of scanning with select_next_cell
+use_components = True       # search the independent parts of a puzzle one after the other
+restart_policy = 'luby'     # node limits of the runs of solve_with_restarts: 'luby' or 'geometric'
+restart_base = 100      # node limit of the first run (the unit of the Luby sequence)
+restart_factor = 1.5    # growth of the node limit from one run to the next, with the geometric policy
+solution_cache = None       # a SolutionCache that solve_puzzle looks puzzles up in before searching, None for none
 
 
-def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuristic):
+def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuristic, index=None, budget=None):
 
     """
     :param puzzle: List[List[str]]
@@ -20,32 +38,29 @@ def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuris
     :param wall_cells: List[List[int]] - List of position [x,y] of each wall cell.
     :param deleted_empty_cell: stack(List[int]) - Stack of positions of empty cells that got deleted in the process
     :param heuristic: String - "H1", "H2", or "H3". To decide the heuristic
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
+    :param budget: SearchBudget - the limits of this search and its node count, a default one if None
     :return: The complete solution, or no solution if puzzle is not solvable
     """
 
-    global node_count
-    node_count += 1
+    if budget is None:
+        budget = SearchBudget()
+    spent = budget.spend()
+    if spent is not None:
+        return spent
 
-    # printing solving status
-
-    if node_count % 10000 == 0:
-        print('\rAlready processed {} nodes.'.format(node_count))
-
-    if node_count == 500000:
-        return 'Too many nodes. Timeout!'
-
-    if is_solved(puzzle):
+    if is_solved(puzzle, index):
         return puzzle
 
     next_potential_cells = []
 
     # Check input for the heuristic to use
     if heuristic == 'H1':
-        next_potential_cells = most_constrained_variable_heuristic(puzzle, empty_cells)  # Find most constrained
+        next_potential_cells = most_constrained_variable_heuristic(puzzle, empty_cells, index)  # Find most constrained
     elif heuristic == 'H2':
-        next_potential_cells = most_constraining_variable_heuristic(puzzle, empty_cells)  # Find most constraining
+        next_potential_cells = most_constraining_variable_heuristic(puzzle, empty_cells, index)  # Find most constraining
     elif heuristic == 'H3':
-        next_potential_cells = hybrid_heuristic(puzzle, empty_cells)  # Hybrid
+        next_potential_cells = hybrid_heuristic(puzzle, empty_cells, index)  # Hybrid
     else:
         print('\n*** ERROR *** Heuristic must be either "H1", "H2", or "H3".')
         return 'Abort!!'
@@ -79,7 +94,7 @@ def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuris
 
         temp_puzzle[row][col].set_cell_value(value)
 
-        domain_change(temp_puzzle, row, col, value)
+        domain_change(temp_puzzle, row, col, value, index)
 
         check_no_empty_domain = no_empty_domain(temp_puzzle, empty_cells)
         feasible_for_all_wall = check_wall_feasibility(temp_puzzle, wall_cells)
@@ -90,8 +105,9 @@ def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuris
         # print(feasible_for_all_wall)
         # print_puzzle(temp_puzzle)
 
-        if is_state_valid(temp_puzzle) and check_no_empty_domain and feasible_for_all_wall:
-            result = forward_checking(temp_puzzle, empty_cells, wall_cells, deleted_empty_cell, heuristic)
+        if is_state_valid(temp_puzzle, index) and check_no_empty_domain and feasible_for_all_wall:
+            result = forward_checking(temp_puzzle, empty_cells, wall_cells, deleted_empty_cell, heuristic, index,
+                                      budget)
             if result != 'backtrack' and result != 'failure':
                 return result
 
@@ -100,6 +116,644 @@ def forward_checking(puzzle, empty_cells, wall_cells, deleted_empty_cell, heuris
     return 'failure'
 
 
+def forward_checking_bitboard(state, empty_cells, heuristic, budget=None):
+
+    """
+    Same search as forward_checking, on a BitboardState instead of a grid of Cells.
+    Branching copies the state's few packed ints instead of deep-copying every Cell.
+    :param state: BitboardState - The current state of the puzzle
+    :param empty_cells: List[List[int]] - List of position [x,y] of each empty cell.
+    :param heuristic: String - "H1", "H2", or "H3". To decide the heuristic
+    :param budget: SearchBudget - the limits of this search and its node count, a default one if None
+    :return: The solved BitboardState, or a failure message
+    """
+
+    if budget is None:
+        budget = SearchBudget()
+    spent = budget.spend()
+    if spent is not None:
+        return spent
+
+    if state.is_solved():
+        return state
+
+    if heuristic == 'H1':
+        next_potential_cells = most_constrained_variable_heuristic(state, empty_cells, state.index)
+    elif heuristic == 'H2':
+        next_potential_cells = most_constraining_variable_heuristic(state, empty_cells, state.index)
+    elif heuristic == 'H3':
+        next_potential_cells = hybrid_heuristic(state, empty_cells, state.index)
+    else:
+        print('\n*** ERROR *** Heuristic must be either "H1", "H2", or "H3".')
+        return 'Abort!!'
+
+    if len(next_potential_cells) >= 1:
+        next_cell = next_potential_cells[random.randint(0, len(next_potential_cells) - 1)]
+    else:
+        return 'backtrack'
+
+    empty_cells.remove(next_cell)
+
+    row, col = next_cell[0], next_cell[1]
+
+    for value in state.get_cell_domain(row, col):
+
+        temp_state = state.copy()
+        temp_state.set_cell_value(row, col, value)
+        temp_state.domain_change(row, col, value)
+
+        if temp_state.is_state_valid() and temp_state.no_empty_domain(empty_cells) and temp_state.check_wall_feasibility():
+            result = forward_checking_bitboard(temp_state, empty_cells, heuristic, budget)
+            if result != 'backtrack' and result != 'failure':
+                return result
+
+    empty_cells.append(next_cell)
+    return 'failure'
+
+
+def forward_checking_in_place(state, heuristic, rng=random, depth=0, budget=None):
+
+    """
+    Same search as forward_checking_bitboard, but on a single BitboardState changed in place.
+    Every assignment and domain change is recorded on the state's undo trail, and a failed branch is
+    rolled back by undoing to the mark taken before it, so no state or list of empty cells is copied.
+    After each decision, BitboardState.propagate draws its forced consequences (see apply_decision).
+
+    If the state records reasons (see start_search), a failure also leaves its conflict set in
+    state.conflict. A node whose Bulb branch failed for reasons that do not involve its decision fails
+    at once without trying Empty (backjumping), and every conflict is learned as a nogood.
+    If the state keeps its Zobrist hash, a node already known to fail is not expanded again, however
+    the search got back to it, and every node that fails is stored in the transposition table.
+    :param state: BitboardState - The current state of the puzzle, with its trail enabled (after start_search)
+    :param heuristic: String - "H1", "H2", or "H3". To decide the heuristic
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param depth: int - the decision level of this node
+    :param budget: SearchBudget - the limits of this search and its node count, a default one if None
+    :return: The solved BitboardState, or a failure message
+    """
+
+    if budget is None:
+        budget = SearchBudget()
+    spent = budget.spend()
+    if spent is not None:
+        return spent
+    stats = state.stats
+    if stats is not None:
+        stats.enter(depth, state)
+
+    if goal_reached(state):
+        return state
+
+    if heuristic not in ('H1', 'H2', 'H3'):
+        print('\n*** ERROR *** Heuristic must be either "H1", "H2", or "H3".')
+        return 'Abort!!'
+
+    context = state.context
+    zobrist = state.zobrist
+    if zobrist is not None and context.transposition_table.contains(zobrist):
+        state.conflict = -1
+        return 'failure'
+
+    if context.probe_limit > 0:
+        if not probe(state, heuristic, depth):
+            record_failure(state, zobrist)
+            return 'failure'
+        if goal_reached(state):
+            return state
+
+    next_index = next_cell(state, heuristic, rng)
+    if next_index < 0:    # Every cell left can only stay empty, and the puzzle is still not solved
+        state.conflict = -1
+        record_failure(state, zobrist)
+        return 'backtrack'
+
+    row, col = next_index // state.cols, next_index % state.cols
+    level = 1 << depth
+    decision_cells = context.decision_cells
+    del decision_cells[depth:]
+    decision_cells.append(next_index)
+
+    reason = level
+    for value in (CellState.BULB, CellState.EMPTY):
+
+        mark = state.mark()
+        if apply_decision(state, row, col, value, reason):
+            result = forward_checking_in_place(state, heuristic, rng, depth + 1, budget)
+            if result != 'backtrack' and result != 'failure':
+                return result
+
+        state.undo_to(mark)
+        if stats is not None:
+            stats.backtracks += 1
+
+        if state.reasons is not None and value == CellState.BULB:
+            conflict = state.conflict
+            learn_nogood(state, conflict)
+            if not conflict & level:     # the decision played no part: jump back past this node
+                context.backjump_count += 1
+                record_failure(state, zobrist)
+                return 'failure'
+            reason = conflict & ~level  # Empty is not a decision, it follows from the rest of the conflict
+
+    record_failure(state, zobrist)
+    return 'failure'
+
+
+def forward_checking_iterative(state, heuristic, rng=random, stack=None, checkpoint_path=None,
+                               checkpoint_every=100000, budget=None):
+
+    """
+    Same search as forward_checking_in_place, but with its own stack of frames instead of one Python call
+    per decision, so the depth of the tree is not bounded by the recursion limit, and the search can be
+    saved to a checkpoint file and resumed (see resume_search).
+    A frame is one node of the current branch: [zobrist, bit index of its cell, its decision level, index
+    of the value being tried in (Bulb, Empty), reason of that value, trail mark taken before it].
+    :param state: BitboardState - The current state of the puzzle, with its trail enabled (after start_search)
+    :param heuristic: String - "H1", "H2", or "H3". To decide the heuristic
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param stack: List[list] - the frames of a search being resumed, None to start from the state's node
+    :param checkpoint_path: Str - file the search is saved to every checkpoint_every nodes, None for none
+    :param checkpoint_every: int
+    :param budget: SearchBudget - the limits of this search and its node count, a default one if None
+    :return: The solved BitboardState, or a failure message
+    """
+
+    if budget is None:
+        budget = SearchBudget()
+    values = (CellState.BULB, CellState.EMPTY)
+    stack = [] if stack is None else stack
+    context = state.context
+    decision_cells = context.decision_cells
+    decision_cells[:] = [frame[1] for frame in stack]
+    outcome = None      # None while the state is at a node still to visit, else what the last node left returned
+
+    while True:
+        if outcome is None:
+            if checkpoint_path is not None and budget.nodes > 0 and budget.nodes % checkpoint_every == 0:
+                save_checkpoint(checkpoint_path, state, heuristic, stack, rng, budget)
+
+            spent = budget.spend()
+            if spent is not None:
+                return spent
+            if state.stats is not None:
+                state.stats.enter(len(stack), state)
+            if goal_reached(state):
+                return state
+            if heuristic not in ('H1', 'H2', 'H3'):
+                print('\n*** ERROR *** Heuristic must be either "H1", "H2", or "H3".')
+                return 'Abort!!'
+
+            depth = len(stack)
+            zobrist = state.zobrist
+            if zobrist is not None and context.transposition_table.contains(zobrist):
+                state.conflict = -1
+                outcome = 'failure'
+                continue
+            if context.probe_limit > 0:
+                if not probe(state, heuristic, depth):
+                    record_failure(state, zobrist)
+                    outcome = 'failure'
+                    continue
+                if goal_reached(state):
+                    return state
+
+            next_index = next_cell(state, heuristic, rng)
+            if next_index < 0:
+                state.conflict = -1
+                record_failure(state, zobrist)
+                outcome = 'backtrack'
+                continue
+
+            del decision_cells[depth:]
+            decision_cells.append(next_index)
+            stack.append([zobrist, next_index, 1 << depth, 0, 1 << depth, state.mark()])
+
+        else:
+            if not stack:
+                return outcome
+            frame = stack[-1]
+            zobrist, _, level, value_index, _, mark = frame
+            state.undo_to(mark)
+            if state.stats is not None:
+                state.stats.backtracks += 1
+
+            if state.reasons is not None and value_index == 0:
+                conflict = state.conflict
+                learn_nogood(state, conflict)
+                if not conflict & level:
+                    context.backjump_count += 1
+                    record_failure(state, zobrist)
+                    stack.pop()
+                    outcome = 'failure'
+                    continue
+                frame[4] = conflict & ~level
+            frame[3] = value_index = value_index + 1
+            if value_index == len(values):
+                record_failure(state, zobrist)
+                stack.pop()
+                outcome = 'failure'
+                continue
+
+        _, position, _, value_index, reason, _ = stack[-1]
+        if apply_decision(state, position // state.cols, position % state.cols, values[value_index], reason):
+            outcome = None
+        else:
+            outcome = 'failure'
+
+
+def save_checkpoint(path, state, heuristic, stack, rng, budget):
+    """
+    Save a search of forward_checking_iterative: its state (with its trail, which the frames' marks point
+    into, and its SearchContext: what it learned so far, its counters and its settings), its stack, the state
+    of its random source and its node count
+    The file is written next to the old one and then renamed over it, so a crash never leaves half a checkpoint.
+    :param path: Str - path of the checkpoint file
+    :param budget: SearchBudget - its node count and limit are saved (the deadline and cancellation token
+                   belong to the run, not to the search)
+    """
+
+    checkpoint = {
+        'state': state,
+        'heuristic': heuristic,
+        'stack': stack,
+        'rng': rng.getstate(),
+        'nodes': budget.nodes,
+        'node_limit': budget.node_limit,
+    }
+    import pickle
+    stats, state.stats = state.stats, None     # the stats (and their trace file) belong to the run
+    try:
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        state.stats = stats
+    os.replace(path + '.tmp', path)
+
+
+def resume_search(path, rng=None, checkpoint_every=100000, budget=None, stats=None):
+    """
+    Carry on a search of forward_checking_iterative from its checkpoint file, with the settings and counters
+    it had (kept in its SearchContext, the module's settings are left alone): the search goes on exactly as it
+    would have without the interruption
+    :param path: Str - path of the checkpoint file
+    :param rng: random.Random - given the saved state of the random source, a new one if None
+    :param checkpoint_every: int - the search keeps saving itself to the same file
+    :param budget: SearchBudget - the deadline and cancellation token of this run, given the saved node
+                   count and limit; a new one if None
+    :param stats: SearchStats - counters of this run, None to leave it uninstrumented
+    :return: The solved BitboardState, or a failure message
+    """
+
+    import pickle
+    with open(path, 'rb') as file:
+        checkpoint = pickle.load(file)
+
+    budget = budget if budget is not None else SearchBudget()
+    budget.nodes = checkpoint['nodes']
+    budget.node_limit = checkpoint['node_limit']
+    rng = rng if rng is not None else random.Random()
+    rng.setstate(checkpoint['rng'])
+    state = checkpoint['state']
+    if stats is not None:
+        state.enable_stats(stats)
+    return forward_checking_iterative(state, checkpoint['heuristic'], rng, checkpoint['stack'],
+                                      path, checkpoint_every, budget)
+
+
+def goal_reached(state):
+    """
+    :param state: BitboardState
+    :return: bool - True if the puzzle is solved, or, while searching a single part of it, if that part is
+    """
+
+    if state.is_solved():
+        return True
+    component_goal = state.context.component_goal
+    if component_goal is None:
+        return False
+    unlit, walls = component_goal
+    wall_values = state.index.wall_values
+    return state.lit & unlit == unlit and all(state.wall_bulbs[wall_id] == wall_values[wall_id] for wall_id in walls)
+
+
+def solve_component(state, heuristic, component, rng=random, budget=None):
+    """
+    Search one part of the puzzle (see BitboardState.components) on its own: only its cells are decided, and
+    the search stops as soon as its unlit cells are lit and its walls satisfied. The other parts are left
+    as they are; on success, the part's decisions stay on the state.
+    :param state: BitboardState - The puzzle, after start_search
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param component: (int, int, List[int]) - the part, as returned by components()
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param budget: SearchBudget - the limits of the search and its node count, a default one if None
+    :return: The BitboardState with this part solved, or a failure message
+    """
+
+    others = enter_component(state, component)
+    try:
+        result = forward_checking_in_place(state, heuristic, rng, budget=budget)
+    finally:
+        leave_component(state, others)
+    return result
+
+
+def enter_component(state, component):
+    """
+    Restrict the search to one part of the puzzle: only its cells are left to decide, and goal_reached only
+    asks for its unlit cells to be lit and its walls satisfied
+    :return: int - the cells of the other parts that were left to decide, for leave_component
+    """
+
+    cells, unlit, walls = component
+    others = state.unassigned & ~cells
+    state.unassigned &= cells
+    if state.reasons is not None:
+        state.enable_reasons()      # what earlier parts decided is given from now on
+    state.context.nogoods.clear()
+    state.context.component_goal = (unlit, walls)
+    return others
+
+
+def leave_component(state, others):
+    """
+    Undo enter_component: the whole puzzle is searched again
+    """
+
+    state.context.component_goal = None
+    state.unassigned |= others
+
+
+def solve_by_components(state, heuristic, rng=random, budget=None):
+    """
+    Search the independent parts of the puzzle one after the other, so their search costs add up instead
+    of multiplying: no part's solution can make another part fail, so none is ever searched again
+    :param state: BitboardState - The puzzle, after start_search
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param budget: SearchBudget - the limits of the whole search (all parts together), a default one if None
+    :return: The solved BitboardState, or a failure message
+    """
+
+    if budget is None:
+        budget = SearchBudget()
+    if not use_components:
+        return forward_checking_in_place(state, heuristic, rng, budget=budget)
+    components = state.components()
+    if len(components) <= 1:
+        return forward_checking_in_place(state, heuristic, rng, budget=budget)
+
+    for component in components:
+        result = solve_component(state, heuristic, component, rng, budget)
+        if not isinstance(result, BitboardState):
+            return result
+    if not state.is_solved():
+        return 'failure'
+    return state
+
+
+def solve_with_restarts(state, heuristic, rng=random, budget=None, restarts=None):
+    """
+    Solve the state in runs of growing node limits, each with a fresh seed for the heuristic tie-breaks
+    A run that hits its limit is thrown away and the search starts over from the root with a new seed, so one
+    unlucky run of tie-breaks cannot hold the whole budget. The limits follow restart_policy: the Luby sequence
+    (1, 1, 2, 1, 1, 2, 4, ... times restart_base) or a geometric one (restart_base, times restart_factor each
+    run). The nogoods and failed states learned by a run still hold for the next ones and are kept.
+    A run that ends within its limit settles the puzzle: solved, or proven to have no solution.
+    :param state: BitboardState - The puzzle, after start_search
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param rng: random.Random - source of the seeds of the runs
+    :param budget: SearchBudget - the limits of all the runs together and their node count, a default one if None
+    :param restarts: List[dict] - the seed, node limit, nodes and outcome of each run are appended to it, if given
+    :return: The solved BitboardState, or a failure message
+    """
+
+    if budget is None:
+        budget = SearchBudget()
+    root = state.mark()
+    unassigned = state.unassigned
+    for run, limit in enumerate(restart_limits()):
+        if budget.node_limit is not None:
+            limit = min(limit, budget.node_limit - budget.nodes)
+        seed = rng.getrandbits(32)
+        run_budget = SearchBudget(limit, budget.deadline, budget.cancel)
+        result = solve_by_components(state, heuristic, random.Random(seed), run_budget)
+        budget.nodes += run_budget.nodes
+
+        outcome = 'solved' if isinstance(result, BitboardState) else result
+        if restarts is not None:
+            restarts.append({'seed': seed, 'node_limit': limit, 'nodes': run_budget.nodes, 'outcome': outcome})
+        if state.stats is not None:
+            state.stats.write('restart', run=run, seed=seed, node_limit=limit, outcome=outcome)
+        if budget.progress is not None:
+            budget.progress(budget.nodes)
+
+        if outcome != 'Too many nodes. Timeout!' or budget.nodes == budget.node_limit:
+            return result
+        state.undo_to(root)
+        state.unassigned = unassigned   # the trail saw it narrowed to the part a run stopped in
+
+
+def restart_limits():
+    """
+    :return: generator of int - the node limit of each run of solve_with_restarts, endless
+    """
+
+    limit = restart_base
+    run = 1
+    while True:
+        if restart_policy == 'luby':
+            yield restart_base * luby(run)
+        else:
+            yield int(limit)
+            limit *= restart_factor
+        run += 1
+
+
+def luby(i):
+    """
+    :param i: int - position in the Luby sequence, from 1
+    :return: int - 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def next_cell(state, heuristic, rng=random):
+    """
+    The next cell to decide: from the CellQueue of the state if its search uses one (made on first use), else
+    from a scan of its candidates
+    :return: int - bit index of the cell, or -1 if there is no candidate
+    """
+
+    stats = state.stats
+    context = state.context
+    if not context.use_cell_queue:
+        if stats is not None:
+            return stats.timed(heuristic, select_next_cell, state, heuristic, rng)
+        return select_next_cell(state, heuristic, rng)
+    cell_queue = context.cell_queue
+    if cell_queue is None or cell_queue.state is not state or cell_queue.heuristic != heuristic:
+        cell_queue = context.cell_queue = CellQueue(state, heuristic)
+    if stats is not None:
+        return stats.timed(heuristic, cell_queue.select, rng)
+    return cell_queue.select(rng)
+
+
+def record_failure(state, zobrist):
+    """
+    :param state: BitboardState - the state being searched, whose SearchContext holds the transposition table
+    :param zobrist: int - hash of a state with no solution, None if the search does not hash its states
+    """
+
+    if zobrist is not None:
+        state.context.transposition_table.store(zobrist)
+
+
+def learn_nogood(state, conflict):
+    """
+    Store the bulbs placed by the decisions of a conflict set as a nogood, in the SearchContext of the state
+    :param state: BitboardState - the state being searched
+    :param conflict: int - decision levels, -1 if unknown
+    """
+
+    nogoods = state.context.nogoods
+    if conflict <= 0 or conflict.bit_count() > nogoods.max_size:
+        return
+    decision_cells = state.context.decision_cells
+    nogood = 0
+    while conflict:
+        low = conflict & -conflict
+        nogood |= 1 << decision_cells[low.bit_length() - 1]
+        conflict ^= low
+    nogoods.add(nogood)
+
+
+def apply_decision(state, row, col, value, reason=0):
+    """
+    Assign a value to a cell of a BitboardState, propagate it, and check the state that results
+    :param state: BitboardState - The current state of the puzzle, changed in place
+    :param row: int
+    :param col: int
+    :param value: Str - CellState.BULB or CellState.EMPTY
+    :param reason: int - the decision levels behind this value, if the state records reasons
+    :return: bool - False if the branch is dead, its conflict set then in state.conflict
+    """
+
+    before = state.domain
+    before_bulbs = state.bulbs
+    state.set_cell_value(row, col, value, reason)
+    state.domain_change(row, col, value)
+
+    stats = state.stats
+    if stats is None:
+        valid = state.is_state_valid()
+    else:
+        valid = stats.timed('is_state_valid', state.is_state_valid)
+    if not valid:
+        state.conflict = -1
+        return False
+    if state.context.use_propagation:
+        changed = (before ^ state.domain) | (1 << (row * state.cols + col))
+        while changed:
+            if not state.propagate(changed):
+                return False
+            changed = 0
+            if state.reasons is not None and state.context.nogoods.nogoods:
+                alive, changed = state.context.nogoods.prune(state, state.bulbs & ~before_bulbs)
+                if not alive:
+                    return False
+    if stats is None:
+        consistent = state.is_state_valid() and state.no_empty_domain() and state.check_wall_feasibility()
+    else:
+        consistent = (stats.timed('is_state_valid', state.is_state_valid)
+                      and stats.timed('no_empty_domain', state.no_empty_domain)
+                      and stats.timed('check_wall_feasibility', state.check_wall_feasibility))
+    if not consistent:
+        state.conflict = -1
+        return False
+    return True
+
+
+def probe(state, heuristic, depth=0):
+    """
+    Failed-literal probing: try both values on the probe_limit best cells for the heuristic (the setting of the
+    search, see SearchContext), and when one value dies right away (after propagation), give the cell the other
+    value for good
+    The fixed values are on the trail, so they are undone with the rest of the node.
+    :param state: BitboardState - The current state of the puzzle, with its trail enabled
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param depth: int - the decision level of the node, which the probes borrow
+    :return: bool - False if a cell can take neither value; True otherwise, the state possibly solved by a probe
+    """
+
+    context = state.context
+    starting_time = time.perf_counter()
+    level = 1 << depth
+    alive = True
+
+    for position in ranked_cells(state, heuristic, context.probe_limit):
+        if not ((state.unassigned & state.domain) >> position) & 1:    # settled by an earlier probe
+            continue
+        row, col = position // state.cols, position % state.cols
+
+        failed_value = None
+        for value in (CellState.BULB, CellState.EMPTY):
+            context.probe_count += 1
+            mark = state.mark()
+            if not apply_decision(state, row, col, value, level):
+                failed_value = value
+            elif goal_reached(state):
+                context.probe_time += time.perf_counter() - starting_time
+                return True
+            state.undo_to(mark)
+            if failed_value is not None:
+                break
+
+        if failed_value is not None:
+            context.probe_fixes += 1
+            other_value = CellState.EMPTY if failed_value == CellState.BULB else CellState.BULB
+            if not apply_decision(state, row, col, other_value, state.conflict & ~level):
+                alive = False
+                break
+
+    context.probe_time += time.perf_counter() - starting_time
+    return alive
+
+
+def start_search(state, context=None):
+    """
+    Get a freshly built (and pre-processed) BitboardState ready for forward_checking_in_place: give it the
+    SearchContext of its search (with the module's settings as they are now), enable its trail, record reasons
+    if backjumping is on and hash it if the transposition table is on, and propagate it once
+    :param state: BitboardState
+    :param context: SearchContext - where the search keeps what it learns, cleared first; a new one if None
+    :return: bool - False if the puzzle is already known to have no solution
+    """
+
+    if context is None:
+        context = SearchContext()
+    else:
+        context.clear()     # nogoods and failed states only hold for the puzzle they came from
+    context.use_propagation = use_propagation
+    context.probe_limit = probe_limit
+    context.use_cell_queue = use_cell_queue
+    state.enable_search(context)
+    state.enable_trail()
+    if use_backjumping:
+        state.enable_reasons()
+    if use_transposition:
+        state.enable_hash()
+        if context.transposition_table is None:
+            context.transposition_table = TranspositionTable(transposition_slots)
+    if not use_propagation:
+        return True
+    return state.propagate(state.open_cells) and state.is_state_valid()
+
+
 def no_empty_domain(puzzle, empty_cells):
     """
     Check all empty cells' domain. Domains must have size > 0
@@ -155,7 +809,7 @@ def check_wall_feasibility(puzzle, wall_cells):
     return valid
 
 
-def preprocess_puzzle(puzzle, empty_cells, wall_cells, first_pre_process):
+def preprocess_puzzle(puzzle, empty_cells, wall_cells, first_pre_process, index=None):
     """
     # Pre-processing the given puzzle by placing bulb at sure-place
     # For each bulb that we place, correspondingly reduce the domain of related empty cells
@@ -164,154 +818,420 @@ def preprocess_puzzle(puzzle, empty_cells, wall_cells, first_pre_process):
     :param empty_cells: List[List[int]] - positions of empty cells
     :param wall_cells: List[List[int]] - positions of wall cells
     :param first_pre_process: bool - True if call method for the 1st time, False otherwise
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
     :return: int
     """
 
     directions = [(-1, 0), (1, 0), (0, 1), (0, -1)]
     change_count = 0
 
+    # Walls of number 0 go first, so that no other wall places a bulb next to one of them
+    if first_pre_process:
+        for position in wall_cells:
+            row = position[0]
+            col = position[1]
+            wall_value = int(puzzle[row][col].get_cell_value())
+
+            # If seeing a wall of number 0, reduce domain size of all empty walls around it
+            # (i.e. take bulb out of domain values)
+            if wall_value == 0:
+
+                for x_direct, y_direct in directions:
+                    x_temp, y_temp = row + x_direct, col + y_direct
+                    if is_in_bounds(puzzle, x_temp, y_temp):
+                        puzzle[x_temp][y_temp].remove_bulb_from_domain()
+
+                        # Cells that we cannot place bulb on are no longer considered "empty" for puzzle solving purpose
+                        if [x_temp, y_temp] in empty_cells:
+                            empty_cells.remove([x_temp, y_temp])
+
     for position in wall_cells:
         row = position[0]
         col = position[1]
         wall_value = int(puzzle[row][col].get_cell_value())
 
-        # If seeing a wall of number 0, reduce domain size of all empty walls around it
-        # (i.e. take bulb out of domain values)
-        if wall_value == 0 and first_pre_process:
-
-            for x_direct, y_direct in directions:
-                x_temp, y_temp = row + x_direct, col + y_direct
-                if is_in_bounds(puzzle, x_temp, y_temp):
-                    puzzle[x_temp][y_temp].remove_bulb_from_domain()
-
-                    # Cells that we cannot place bulb on are no longer considered "empty" for puzzle solving purpose
-                    if [x_temp, y_temp] in empty_cells:
-                        empty_cells.remove([x_temp, y_temp])
-
         # If the number of spots in which bulb can be placed matches wall value
         # we place bulbs around this wall
         # and increase number of changes made by 1
-        elif available_spots_match_wall_value(puzzle, row, col, wall_value) and wall_value_not_satisfy(puzzle, row, col):
-            place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value)
+        if wall_value > 0 and available_spots_match_wall_value(puzzle, row, col, wall_value) \
+                and wall_value_not_satisfy(puzzle, row, col):
+            place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value, index)
             change_count += 1
 
     return change_count
 
 
-# call necessary methods/algorithms to solve the puzzle as required.
-def solve_puzzle(puzzle, heuristic):
+def prepare_puzzle(puzzle):
     """
-    Given the puzzle and the chosen heuristic, return the solved puzzle if the puzzle is solvable
-    Else, return failure message
-    :param puzzle: List[List[Cell]] - The puzzle
-    :param heuristic: Str - The chosen heuristic, either "H1", "H2", or "H3"
-    :return: The solved puzzle, or the error message
+    Build the segment index of the puzzle and pre-process it until nothing changes
+    :param puzzle: List[List[Cell]] - The puzzle, changed in place
+    :return: (List[List[int]], List[List[int]], SegmentIndex) - the empty cells left, the walls, the index
     """
 
     empty_cells = get_empty_cells(puzzle)
 
     wall_cells = get_wall_cells(puzzle)
-    stack_of_empty_cells = LifoQueue(maxsize=len(puzzle)*len(puzzle))
-    changes_count = preprocess_puzzle(puzzle, empty_cells, wall_cells, True)
+    index = SegmentIndex(puzzle)    # Walls never move, so the lines of sight are computed once
+    changes_count = preprocess_puzzle(puzzle, empty_cells, wall_cells, True, index)
 
     while changes_count > 0:
-        changes_count = preprocess_puzzle(puzzle, empty_cells, wall_cells, False)
+        changes_count = preprocess_puzzle(puzzle, empty_cells, wall_cells, False, index)
 
-    if is_state_valid(puzzle):
-        print("puzzle after pre-processing")
-        print_puzzle(puzzle)
-        print("Chosen heuristic: {}.".format(heuristic))
-        return forward_checking(puzzle, empty_cells, wall_cells, stack_of_empty_cells, heuristic)
-    else:
+    return empty_cells, wall_cells, index
+
+
+def preprocess_state(state):
+    """
+    The pre-processing of prepare_puzzle, on a BitboardState built straight from the wall layout
+    Walls of number 0 take Bulb out of their neighbours' domains, then every wall with exactly as many
+    spots left as its value gets bulbs on all of them, until nothing changes.
+    :param state: BitboardState - The puzzle, changed in place
+    :return: int - the total number of changes made
+    """
+
+    for _, wall_value, neighbours in state.wall_cells:
+        if wall_value == 0:
+            state.domain &= ~neighbours
+            state.unassigned &= ~neighbours
+
+    change_count = 0
+    changes = 1
+    while changes > 0:
+        changes = 0
+        for wall_id, (_, wall_value, neighbours) in enumerate(state.wall_cells):
+            spots = state.domain & neighbours
+            if wall_value > 0 and spots.bit_count() == wall_value and state.wall_bulbs[wall_id] != wall_value:
+                spots &= ~state.bulbs
+                while spots:
+                    low = spots & -spots
+                    row, col = divmod(low.bit_length() - 1, state.cols)
+                    state.set_cell_value(row, col, CellState.BULB)
+                    state.domain_change(row, col, CellState.BULB)
+                    spots ^= low
+                changes += 1
+        change_count += changes
+
+    return change_count
+
+
+def prepare_state(puzzle):
+    """
+    Build the BitboardState of a puzzle straight from its walls, and pre-process it (see preprocess_state)
+    The Cell grid is only read for its clues: the search never works on it.
+    :param puzzle: List[List[Cell]] - The puzzle, left unchanged
+    :return: BitboardState - check is_state_valid before searching it
+    """
+
+    state = BitboardState(None, index=SegmentIndex.from_clues(len(puzzle), len(puzzle[0]), puzzle_clues(puzzle)))
+    preprocess_state(state)
+    return state
+
+
+def solve_state(state, heuristic, rng=random, budget=None):
+    """
+    Pre-process and search a BitboardState that was built without a Cell grid (see binary_format)
+    :param state: BitboardState - The puzzle, changed in place
+    :param heuristic: Str - The chosen heuristic, either "H1", "H2", or "H3"
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param budget: SearchBudget - the limits of the search and its node count, a default one if None
+    :return: The solved BitboardState, or the error message
+    """
+
+    preprocess_state(state)
+    if not state.is_state_valid():
         return "Failure: Puzzle not valid after pre_processing"
+    if not start_search(state):
+        return 'failure'
+    return solve_by_components(state, heuristic, rng, budget)
 
 
-def test_main():
-    file_name = "test.txt"
-    heuristic = "H1"
-    puzzle_dict = read_file(file_name)
-    for i in puzzle_dict.keys():
+def count_solutions(state, heuristic, limit=2, rng=random, budget=None, found=None):
+    """
+    Count the solutions of a puzzle, up to limit (see find_solutions)
+    :param found: List[int] - the bulbs of each solution found are appended to it, if given
+    :return: int - the number of solutions (limit if there are more), or the message of the budget if it ran
+             out first
+    """
 
-        # node_count = 0
-        puzzle = puzzle_dict[i]
+    solutions, spent = find_solutions(state, heuristic, limit, rng, budget)
+    if spent is not None:
+        return spent
+    if found is not None:
+        found.extend(solutions)
+    return len(solutions)
 
-        if i != 0:
-            print()
 
-        print('The puzzle is:')
-        print_puzzle(puzzle)
+def find_solutions(state, heuristic, limit=2, rng=random, budget=None):
+    """
+    Enumerate the solutions of a puzzle, stopping once limit of them are found
+    The independent parts of the puzzle (see BitboardState.components) are enumerated one at a time, and the
+    solutions of the puzzle are all the ways of putting theirs together: their costs add up instead of
+    multiplying, and a part without solution ends the count at 0. When the puzzle is searched whole, each
+    solution also brings in its images under the rotations and reflections that map the puzzle onto itself,
+    so a puzzle with a symmetry is known to have two solutions as soon as one that is not symmetric is found.
+    :param state: BitboardState - The puzzle, after start_search
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param limit: int - solutions wanted at most
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :param budget: SearchBudget - the limits of the search and its node count, a default one if None
+    :return: (List[int], Str) - the bulbs of each solution found, and None if these are all of them (or limit
+             of them), else the message of the budget that ran out
+    """
 
-        starting_time = time.time()
-        solution = solve_puzzle(puzzle, heuristic)
-        ending_time = time.time()
+    if budget is None:
+        budget = SearchBudget()
+    components = state.components() if use_components else []
+    if len(components) <= 1:
+        solutions = {}
+        spent = search_solutions(state, heuristic, limit, rng, budget, solutions, state.index.symmetries())
+        return list(solutions)[:limit], spent
+
+    given = state.bulbs
+    parts = []
+    for component in components:
+        solutions = {}
+        others = enter_component(state, component)
+        try:
+            spent = search_solutions(state, heuristic, limit, rng, budget, solutions)
+        finally:
+            leave_component(state, others)
+        if spent is not None:
+            return [], spent
+        if not solutions:
+            return [], None
+        parts.append([bulbs & ~given for bulbs in solutions])
+
+    combined = []
+    for choice in itertools.product(*parts):
+        bulbs = given
+        for part_bulbs in choice:
+            bulbs |= part_bulbs
+        combined.append(bulbs)
+        if len(combined) >= limit:
+            break
+    return combined, None
+
+
+def search_solutions(state, heuristic, limit, rng, budget, solutions, symmetries=()):
+    """
+    The in-place search, with the same propagation, but a solution only goes into solutions and the search
+    goes on to the next branch. A solved state has no cell left that could take a bulb, so each solved leaf
+    is a different solution.
+    :param state: BitboardState - The current state of the puzzle, with its trail enabled
+    :param limit: int - stop as soon as solutions holds this many
+    :param solutions: dict - the bulbs of the solutions found, as keys (an ordered set)
+    :param symmetries: List[List[int]] - permutations of the cells that map every solution onto a solution
+    :return: Str - the message of the budget if it ran out, None otherwise
+    """
 
-        print()
+    spent = budget.spend()
+    if spent is not None:
+        return spent
+
+    if goal_reached(state):
+        solutions[state.bulbs] = None
+        for permutation in symmetries:
+            solutions[map_mask(state.bulbs, permutation)] = None
+        return None
+
+    next_index = next_cell(state, heuristic, rng)
+    if next_index < 0:
+        return None
+
+    row, col = next_index // state.cols, next_index % state.cols
+    for value in (CellState.BULB, CellState.EMPTY):
+        mark = state.mark()
+        if apply_decision(state, row, col, value):
+            spent = search_solutions(state, heuristic, limit, rng, budget, solutions, symmetries)
+            if spent is not None:
+                state.undo_to(mark)
+                return spent
+        state.undo_to(mark)
+        if len(solutions) >= limit:
+            break
+    return None
 
-        if solution == 'Too many nodes. Timeout!':
-            print('Number of nodes processed is too high!! Timeout!\nIt took {} seconds.'.format(
-                ending_time - starting_time))
 
-        elif solution == 'stop':
-            print('Please retry!')
+# call necessary methods/algorithms to solve the puzzle as required.
+def solve_puzzle(puzzle, heuristic, engine='trail', node_limit=500000, time_limit=None, cancel=None, rng=random,
+                 stats=None, progress=None, context=None):
+    """
+    Given the puzzle and the chosen heuristic, solve the puzzle within the given budget
+    Every call counts its own nodes and keeps what its search learns in its own SearchContext, so solves running
+    side by side, in threads or not, do not share a counter, a nogood or a failed state.
+    If solution_cache is set, the puzzle (or a rotation or reflection of it) is looked up there first, and a final
+    answer (solved, failure or invalid) is stored there after the search.
+    :param puzzle: List[List[Cell]] - The puzzle
+    :param heuristic: Str - The chosen heuristic, either "H1", "H2", or "H3"
+    :param engine: Str - "trail" to search a BitboardState in place, "iterative" to do so without recursing,
+                   "restarts" to do so in runs that restart with a new seed (see solve_with_restarts),
+                   "bitboard" to search copies of it, "cell" to search on the Cell grid itself
+    :param node_limit: int - give up on reaching this many nodes, None for no limit
+    :param time_limit: float - give up after this many seconds, None for no deadline
+    :param cancel: callable - cancellation token: the search gives up once it returns True
+                   (e.g. the is_set of a threading.Event)
+    :param rng: random.Random - source of the heuristic tie-breaks of the in-place engines
+    :param stats: SearchStats - filled in with the counters of the search (all of them by the in-place engines,
+                  only the calls to domain_change by "bitboard", none by "cell"), None to leave it uninstrumented
+    :param progress: callable - called with the node count every 10000 nodes, e.g. SearchBudget.print_progress
+    :param context: SearchContext - given to the search by the in-place engines, to read its counters (probes,
+                    backjumps, transposition table) afterwards; a new one if None
+    :return: SolveResult - its status, the solved puzzle if any, the nodes visited and the seconds taken
+    """
+
+    starting_time = time.perf_counter()
+    if solution_cache is not None:
+        rows, cols, clues = len(puzzle), len(puzzle[0]), puzzle_clues(puzzle)
+        cached = solution_cache.lookup(rows, cols, clues)
+        if cached is not None:
+            status, bulbs = cached
+            if bulbs is None:
+                return SolveResult(status, None, 0, time.perf_counter() - starting_time)
+            return SolveResult.from_search(solved_cells(rows, cols, clues, bulbs), 0,
+                                           time.perf_counter() - starting_time)
+
+    budget = SearchBudget.within(node_limit, time_limit, cancel, progress)
+    if context is None:
+        context = SearchContext()
+    result = search_puzzle(puzzle, heuristic, engine, budget, rng, stats, context)
+    bulbs = None
+    if isinstance(result, BitboardState):
+        bulbs = result.bulbs
+        result = result.to_cells()
+    result = SolveResult.from_search(result, budget.nodes, time.perf_counter() - starting_time, stats)
+    if solution_cache is not None and result.status in SolveResult.FINAL:
+        if result.is_solved() and bulbs is None:
+            bulbs = sum(1 << (row * cols + col) for row in range(rows) for col in range(cols)
+                        if result.solution[row][col].is_bulb())
+        solution_cache.store(rows, cols, clues, result.status, bulbs)
+    if stats is not None:
+        stats.write('end', status=result.status, budget_nodes=result.nodes)
+    return result
+
+
+def solved_cells(rows, cols, clues, bulbs):
+    """
+    :return: List[List[Cell]] - the puzzle of these clues with these bulbs on it, the rest of it lit
+    """
+
+    state = BitboardState(None, index=SegmentIndex.from_clues(rows, cols, clues))
+    while bulbs:
+        low = bulbs & -bulbs
+        row, col = divmod(low.bit_length() - 1, cols)
+        state.set_cell_value(row, col, CellState.BULB)
+        state.domain_change(row, col, CellState.BULB)
+        bulbs ^= low
+    return state.to_cells()
 
-        elif solution == 'failure':
-            print('Fail to solve this puzzle. Seems like it\'s unsolvable!!')
 
+def search_puzzle(puzzle, heuristic, engine, budget, rng=random, stats=None, context=None):
+    """
+    Pre-process the puzzle and run the chosen engine on it
+    :param context: SearchContext - of the in-place engines' search, a new one if None
+    :return: The solved puzzle (List[List[Cell]] or BitboardState), or the error message
+    """
+
+    if engine == 'cell':
+        empty_cells, wall_cells, index = prepare_puzzle(puzzle)
+        if not is_state_valid(puzzle, index):
+            return "Failure: Puzzle not valid after pre_processing"
+        from queue import LifoQueue
+        stack_of_empty_cells = LifoQueue(maxsize=len(puzzle) * len(puzzle[0]))
+        return forward_checking(puzzle, empty_cells, wall_cells, stack_of_empty_cells, heuristic, index, budget)
+
+    # The other engines pre-process and search the bitboards: the grid is only parsed, and printed at the end
+    state = prepare_state(puzzle)
+    if not state.is_state_valid():
+        return "Failure: Puzzle not valid after pre_processing"
+    if stats is not None:
+        state.enable_stats(stats)
+    if engine == 'bitboard':
+        empty_cells = [[position // state.cols, position % state.cols] for position in range(state.rows * state.cols)
+                       if (state.unassigned >> position) & 1]
+        return forward_checking_bitboard(state, empty_cells, heuristic, budget)
+    if not start_search(state, context):
+        return 'failure'
+    if engine == 'iterative':
+        return forward_checking_iterative(state, heuristic, rng, budget=budget)
+    if engine == 'restarts':
+        return solve_with_restarts(state, heuristic, rng, budget)
+    return solve_by_components(state, heuristic, rng, budget)
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str, default='-')
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+    arg_parser.add_argument('-f', action='store', dest='format', type=str, default='grid')
+    arg_parser.add_argument('-e', action='store', dest='engine', type=str, default='trail')
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-t', action='store', dest='time_limit', type=float, default=None)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+
+    arguments = arg_parser.parse_args(argv)
+    if arguments.format == 'json':
+        import json     # only the JSON output needs it, and it is a good part of the start-up time
+    rng = random.Random(arguments.seed)
+    output = sys.stdout
+
+    # binary_format imports this module: run as a script, let it find this copy instead of loading a second one
+    sys.modules.setdefault('forward_checking', sys.modules[__name__])
+    from binary_format import is_binary_file, iter_binary
+
+    path = puzzle_path(arguments.file_name)
+    binary = is_binary_file(path)
+    if binary:
+        puzzles = iter_binary(path)
+    else:
+        puzzles = iter_puzzles(path)
+
+    # Puzzles are read, solved and written one at a time, each with a single write
+    for i, puzzle in puzzles:
+        if binary:
+            # as batch.py does: search the packed puzzle's state, the Cells are only built to print them
+            rows, cols = puzzle.rows, puzzle.cols
+            text = '' if arguments.format == 'json' else 'Puzzle {} ({}x{}):\n{}'.format(
+                i, rows, cols, grid_text(puzzle.to_cells()))
+            starting_time = time.perf_counter()
+            budget = SearchBudget.within(arguments.node_limit, arguments.time_limit)
+            solution = solve_state(puzzle.state(), arguments.heuristic, rng, budget)
+            if isinstance(solution, BitboardState):
+                solution = solution.to_cells()
+            result = SolveResult.from_search(solution, budget.nodes, time.perf_counter() - starting_time)
+        else:
+            rows, cols = len(puzzle), len(puzzle[0])
+            text = '' if arguments.format == 'json' else 'Puzzle {} ({}x{}):\n{}'.format(
+                i, rows, cols, grid_text(puzzle))
+            result = solve_puzzle(puzzle, arguments.heuristic, arguments.engine, arguments.node_limit,
+                                  arguments.time_limit, rng=rng)
+
+        if arguments.format == 'json':
+            record = {'puzzle': i, 'rows': rows, 'cols': cols, 'heuristic': arguments.heuristic,
+                      'status': result.status, 'nodes': result.nodes, 'seconds': result.elapsed}
+            if result.is_solved():
+                record['solution'] = [''.join(cell.get_cell_value() for cell in row) for row in result.solution]
+            text = json.dumps(record) + '\n'
         else:
-            print('*** Done! ***\nThe solution is printed out below:')
-            print_puzzle(solution)
-            print("The puzzle was solved in {} seconds.".format(ending_time - starting_time))
-        print('Visited {} nodes.'.format(node_count))
-
-
-test_main()
-
-# receive input, process input and call necessary methods to solve the puzzle.
-# def main(argv=None):
-#
-#     if argv is None:
-#         argv = sys.argv[1:]
-#
-#         arg_parser = argparse.ArgumentParser(add_help=False)
-#         arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
-#         arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
-#
-#         arguments = arg_parser.parse_args(argv)
-#         file_name = arguments.file_name
-#         heuristic = arguments.heuristic
-#         puzzle_dict = read_file(file_name)
-#
-#         for i in puzzle_dict.keys():
-#
-#             #node_count = 0
-#             puzzle = puzzle_dict[i]
-#
-#             if i != 0:
-#                 print()
-#
-#             print('The puzzle is:')
-#             print_puzzle(puzzle)
-#
-#             starting_time = time.time()
-#             solution = solve_puzzle(puzzle, heuristic)
-#             ending_time = time.time()
-#
-#             print()
-#
-#             if solution == 'Too many nodes. Timeout!':
-#                 print('Number of nodes processed is too high!! Timeout!\nIt took {} seconds.'.format(ending_time - starting_time))
-#
-#             elif solution == 'stop':
-#                 print('Please retry!')
-#
-#             elif solution == 'failure':
-#                 print('Fail to solve this puzzle. Seems like it\'s unsolvable!!')
-#
-#             else:
-#                 print('*** Done! ***\nThe solution is printed out below:')
-#                 print_puzzle(solution)
-#                 print("The puzzle was solved in {} seconds.".format(ending_time - starting_time))
-#             print('Visited {} nodes.'.format(node_count))
-#
-# if __name__ == '__main__':
-#     main()
\ No newline at end of file
+            if result.status == SolveResult.NODE_LIMIT:
+                text += 'Number of nodes processed is too high!! Timeout!\n'
+            elif result.status == SolveResult.FAILURE:
+                text += 'Fail to solve this puzzle. Seems like it\'s unsolvable!!\n'
+            elif result.is_solved():
+                text += '*** Done! ***\nThe solution is printed out below:\n' + grid_text(result.solution)
+            else:
+                text += result.message + '\n'
+            text += 'Visited {} nodes in {:.4f} seconds.\n\n'.format(result.nodes, result.elapsed)
+        try:
+            output.write(text)
+            output.flush()
+        except BrokenPipeError:     # the reader is gone (e.g. piped into head): stop quietly
+            os.dup2(os.open(os.devnull, os.O_WRONLY), output.fileno())
+            return
+
+
+if __name__ == '__main__':
+    main()
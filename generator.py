@@ -0,0 +1,162 @@
+import forward_checking as fc
+from forward_checking import *
+
+
+def plant_solution(index, walls, wanted_walls, rng):
+    """
+    Place bulbs on the open cells of a wall layout until every open cell is lit, no two bulbs seeing each other
+    Cells are taken in random order, the neighbours of the wanted walls first and those of the other walls
+    last, so that the wanted walls end up with bulbs around them and the others mostly without.
+    :param index: SegmentIndex - line-of-sight index of the layout
+    :param walls: int - bitboard of the walls
+    :param wanted_walls: int - bitboard of the walls that should get bulbs
+    :param rng: random.Random
+    :return: int - bitboard of the bulbs
+    """
+
+    first, middle, last = [], [], []
+    for position in range(index.rows * index.cols):
+        if (walls >> position) & 1:
+            continue
+        around = 0
+        for other in index.neighbours[position]:
+            around |= 1 << other
+        if around & wanted_walls:
+            first.append(position)
+        elif around & walls:
+            last.append(position)
+        else:
+            middle.append(position)
+    for cells in (first, middle, last):
+        rng.shuffle(cells)
+
+    return light_remaining(index, walls, 0, first + middle + last)
+
+
+def light_remaining(index, walls, bulbs, order):
+    """
+    Add bulbs, in the given order of cells, to every cell still unlit
+    :return: int - bitboard of the bulbs
+    """
+
+    lit = 0
+    low_bulbs = bulbs
+    while low_bulbs:
+        low = low_bulbs & -low_bulbs
+        lit |= low | index.sight[low.bit_length() - 1]
+        low_bulbs ^= low
+    for position in order:
+        if not ((walls | lit) >> position) & 1:
+            bulbs |= 1 << position
+            lit |= (1 << position) | index.sight[position]
+    return bulbs
+
+
+def wall_clues(index, walls, bulbs):
+    """
+    :return: List[int] - the clues of the layout: each wall numbered by the bulbs around it, -1 for open cells
+    """
+
+    return [sum(1 for other in index.neighbours[position] if (bulbs >> other) & 1) if (walls >> position) & 1
+            else -1 for position in range(index.rows * index.cols)]
+
+
+def count_puzzle_solutions(rows, cols, clues, limit=2, node_limit=200000, found=None):
+    """
+    Count the solutions of a puzzle with the solver, up to limit
+    :param found: List[int] - the bulbs of each solution found are appended to it, if given
+    :return: int - the number of solutions (limit if there are more), or the message of the budget if it ran out
+    """
+
+    state = BitboardState(None, index=SegmentIndex.from_clues(rows, cols, clues))
+    preprocess_state(state)
+    if not state.is_state_valid() or not start_search(state):
+        return 0
+    return fc.count_solutions(state, 'H1', limit, random.Random(0), SearchBudget(node_limit), found)
+
+
+def generate_puzzle(rows, cols, wall_density=0.2, clue_density=0.5, rng=random, unique=False, node_limit=200000,
+                    attempts=50):
+    """
+    Generate a solvable puzzle: lay walls at random, plant a solution on it, then number the walls after it
+    With unique, the solver counts the solutions; while there is a second one, a cell where it puts a bulb
+    that the planted solution does not is turned into a wall, the planted solution is completed for the cells
+    that wall now hides, and the walls are numbered again. Each round rules out at least that second solution.
+    :param rows: int
+    :param cols: int
+    :param wall_density: float - share of the cells that are walls
+    :param clue_density: float - share of the walls meant to get a non-zero number (every wall is numbered
+                         in this format; the walls numbered 0 only forbid bulbs around them)
+    :param rng: random.Random
+    :param unique: bool - only return a puzzle whose solution is unique
+    :param node_limit: int - node budget of each uniqueness check
+    :param attempts: int - rounds of the uniqueness repair before starting over with a new layout
+    :return: (List[int], int) - the clues (a wall's value, or -1 for an open cell) and the bulbs of the solution
+    """
+
+    size = rows * cols
+    while True:
+        walls = 0
+        wanted_walls = 0
+        for position in range(size):
+            if rng.random() < wall_density:
+                walls |= 1 << position
+                if rng.random() < clue_density:
+                    wanted_walls |= 1 << position
+        index = SegmentIndex.from_clues(rows, cols, [0 if (walls >> position) & 1 else -1 for position in range(size)])
+        bulbs = plant_solution(index, walls, wanted_walls, rng)
+        clues = wall_clues(index, walls, bulbs)
+        if not unique:
+            return clues, bulbs
+
+        for _ in range(attempts):
+            found = []
+            count = count_puzzle_solutions(rows, cols, clues, 2, node_limit, found)
+            if count == 1:
+                return clues, bulbs
+            if not isinstance(count, int) or count == 0:
+                break
+            other = next(solution for solution in found if solution != bulbs)
+            extra = other & ~bulbs
+            position = rng.choice([p for p in range(size) if (extra >> p) & 1])
+            walls |= 1 << position
+            index = SegmentIndex.from_clues(rows, cols, [0 if (walls >> p) & 1 else -1 for p in range(size)])
+            order = [p for p in range(size) if not ((walls | bulbs) >> p) & 1]
+            rng.shuffle(order)
+            bulbs = light_remaining(index, walls, bulbs, order)
+            clues = wall_clues(index, walls, bulbs)
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-r', action='store', dest='sizes', type=str, default='10')
+    arg_parser.add_argument('-c', action='store', dest='cols', type=int, default=None)
+    arg_parser.add_argument('-n', action='store', dest='count', type=int, default=1)
+    arg_parser.add_argument('-w', action='store', dest='wall_density', type=float, default=0.2)
+    arg_parser.add_argument('-d', action='store', dest='clue_density', type=float, default=0.5)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+    arg_parser.add_argument('-u', action='store_true', dest='unique')
+    arg_parser.add_argument('-N', action='store', dest='node_limit', type=int, default=200000)
+    arg_parser.add_argument('-o', action='store', dest='output', type=str, default='-')
+
+    arguments = arg_parser.parse_args(argv)
+    rng = random.Random(arguments.seed)
+    output = sys.stdout if arguments.output == '-' else open(arguments.output, 'w')
+
+    # -r takes a comma-separated list of sizes, so one file can hold a whole scaling series
+    for rows in [int(size) for size in arguments.sizes.split(',')]:
+        cols = arguments.cols or rows
+        for _ in range(arguments.count):
+            clues, bulbs = generate_puzzle(rows, cols, arguments.wall_density, arguments.clue_density, rng,
+                                           arguments.unique, arguments.node_limit)
+            output.write(puzzle_text(rows, cols, clues, bulbs))
+    if output is not sys.stdout:
+        output.close()
+
+
+if __name__ == '__main__':
+    main()
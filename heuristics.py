@@ -1,14 +1,17 @@
 from utils import *
+import heapq
+import random
 
 
-def most_constraining_variable_heuristic(curr_state, list_of_empty_cells):
+def most_constraining_variable_heuristic(curr_state, list_of_empty_cells, index=None):
     """
     The most constraining cell: the cell that causes most reduction in options for other cells.
     Found the most constraining cell by counting the number of cell a given cell can light up.
     Given the puzzle's current state and a list of empty cells, return the most constraining cell(s).
 
-    :param curr_state: List[List[Cell]] - Current state of the puzzle
+    :param curr_state: List[List[Cell]] or BitboardState - Current state of the puzzle
     :param list_of_empty_cells: List[List[int]] - List of positions of empty cells
+    :param index: SegmentIndex - precomputed scores of the puzzle (required for a BitboardState)
     :return: List[List[int]] - List of position(s) of most constraining cell(s)
     """
 
@@ -17,7 +20,7 @@ def most_constraining_variable_heuristic(curr_state, list_of_empty_cells):
 
     for position in list_of_empty_cells:
         row, col = position[0], position[1]
-        potential_cells_lighten_up = num_cells_lighten(curr_state, row, col) # Count potential lighten cells
+        potential_cells_lighten_up = num_cells_lighten(curr_state, row, col, index) # Count potential lighten cells
         if potential_cells_lighten_up > max_count:
             most_constraining_cells = [position]
             max_count = potential_cells_lighten_up
@@ -27,14 +30,15 @@ def most_constraining_variable_heuristic(curr_state, list_of_empty_cells):
     return most_constraining_cells
 
 
-def most_constrained_variable_heuristic(curr_state, list_of_empty_cells):
+def most_constrained_variable_heuristic(curr_state, list_of_empty_cells, index=None):
     """
     Find most constrained: Select the cell/node with the least remaining options as the next move based on:
         + The number of walls surrounding the cell.
         + If the cell is on and edge, or in a corner.
 
-    :param curr_state: List[List[Cell]] - Current state of the puzzle
+    :param curr_state: List[List[Cell]] or BitboardState - Current state of the puzzle
     :param list_of_empty_cells: List[List[int]] - List of positions of empty cells
+    :param index: SegmentIndex - precomputed scores of the puzzle (required for a BitboardState)
     :return: List[List[int]] - List of position(s) of most constrained cell(s)
     """
 
@@ -43,33 +47,117 @@ def most_constrained_variable_heuristic(curr_state, list_of_empty_cells):
 
     for position in list_of_empty_cells:
         row, col = position[0], position[1]
-        adjacent_walls = count_adjacent_walls(curr_state, row, col) # Count the # of walls around a cell
-        location_constraints = edge_corner_constraints(curr_state, row, col)  # check the location constraints
+        adjacent_walls = count_adjacent_walls(curr_state, row, col, index) # Count the # of walls around a cell
+        location_constraints = edge_corner_constraints(curr_state, row, col, index)  # check the location constraints
 
         constrained_index = adjacent_walls + location_constraints
 
         if max_constrained < constrained_index:
             most_constrained_cells = [position]
+            max_constrained = constrained_index
         elif max_constrained == constrained_index:
             most_constrained_cells.append(position)
 
     return most_constrained_cells
 
 
-def hybrid_heuristic(curr_state, list_of_empty_cells):
+def hybrid_heuristic(curr_state, list_of_empty_cells, index=None):
     """
     Get The list of candidate(s) by:
         + Applying most_constrained_variable heuristic first,
         + then apply most_constraining_variable heuristic on the result to get the final list.
 
-    :param curr_state: List[List[Cell]] - Current state of the puzzle
+    :param curr_state: List[List[Cell]] or BitboardState - Current state of the puzzle
     :param list_of_empty_cells: List[List[int]] - List of positions of empty cells
+    :param index: SegmentIndex - precomputed scores of the puzzle (required for a BitboardState)
     :return: List[List[int]] - List of cells to choose next
     """
 
-    candidate_cells = most_constrained_variable_heuristic(curr_state, list_of_empty_cells)
+    candidate_cells = most_constrained_variable_heuristic(curr_state, list_of_empty_cells, index)
 
     if len(candidate_cells) > 1:
-        candidate_cells = most_constraining_variable_heuristic(curr_state, candidate_cells)
+        candidate_cells = most_constraining_variable_heuristic(curr_state, candidate_cells, index)
 
     return candidate_cells
+
+
+def select_next_cell(state, heuristic, rng=random):
+    """
+    Pick the next cell to assign straight from the unassigned bits of a BitboardState, scoring cells like
+    the heuristics above:
+        + H1: number of adjacent walls + edge/corner constraints (most constrained)
+        + H2: number of cells a bulb there could light up (most constraining)
+        + H3: H1 first, then H2 to break ties (hybrid)
+    Only cells that can still take a bulb are candidates; the others can only stay empty.
+    Ties are broken uniformly at random without building a list of candidates.
+
+    :param state: BitboardState - Current state of the puzzle
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param rng: random.Random - source of the tie-breaks
+    :return: int - bit index of the chosen cell, or -1 if there is no candidate
+    """
+
+    adjacent_walls = state.index.adjacent_walls
+    edge_constraints = state.index.edge_constraints
+    visible_count = state.index.visible_count
+
+    best_index = -1
+    best_score = -1
+    ties = 0
+    candidates = state.unassigned & state.domain
+
+    while candidates:
+        low = candidates & -candidates
+        position = low.bit_length() - 1
+        candidates ^= low
+
+        if heuristic == 'H1':
+            score = adjacent_walls[position] + edge_constraints[position]
+        elif heuristic == 'H2':
+            score = visible_count[position]
+        else:
+            # H1 score first, the visible count (always < 4 * rows * cols) breaks ties
+            score = (adjacent_walls[position] + edge_constraints[position]) * 4 * len(visible_count) + visible_count[position]
+
+        if score > best_score:
+            best_index = position
+            best_score = score
+            ties = 1
+        elif score == best_score:
+            ties += 1
+            if rng.randint(1, ties) == 1:
+                best_index = position
+
+    return best_index
+
+
+def ranked_cells(state, heuristic, count):
+    """
+    The `count` best candidate cells of a BitboardState for the heuristic, best first (same scores as
+    select_next_cell, ties kept in bit order)
+
+    :param state: BitboardState - Current state of the puzzle
+    :param heuristic: String - "H1", "H2", or "H3"
+    :param count: int - number of cells to return at most
+    :return: List[int] - bit indices of the cells
+    """
+
+    adjacent_walls = state.index.adjacent_walls
+    edge_constraints = state.index.edge_constraints
+    visible_count = state.index.visible_count
+
+    def score(position):
+        if heuristic == 'H1':
+            return adjacent_walls[position] + edge_constraints[position]
+        if heuristic == 'H2':
+            return visible_count[position]
+        return (adjacent_walls[position] + edge_constraints[position]) * 4 * len(visible_count) + visible_count[position]
+
+    positions = []
+    candidates = state.unassigned & state.domain
+    while candidates:
+        low = candidates & -candidates
+        positions.append(low.bit_length() - 1)
+        candidates ^= low
+
+    return heapq.nlargest(count, positions, key=score)
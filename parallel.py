@@ -0,0 +1,271 @@
+import forward_checking as fc
+from forward_checking import *
+from multiprocessing import Process, Queue, Value
+from concurrent.futures import ProcessPoolExecutor
+
+import os
+
+
+def split_search(state, heuristic, split_depth, rng):
+    """
+    Expand the top split_depth levels of the in-place search tree and cut it into independent subproblems
+    A subproblem is the partial assignment leading to one open node; replaying it on the pre-processed state
+    gives that node back, with its reduced set of unassigned cells.
+    :param state: BitboardState - The pre-processed puzzle, with its trail enabled (left unchanged)
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param split_depth: int - number of decisions in each subproblem
+    :param rng: random.Random - source of the heuristic tie-breaks
+    :return: (List[List[(int, str)]], BitboardState) - the subproblems in search order, and a solved state
+             if the top of the tree already holds a solution (None otherwise)
+    """
+
+    subproblems = []
+    assignments = []
+
+    def expand(depth):
+        if state.is_solved():
+            return state.copy()
+        if depth == split_depth:
+            subproblems.append(list(assignments))
+            return None
+
+        next_index = next_cell(state, heuristic, rng)
+        if next_index < 0:
+            return None
+        row, col = next_index // state.cols, next_index % state.cols
+
+        for value in (CellState.BULB, CellState.EMPTY):
+            mark = state.mark()
+            if apply_decision(state, row, col, value):
+                assignments.append((next_index, value))
+                solution = expand(depth + 1)
+                assignments.pop()
+                if solution is not None:
+                    state.undo_to(mark)
+                    return solution
+            state.undo_to(mark)
+        return None
+
+    return subproblems, expand(0)
+
+
+def search_worker(state, heuristic, tasks, results, best, seed, node_limit):
+    """
+    Worker process: take subproblems off the shared queue until it yields None
+    Replay each one on the state, search it in place, report the outcome and undo back to the shared root.
+    A subproblem is given up (or skipped) as soon as a lower-numbered one is known to be solved.
+    :param state: BitboardState - The pre-processed puzzle, with its trail enabled
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param tasks: Queue - of (int, List[(int, str)]) subproblems, then None
+    :param results: Queue - of (task id, status, solution grid or None, nodes)
+    :param best: Value - lowest id of a solved subproblem so far
+    :param seed: int - the tie-breaks of subproblem i are seeded with seed + i
+    :param node_limit: int - node budget of each subproblem
+    """
+
+    current = [0]
+    cancel = lambda: best.value < current[0]
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, assignments = task
+        current[0] = task_id
+        if best.value < task_id:
+            results.put((task_id, 'Cancelled.', None, 0))
+            continue
+
+        # the replayed decisions count as given, so what the last subproblem learnt must not prune them
+        state.context.clear()
+        mark = state.mark()
+        replayed = all(apply_decision(state, position // state.cols, position % state.cols, value)
+                       for position, value in assignments)
+        if not replayed:
+            state.undo_to(mark)
+            results.put((task_id, 'failure', None, 0))
+            continue
+
+        budget = SearchBudget(node_limit, cancel=cancel)
+        result = fc.forward_checking_in_place(state, heuristic, random.Random(seed + task_id), budget=budget)
+
+        if isinstance(result, BitboardState):
+            with best.get_lock():
+                if task_id < best.value:
+                    best.value = task_id
+            results.put((task_id, 'solved', result.to_cells(), budget.nodes))
+        else:
+            results.put((task_id, result, None, budget.nodes))
+        state.undo_to(mark)
+
+
+def solve_parallel(puzzle, heuristic, workers=None, split_depth=6, seed=0, deterministic=False, node_limit=500000):
+    """
+    Solve a single puzzle with several processes: split the top of the search tree into subproblems,
+    let idle workers pull them from a shared queue, and cancel the rest once a solution is found.
+    In deterministic mode the answer is the solution of the lowest-numbered solvable subproblem, so it is
+    the same for every run with the same seed, split depth and worker count, whatever the timing of the workers
+    (subproblem i breaks its ties with Random(seed + i): it is not what a sequential run with the seed returns).
+    :param puzzle: List[List[Cell]] - The puzzle
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param workers: int - number of worker processes, one per core if None
+    :param split_depth: int - number of top-level decisions per subproblem
+    :param seed: int - seed of the heuristic tie-breaks
+    :param deterministic: bool - wait for lower-numbered subproblems instead of taking the first solution
+    :param node_limit: int - node budget of each subproblem
+    :return: (solved puzzle or error message, dict of stats)
+    """
+
+    workers = workers or os.cpu_count() or 1
+    stats = {'subproblems': 0, 'nodes': 0, 'winner': None}
+
+    state = prepare_state(puzzle)
+    if not state.is_state_valid():
+        return "Failure: Puzzle not valid after pre_processing", stats
+
+    if not start_search(state):
+        return 'failure', stats
+    subproblems, solution = split_search(state, heuristic, split_depth, random.Random(seed))
+    stats['subproblems'] = len(subproblems)
+    if solution is not None:
+        return solution.to_cells(), stats
+    if not subproblems:
+        return 'failure', stats
+
+    tasks = Queue()
+    results = Queue()
+    best = Value('i', len(subproblems))
+    for task_id, assignments in enumerate(subproblems):
+        tasks.put((task_id, assignments))
+    for _ in range(workers):
+        tasks.put(None)
+
+    processes = [Process(target=search_worker, args=(state, heuristic, tasks, results, best, seed, node_limit))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    solved = {}
+    outcome = 'failure'
+    for _ in range(len(subproblems)):
+        task_id, status, grid, nodes = results.get()
+        stats['nodes'] += nodes
+        if status == 'solved':
+            solved[task_id] = grid
+            if not deterministic:
+                best.value = -1     # cancel every other subproblem
+        elif status != 'failure' and status != 'Cancelled.':
+            outcome = status
+
+    for process in processes:
+        process.join()
+
+    if not solved:
+        return outcome, stats
+    if deterministic:
+        stats['winner'] = min(solved)
+    else:
+        stats['winner'] = next(iter(solved))
+    return solved[stats['winner']], stats
+
+
+def component_worker(state, heuristic, component, seed, node_limit):
+    """
+    Worker process: solve one part of the puzzle on the worker's own copy of the state
+    :return: (int or Str, int) - the bulbs of the solved state (or the failure message), and the nodes visited
+    """
+
+    budget = SearchBudget(node_limit)
+    result = fc.solve_component(state, heuristic, component, random.Random(seed), budget)
+    if isinstance(result, BitboardState):
+        return result.bulbs, budget.nodes
+    return result, budget.nodes
+
+
+def solve_components_parallel(puzzle, heuristic, workers=None, seed=0, node_limit=500000):
+    """
+    Solve the independent parts of a puzzle (see BitboardState.components) in separate processes and merge
+    their bulbs: no part's solution can clash with another's, so the merged state is a solution as soon as
+    every part has one
+    :param puzzle: List[List[Cell]] - The puzzle
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param workers: int - number of worker processes, one per core if None
+    :param seed: int - seed of the heuristic tie-breaks
+    :param node_limit: int - node budget of each part
+    :return: (solved puzzle or error message, dict of stats)
+    """
+
+    workers = workers or os.cpu_count() or 1
+    stats = {'components': 0, 'nodes': 0}
+
+    state = prepare_state(puzzle)
+    if not state.is_state_valid():
+        return "Failure: Puzzle not valid after pre_processing", stats
+
+    if not start_search(state):
+        return 'failure', stats
+    components = state.components()
+    stats['components'] = len(components)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(component_worker, state, heuristic, component, seed, node_limit)
+                   for component in components]
+        outcomes = [future.result() for future in futures]
+
+    for bulbs, nodes in outcomes:
+        stats['nodes'] += nodes
+        if not isinstance(bulbs, int):
+            return bulbs, stats
+        new_bulbs = bulbs & ~state.bulbs
+        while new_bulbs:
+            low = new_bulbs & -new_bulbs
+            row, col = (low.bit_length() - 1) // state.cols, (low.bit_length() - 1) % state.cols
+            state.set_cell_value(row, col, CellState.BULB)
+            state.domain_change(row, col, CellState.BULB)
+            new_bulbs ^= low
+
+    if not state.is_solved():
+        return 'failure', stats
+    return state.to_cells(), stats
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+    arg_parser.add_argument('-w', action='store', dest='workers', type=int, default=None)
+    arg_parser.add_argument('-d', action='store', dest='split_depth', type=int, default=6)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+    arg_parser.add_argument('-D', action='store_true', dest='deterministic')
+    arg_parser.add_argument('-C', action='store_true', dest='components')
+
+    arguments = arg_parser.parse_args(argv)
+
+    for i, puzzle in iter_puzzles(puzzle_path(arguments.file_name)):
+        starting_time = time.time()
+        if arguments.components:
+            solution, stats = solve_components_parallel(puzzle, arguments.heuristic, arguments.workers, arguments.seed)
+            ending_time = time.time()
+            print(solution if isinstance(solution, str) else '*** Done! ***')
+            print('{} independent parts, {} nodes in {} seconds.'.format(
+                stats['components'], stats['nodes'], ending_time - starting_time))
+            continue
+        solution, stats = solve_parallel(puzzle, arguments.heuristic, arguments.workers,
+                                         arguments.split_depth, arguments.seed, arguments.deterministic)
+        ending_time = time.time()
+
+        if isinstance(solution, list):
+            print('*** Done! ***\nThe solution is printed out below:')
+            print_puzzle(solution)
+        else:
+            print(solution)
+        print('{} subproblems, solution from subproblem {}, {} nodes in {} seconds.'.format(
+            stats['subproblems'], stats['winner'], stats['nodes'], ending_time - starting_time))
+
+
+if __name__ == '__main__':
+    main()
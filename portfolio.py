@@ -0,0 +1,162 @@
+import forward_checking as fc
+from forward_checking import *
+from multiprocessing import Process, Queue, Value
+
+import os
+
+
+def portfolio_worker(state, tasks, results, done, node_limit, restarts):
+    """
+    Worker process: take configurations off the shared queue until it yields None, and solve the state with each
+    A configuration is skipped (or given up) as soon as another one has settled the puzzle.
+    :param state: BitboardState - The pre-processed puzzle, with its trail enabled
+    :param tasks: Queue - of (int, Str, int) configurations: id, heuristic and seed, then None
+    :param results: Queue - of (config id, status, solution grid or None, nodes, seconds)
+    :param done: Value - set to 1 once the puzzle is settled
+    :param node_limit: int - node budget of each configuration
+    :param restarts: bool - search with solve_with_restarts instead of a single run
+    """
+
+    cancel = lambda: done.value == 1
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        config_id, heuristic, seed = task
+        if done.value == 1:
+            results.put((config_id, 'Cancelled.', None, 0, 0.0))
+            continue
+
+        # each configuration starts from what the puzzle gives, so that its nodes are its own
+        state.context.clear()
+        mark = state.mark()
+        unassigned = state.unassigned
+        budget = SearchBudget(node_limit, cancel=cancel)
+        starting_time = time.perf_counter()
+        if restarts:
+            result = fc.solve_with_restarts(state, heuristic, random.Random(seed), budget)
+        else:
+            result = fc.solve_by_components(state, heuristic, random.Random(seed), budget)
+        elapsed = time.perf_counter() - starting_time
+
+        if isinstance(result, BitboardState):
+            done.value = 1
+            results.put((config_id, 'solved', result.to_cells(), budget.nodes, elapsed))
+        else:
+            if result == 'failure':
+                done.value = 1      # the search is complete: no other configuration can find a solution
+            results.put((config_id, result, None, budget.nodes, elapsed))
+        state.undo_to(mark)
+        state.unassigned = unassigned
+
+
+def solve_portfolio(puzzle, heuristics=('H1', 'H2', 'H3'), seeds=(0, 1, 2), workers=None, node_limit=500000,
+                    restarts=False):
+    """
+    Race several configurations of the solver on a single puzzle, each heuristic with each seed, in separate
+    processes, and return the first answer: a solution, or the proof by one of them that there is none
+    The run time of one configuration varies a lot with its tie-breaks, so the race takes the luck of the best
+    one. The stats say which configuration won, to tune the defaults on a corpus.
+    :param puzzle: List[List[Cell]] - The puzzle
+    :param heuristics: List[Str] - heuristics to race, among "H1", "H2" and "H3"
+    :param seeds: List[int] - seeds of the heuristic tie-breaks, each raced with every heuristic
+    :param workers: int - number of worker processes, one per core if None (at most one per configuration)
+    :param node_limit: int - node budget of each configuration
+    :param restarts: bool - each configuration searches with restarts (see solve_with_restarts)
+    :return: (solved puzzle or error message, dict of stats)
+    """
+
+    configs = [(heuristic, seed) for heuristic in heuristics for seed in seeds]
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    stats = {'configs': len(configs), 'nodes': 0, 'winner': None, 'runs': []}
+
+    state = prepare_state(puzzle)
+    if not state.is_state_valid():
+        return "Failure: Puzzle not valid after pre_processing", stats
+
+    if not start_search(state):
+        return 'failure', stats
+
+    tasks = Queue()
+    results = Queue()
+    done = Value('i', 0)
+    for config_id, (heuristic, seed) in enumerate(configs):
+        tasks.put((config_id, heuristic, seed))
+    for _ in range(workers):
+        tasks.put(None)
+
+    processes = [Process(target=portfolio_worker, args=(state, tasks, results, done, node_limit, restarts))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    answer = None
+    outcome = 'failure'
+    for _ in range(len(configs)):
+        config_id, status, grid, nodes, elapsed = results.get()
+        heuristic, seed = configs[config_id]
+        stats['nodes'] += nodes
+        stats['runs'].append({'heuristic': heuristic, 'seed': seed, 'status': status, 'nodes': nodes,
+                              'seconds': elapsed})
+        if answer is None and (status == 'solved' or status == 'failure'):
+            answer = grid if status == 'solved' else status
+            stats['winner'] = {'heuristic': heuristic, 'seed': seed, 'nodes': nodes, 'seconds': elapsed}
+        elif status != 'Cancelled.':
+            outcome = status
+
+    for process in processes:
+        process.join()
+
+    if answer is None:
+        return outcome, stats
+    return answer, stats
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-h', action='store', dest='heuristics', type=str, default='H1,H2,H3')
+    arg_parser.add_argument('-s', action='store', dest='seeds', type=int, default=3)
+    arg_parser.add_argument('-w', action='store', dest='workers', type=int, default=None)
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-r', action='store', dest='restart_policy', type=str, default=None)
+    arg_parser.add_argument('-b', action='store', dest='restart_base', type=int, default=100)
+
+    arguments = arg_parser.parse_args(argv)
+    heuristics = arguments.heuristics.split(',')
+    seeds = range(arguments.seeds)
+    if arguments.restart_policy:
+        fc.restart_policy = arguments.restart_policy
+        fc.restart_base = arguments.restart_base
+
+    wins = {}
+    for i, puzzle in iter_puzzles(puzzle_path(arguments.file_name)):
+        starting_time = time.time()
+        solution, stats = solve_portfolio(puzzle, heuristics, seeds, arguments.workers, arguments.node_limit,
+                                          arguments.restart_policy is not None)
+        ending_time = time.time()
+
+        winner = stats['winner']
+        if winner is None:
+            print('Puzzle {}: {}'.format(i, solution))
+        else:
+            print('Puzzle {}: {} by {} seed {} in {} nodes'.format(
+                i, 'failure' if isinstance(solution, str) else 'solved', winner['heuristic'], winner['seed'],
+                winner['nodes']))
+            key = '{} seed {}'.format(winner['heuristic'], winner['seed'])
+            wins[key] = wins.get(key, 0) + 1
+        print('{} configurations, {} nodes in {} seconds.'.format(stats['configs'], stats['nodes'],
+                                                                   ending_time - starting_time))
+
+    print('Wins per configuration:')
+    for key, count in sorted(wins.items(), key=lambda item: -item[1]):
+        print('  {}: {}'.format(key, count))
+
+
+if __name__ == '__main__':
+    main()
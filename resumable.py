@@ -0,0 +1,83 @@
+import forward_checking as fc
+from forward_checking import *
+from corpus_index import read_puzzle_at
+
+
+def solve_resumable(puzzle, heuristic, checkpoint_path, checkpoint_every=100000, seed=0, budget=None, stats=None):
+    """
+    Solve one puzzle with forward_checking_iterative, saving the search to a checkpoint file as it goes
+    If the checkpoint file already exists, the search it holds is resumed instead of started over: it ends
+    the way the interrupted run would have. The file is removed once the search is over.
+    :param puzzle: List[List[Cell]] - The puzzle (not read when resuming)
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param checkpoint_path: Str - path of the checkpoint file
+    :param checkpoint_every: int - nodes between two checkpoints
+    :param seed: int - seed of the heuristic tie-breaks (the resumed search goes on with the saved one)
+    :param budget: SearchBudget - the limits of the search and its node count (the node count and limit of
+                   a resumed search are the saved ones)
+    :param stats: SearchStats - counters of this run (not of the run it resumes), None to leave it uninstrumented
+    :return: The solved BitboardState, or the error message
+    """
+
+    rng = random.Random(seed)
+    if os.path.exists(checkpoint_path):
+        print('Resuming from {}.'.format(checkpoint_path))
+        result = fc.resume_search(checkpoint_path, rng, checkpoint_every, budget, stats)
+    else:
+        state = prepare_state(puzzle)
+        if not state.is_state_valid():
+            return "Failure: Puzzle not valid after pre_processing"
+        if stats is not None:
+            state.enable_stats(stats)
+        if not start_search(state):
+            return 'failure'
+        result = forward_checking_iterative(state, heuristic, rng, None, checkpoint_path, checkpoint_every, budget)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return result
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-i', action='store', dest='puzzle_number', type=int, default=0)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+    arg_parser.add_argument('-c', action='store', dest='checkpoint', type=str, default='search.ckpt')
+    arg_parser.add_argument('-e', action='store', dest='checkpoint_every', type=int, default=100000)
+    arg_parser.add_argument('-j', action='store', dest='trace', type=str, default=None)
+    arg_parser.add_argument('-J', action='store', dest='sample_every', type=int, default=1000)
+
+    arguments = arg_parser.parse_args(argv)
+    budget = SearchBudget(arguments.node_limit, progress=SearchBudget.print_progress)
+    trace = open(arguments.trace, 'a') if arguments.trace else None
+    stats = SearchStats(trace, arguments.sample_every) if trace else None
+
+    puzzle = None
+    if not os.path.exists(arguments.checkpoint):
+        puzzle = read_puzzle_at(puzzle_path(arguments.file_name), arguments.puzzle_number)
+
+    starting_time = time.time()
+    solution = solve_resumable(puzzle, arguments.heuristic, arguments.checkpoint,
+                               arguments.checkpoint_every, arguments.seed, budget, stats)
+    ending_time = time.time()
+    if trace is not None:
+        stats.write('end', status=SolveResult.from_search(solution).status)
+        trace.close()
+
+    if isinstance(solution, BitboardState):
+        print('*** Done! ***\nThe solution is printed out below:')
+        print_puzzle(solution.to_cells())
+    else:
+        print(solution)
+    print('Visited {} nodes in {} seconds.'.format(budget.nodes, ending_time - starting_time))
+
+
+if __name__ == '__main__':
+    main()
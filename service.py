@@ -0,0 +1,89 @@
+from SolverService import *
+
+import socket
+
+
+async def serve(service, socket_path=None, port=None):
+    """
+    Run the service until cancelled
+    :param socket_path: Str - path of the Unix socket to listen on, used if port is None
+    :param port: int - TCP port to listen on, on 127.0.0.1 only
+    """
+
+    await service.start()
+    if port is not None:
+        server = await asyncio.start_server(service.handle, '127.0.0.1', port)
+    else:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(service.handle, socket_path)
+    print('Listening on {}, {} workers.'.format(socket_path if port is None else '127.0.0.1:{}'.format(port),
+                                                service.workers), flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def request_solutions(requests, socket_path=None, port=None):
+    """
+    Local client: send requests to a running service and wait for all the answers
+    :param requests: List[dict] - requests as described in SolverService
+    :param socket_path: Str - the service's Unix socket, used if port is None
+    :param port: int - the service's TCP port on 127.0.0.1
+    :return: List[dict] - the answers, in the order they came back
+    """
+
+    if port is not None:
+        connection = socket.create_connection(('127.0.0.1', port))
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(socket_path)
+    with connection:
+        connection.sendall(b''.join(json.dumps(request).encode('ascii') + b'\n' for request in requests))
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as answers:
+            return [json.loads(line) for line in answers]
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-u', action='store', dest='socket_path', type=str, default='lightup.sock')
+    arg_parser.add_argument('-P', action='store', dest='port', type=int, default=None)
+    arg_parser.add_argument('-w', action='store', dest='workers', type=int, default=None)
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-t', action='store', dest='seconds', type=float, default=10.0)
+    arg_parser.add_argument('-m', action='store', dest='cache_size', type=int, default=10000)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str, default=None)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+
+    arguments = arg_parser.parse_args(argv)
+
+    # With -p, send the puzzles of a file to a running service instead of starting one
+    if arguments.file_name is not None:
+        requests = []
+        for i, puzzle in iter_puzzles(puzzle_path(arguments.file_name)):
+            text = '{} {}\n'.format(len(puzzle), len(puzzle[0])) + ''.join(
+                ''.join(cell.get_cell_value() for cell in row) + '\n' for row in puzzle)
+            requests.append({'id': i, 'puzzle': text, 'heuristic': arguments.heuristic, 'seconds': arguments.seconds,
+                             'node_limit': arguments.node_limit})
+        for answer in request_solutions(requests, arguments.socket_path, arguments.port):
+            print(json.dumps(answer))
+        return
+
+    service = SolverService(arguments.workers, arguments.node_limit, arguments.seconds, arguments.cache_size)
+    try:
+        asyncio.run(serve(service, arguments.socket_path, arguments.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
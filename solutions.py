@@ -0,0 +1,79 @@
+import forward_checking as fc
+from forward_checking import *
+from corpus_index import read_puzzle_at
+
+
+def puzzle_solutions(puzzle, heuristic='H1', limit=2, node_limit=500000, seed=0):
+    """
+    Enumerate the solutions of one puzzle, up to limit, with the propagation and pruning of the solver
+    :param puzzle: List[List[Cell]] - The puzzle, as returned by read_file
+    :param heuristic: Str - "H1", "H2", or "H3"
+    :param limit: int - stop once this many solutions are found (2 is enough to tell whether it is unique)
+    :param node_limit: int - give up after this many nodes
+    :param seed: int - seed of the heuristic tie-breaks
+    :return: (List[int], Str, SearchBudget) - the bulbs of each solution found, None if these are all of them
+             (or limit of them) else the message of the budget that ran out, and the budget with its node count
+    """
+
+    budget = SearchBudget(node_limit)
+    state = BitboardState(None, index=SegmentIndex(puzzle))
+    preprocess_state(state)
+    if not state.is_state_valid() or not start_search(state):
+        return [], None, budget
+    solutions, spent = fc.find_solutions(state, heuristic, limit, random.Random(seed), budget)
+    return solutions, spent, budget
+
+
+def describe(count, limit, spent):
+    """
+    :return: Str - what the enumeration tells about the puzzle
+    """
+
+    if spent is not None:
+        return '{} ({} solution(s) found so far)'.format(spent, count)
+    if count == 0:
+        return 'no solution'
+    if count >= limit:
+        return 'at least {} solutions'.format(limit)
+    if count == 1:
+        return 'unique'
+    return '{} solutions'.format(count)
+
+
+def main(argv=None):
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    arg_parser = argparse.ArgumentParser(add_help=False)
+    arg_parser.add_argument('-p', action='store', dest='file_name', type=str)
+    arg_parser.add_argument('-i', action='store', dest='puzzle_number', type=int, default=None)
+    arg_parser.add_argument('-h', action='store', dest='heuristic', type=str, default='H1')
+    arg_parser.add_argument('-N', action='store', dest='limit', type=int, default=2)
+    arg_parser.add_argument('-n', action='store', dest='node_limit', type=int, default=500000)
+    arg_parser.add_argument('-s', action='store', dest='seed', type=int, default=0)
+    arg_parser.add_argument('-e', action='store_true', dest='show')
+
+    arguments = arg_parser.parse_args(argv)
+    path = puzzle_path(arguments.file_name)
+    if arguments.puzzle_number is None:
+        puzzles = iter_puzzles(path)
+    else:
+        puzzles = [(arguments.puzzle_number, read_puzzle_at(path, arguments.puzzle_number))]
+
+    for number, puzzle in puzzles:
+        rows, cols = len(puzzle), len(puzzle[0])
+        starting_time = time.perf_counter()
+        solutions, spent, budget = puzzle_solutions(puzzle, arguments.heuristic, arguments.limit,
+                                                    arguments.node_limit, arguments.seed)
+        elapsed = time.perf_counter() - starting_time
+        print('Puzzle {} ({}x{}): {} - {} nodes, {:.3f} seconds.'.format(
+            number, rows, cols, describe(len(solutions), arguments.limit, spent), budget.nodes, elapsed))
+        if arguments.show:
+            clues = SegmentIndex(puzzle).clues
+            for bulbs in solutions:
+                print(puzzle_text(rows, cols, clues, bulbs), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from binary_format import *
+
+import os
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def text_solutions(path):
+    """
+    The bulbs of each "# Solution" block of a text file, in order
+    """
+    solutions = []
+    with open(path) as file:
+        lines = iter(file)
+        for line in lines:
+            if line[:1].isdigit():
+                rows, cols = (int(size) for size in line.split())
+                for _ in range(rows):
+                    next(lines)
+            elif line.startswith('#') and 'solution' in line.lower():
+                grid = [next(lines).lstrip('#').strip() for _ in range(rows)]
+                solutions.append(sum(1 << (row * cols + col) for row in range(rows) for col in range(cols)
+                                     if grid[row][col] == CellState.BULB))
+    return solutions
+
+
+def test_text_to_binary_to_text_round_trip(tmp_path):
+    for name in ('lightupPuzzles.txt', '12W.txt'):
+        text_path = os.path.join(DATA, name)
+        binary_path, back_path, again_path = (str(tmp_path / (name + suffix)) for suffix in ('.bin', '.txt', '.bin2'))
+
+        count = text_to_binary(text_path, binary_path)
+        assert is_binary_file(binary_path) and not is_binary_file(text_path)
+        assert binary_to_text(binary_path, back_path) == count
+
+        expected = [[''.join(cell.get_cell_value() for cell in row) for row in puzzle]
+                    for _, puzzle in iter_puzzles(text_path)]
+        for path in (binary_path, back_path):
+            puzzles = iter_binary(path) if path == binary_path else iter_puzzles(path)
+            got = [[''.join(cell.get_cell_value() for cell in row)
+                    for row in (puzzle.to_cells() if path == binary_path else puzzle)] for _, puzzle in puzzles]
+            assert got == expected
+
+        solutions = [puzzle.solution_bulbs() for _, puzzle in iter_binary(binary_path)]
+        assert [bulbs for bulbs in solutions if bulbs is not None] == text_solutions(text_path)
+        assert text_solutions(back_path) == text_solutions(text_path)
+
+        # The text written back converts to the same bytes
+        text_to_binary(back_path, again_path)
+        with open(binary_path, 'rb') as first, open(again_path, 'rb') as second:
+            assert first.read() == second.read()
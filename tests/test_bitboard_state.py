@@ -0,0 +1,36 @@
+import forward_checking as fc
+from forward_checking import *
+
+
+def test_wall_driven_past_its_value_stays_overfull():
+    # Pre-processing puts a bulb on all four sides of the middle wall, two more than its clue
+    state = BitboardState(None, index=SegmentIndex.from_clues(3, 3, [2, -1, -1, -1, 1, -1, -1, -1, 2]))
+    preprocess_state(state)
+
+    assert list(state.wall_bulbs) == [2, 4, 2]
+    assert state.overfull_walls == 1
+    assert not state.is_state_valid()
+
+
+def test_overfull_count_goes_back_down_as_bulbs_are_removed():
+    state = BitboardState(None, index=SegmentIndex.from_clues(3, 3, [-1, -1, -1, -1, 1, -1, -1, -1, -1]))
+    state.enable_trail()
+    mark = state.mark()
+    overfull = []
+    for row, col in ((0, 1), (1, 0), (1, 2), (2, 1)):
+        state.set_cell_value(row, col, CellState.BULB)
+        overfull.append(state.overfull_walls)
+    assert overfull == [0, 1, 1, 1]
+
+    state.undo_to(mark)
+    assert state.overfull_walls == 0
+    assert state.wall_bulbs[0] == 0
+
+
+def test_solve_state_reports_an_overfull_puzzle_as_invalid():
+    BitboardState.check_counters = True
+    try:
+        state = BitboardState(None, index=SegmentIndex.from_clues(3, 3, [2, -1, -1, -1, 1, -1, -1, -1, 2]))
+        assert fc.solve_state(state, 'H1') == 'Failure: Puzzle not valid after pre_processing'
+    finally:
+        BitboardState.check_counters = False
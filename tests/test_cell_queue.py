@@ -0,0 +1,44 @@
+import forward_checking as fc
+from forward_checking import *
+
+import copy
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def test_queue_follows_decisions_and_undos_like_a_fresh_one():
+    rng = random.Random(14)
+    for key, puzzle in iter_puzzles(PUZZLES):
+        for heuristic in ('H1', 'H2', 'H3'):
+            state = prepare_state(puzzle)
+            assert start_search(state)
+            queue = CellQueue(state, heuristic)
+            marks = []
+            for _ in range(40):
+                candidates = [position for position in range(state.rows * state.cols)
+                              if (state.unassigned & state.domain) >> position & 1]
+                if marks and (not candidates or rng.random() < 0.3):
+                    state.undo_to(marks.pop())
+                elif candidates:
+                    position = rng.choice(candidates)
+                    marks.append(state.mark())
+                    if not apply_decision(state, position // state.cols, position % state.cols,
+                                          rng.choice((CellState.BULB, CellState.EMPTY))):
+                        state.undo_to(marks.pop())
+
+                best = queue.select(rng)
+                fresh = CellQueue(state, heuristic)
+                assert queue.scores == fresh.scores, (key, heuristic)
+                assert best == -1 if fresh.select(rng) == -1 else fresh.scores[best] == max(fresh.scores)
+
+
+def test_queue_and_scan_give_the_same_answer():
+    saved = fc.use_cell_queue
+    try:
+        for key, puzzle in iter_puzzles(PUZZLES):
+            for fc.use_cell_queue in (True, False):
+                result = solve_puzzle(copy.deepcopy(puzzle), 'H3', rng=random.Random(0), node_limit=50000)
+                assert result.is_solved() and is_solved(result.solution), key
+    finally:
+        fc.use_cell_queue = saved
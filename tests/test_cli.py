@@ -0,0 +1,27 @@
+import forward_checking as fc
+from binary_format import text_to_binary
+
+import json
+import os
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def run_json(capsys, path):
+    fc.main(['-p', path, '-h', 'H1', '-f', 'json'])
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_binary_file_gives_the_answers_of_its_text_file(capsys, tmp_path):
+    text_path = os.path.join(DATA, 'samples.txt')
+    binary_path = str(tmp_path / 'samples.lub')
+    text_to_binary(text_path, binary_path)
+
+    from_text = run_json(capsys, text_path)
+    from_binary = run_json(capsys, binary_path)
+
+    assert from_binary
+    assert [(record['puzzle'], record['rows'], record['cols'], record['status'], record.get('solution'))
+            for record in from_binary] == \
+           [(record['puzzle'], record['rows'], record['cols'], record['status'], record.get('solution'))
+            for record in from_text]
@@ -0,0 +1,51 @@
+import forward_checking as fc
+from generator import *
+
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def puzzles():
+    """
+    The puzzles of lightupPuzzles.txt and generated ones, each also with one wall asking for a bulb more
+    (mostly unsolvable)
+    """
+    grids = [(len(puzzle), len(puzzle[0]), puzzle_clues(puzzle)) for _, puzzle in iter_puzzles(PUZZLES)]
+    rng = random.Random(15)
+    for _ in range(20):
+        grids.append((10, 10, generate_puzzle(10, 10, wall_density=0.25, clue_density=0.1, rng=rng)[0]))
+
+    for rows, cols, clues in grids:
+        yield rows, cols, clues
+        wall = next((position for position, clue in enumerate(clues) if 0 <= clue < 4), None)
+        if wall is not None:
+            yield rows, cols, clues[:wall] + [clues[wall] + 1] + clues[wall + 1:]
+
+
+def cells(rows, cols, clues):
+    return [[Cell(row, col, str(clues[row * cols + col]) if clues[row * cols + col] >= 0 else CellState.EMPTY)
+             for col in range(cols)] for row in range(rows)]
+
+
+def test_components_on_and_off_give_the_same_answer():
+    split = 0
+    saved = fc.use_components
+    try:
+        for rows, cols, clues in puzzles():
+            state = BitboardState(None, index=SegmentIndex.from_clues(rows, cols, clues))
+            preprocess_state(state)
+            if state.is_state_valid() and start_search(state) and len(state.components()) > 1:
+                split += 1
+
+            results = []
+            for fc.use_components in (True, False):
+                result = solve_puzzle(cells(rows, cols, clues), 'H2', rng=random.Random(0), node_limit=50000)
+                if result.is_solved():
+                    assert is_solved(result.solution)
+                results.append(result.status)
+            assert results[0] == results[1] and results[0] in SolveResult.FINAL, (rows, cols, clues)
+    finally:
+        fc.use_components = saved
+
+    assert split >= 3
@@ -0,0 +1,52 @@
+from corpus_index import *
+
+import pytest
+import shutil
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def values(puzzle):
+    return [''.join(cell.get_cell_value() for cell in row) for row in puzzle]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = str(tmp_path / 'corpus.txt')
+    shutil.copy(PUZZLES, path)
+    return path
+
+
+def test_index_finds_every_puzzle_and_shards_cover_the_corpus(corpus):
+    expected = [(number, values(puzzle)) for number, puzzle in iter_puzzles(corpus)]
+
+    assert [(number, values(read_puzzle_at(corpus, number))) for number, _ in expected] == expected
+    assert os.path.exists(index_path(corpus))
+    assert [(number, values(puzzle)) for shard in range(3)
+            for number, puzzle in iter_shard(corpus, shard, 3)] == expected
+
+
+def edit_in_place(path, old, new):
+    # Same size and modification time: only the hashes of the index can tell
+    status = os.stat(path)
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert len(old) == len(new) and old in data
+    with open(path, 'wb') as file:
+        file.write(data.replace(old, new, 1))
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns))
+
+
+def test_stale_index_is_caught_by_the_puzzle_hashes(corpus):
+    entries = load_corpus_index(corpus)
+    assert values(read_puzzle_at(corpus, 0, entries))[0] == '1_11_2'
+    edit_in_place(corpus, b'1_11_2', b'_111_2')
+
+    with pytest.raises(ValueError):
+        read_puzzle_at(corpus, 0, entries)
+    with pytest.raises(ValueError):
+        list(iter_shard(corpus, 0, 1, entries))
+
+    # Loaded from the sidecar, the index is rebuilt instead
+    assert values(read_puzzle_at(corpus, 0))[0] == '_111_2'
+    assert load_corpus_index(corpus) != entries
@@ -0,0 +1,66 @@
+import forward_checking as fc
+from generator import *
+
+import itertools
+
+
+def brute_force(rows, cols, clues):
+    """
+    Every solution of a small puzzle, by trying each set of bulbs on its open cells
+    """
+    open_cells = [position for position in range(rows * cols) if clues[position] < 0]
+
+    def line_of_sight(position):
+        row, col = divmod(position, cols)
+        for row_step, col_step in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            r, c = row + row_step, col + col_step
+            while 0 <= r < rows and 0 <= c < cols and clues[r * cols + c] < 0:
+                yield r * cols + c
+                r, c = r + row_step, c + col_step
+
+    def neighbours(position):
+        row, col = divmod(position, cols)
+        return [r * cols + c for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                if 0 <= r < rows and 0 <= c < cols]
+
+    solutions = set()
+    for chosen in itertools.product((0, 1), repeat=len(open_cells)):
+        bulbs = {position for position, bulb in zip(open_cells, chosen) if bulb}
+        lit = set(bulbs)
+        for bulb in bulbs:
+            seen = set(line_of_sight(bulb))
+            if seen & bulbs:
+                break
+            lit |= seen
+        else:
+            if lit == set(open_cells) and all(
+                    sum(other in bulbs for other in neighbours(position)) == clues[position]
+                    for position in range(rows * cols) if clues[position] >= 0):
+                solutions.add(sum(1 << position for position in bulbs))
+    return solutions
+
+
+def test_count_solutions_of_known_puzzles():
+    # On an empty n x n grid each row and each column holds exactly one bulb: n! solutions
+    for size, count in ((2, 2), (3, 6), (4, 24)):
+        assert count_puzzle_solutions(size, size, [-1] * size * size, 100) == count
+    assert len(brute_force(3, 3, [-1] * 9)) == 6
+    assert count_puzzle_solutions(1, 3, [-1, 0, -1], 10) == 0
+
+
+def test_count_solutions_matches_brute_force():
+    rng = random.Random(21)
+    saved = fc.use_components
+    try:
+        for rows, cols in ((3, 3), (3, 4), (4, 4), (2, 6)):
+            for _ in range(15):
+                clues, _ = generate_puzzle(rows, cols, wall_density=0.3, rng=rng)
+                expected = brute_force(rows, cols, clues)
+                for fc.use_components in (True, False):
+                    found = []
+                    assert count_puzzle_solutions(rows, cols, clues, 1000, found=found) == len(expected)
+                    assert set(found) == expected
+                    # with a limit, the count stops there
+                    assert count_puzzle_solutions(rows, cols, clues, 1) == min(1, len(expected))
+    finally:
+        fc.use_components = saved
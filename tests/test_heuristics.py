@@ -0,0 +1,19 @@
+from forward_checking import *
+
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def test_cell_heuristics_pick_the_cells_select_next_cell_picks_from():
+    for key, puzzle in iter_puzzles(PUZZLES):
+        state = BitboardState(None, index=SegmentIndex.from_clues(len(puzzle), len(puzzle[0]), puzzle_clues(puzzle)))
+        candidates = [[position // state.cols, position % state.cols] for position in range(state.rows * state.cols)
+                      if (state.unassigned & state.domain) >> position & 1]
+        for heuristic, pick in (('H1', most_constrained_variable_heuristic),
+                                ('H2', most_constraining_variable_heuristic),
+                                ('H3', hybrid_heuristic)):
+            chosen = [row * state.cols + col for row, col in pick(state, candidates, state.index)]
+            ties = {select_next_cell(state, heuristic, random.Random(seed)) for seed in range(50)}
+            assert ties <= set(chosen), (key, heuristic)
+            assert len(set(chosen)) == len(chosen) and len(chosen) < len(candidates), (key, heuristic)
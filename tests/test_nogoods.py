@@ -0,0 +1,62 @@
+import forward_checking as fc
+from forward_checking import *
+from NogoodStore import NogoodStore
+
+import copy
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def test_store_skips_repeats_and_long_nogoods_and_keeps_the_useful_half():
+    store = NogoodStore(limit=4, max_size=2)
+    for nogood in (0b11, 0b11, 0b111, 0b101, 0b110, 0b1001):
+        store.add(nogood)
+    assert store.nogoods == [0b11, 0b101, 0b110, 0b1001] and store.learned == 4
+
+    store.hits = [0, 3, 0, 1]
+    store.add(0b1100)
+    assert store.nogoods == [0b101, 0b1001, 0b1100] and store.evicted == 2
+    assert store.hits == [1, 0, 0]
+
+
+def holds_in_a_solution(puzzle, nogood):
+    """
+    True if some solution of the puzzle has all the bulbs of nogood (found by counting with them placed)
+    """
+    state = prepare_state(puzzle)
+    assert start_search(state)
+    for position in range(state.rows * state.cols):
+        if (nogood >> position) & 1 and not apply_decision(state, position // state.cols, position % state.cols,
+                                                             CellState.BULB):
+            return False
+    count = fc.count_solutions(state, 'H2', 1, random.Random(0), SearchBudget(200000))
+    assert isinstance(count, int)
+    return count > 0
+
+
+def test_learned_nogoods_hold_in_no_solution():
+    puzzles = dict(iter_puzzles(PUZZLES))
+    learned = 0
+    for key in (6, 9, 11):
+        context = SearchContext()
+        result = solve_puzzle(copy.deepcopy(puzzles[key]), 'H2', rng=random.Random(0), context=context)
+        assert result.is_solved()
+        learned += len(context.nogoods.nogoods)
+        for nogood in context.nogoods.nogoods:
+            assert not holds_in_a_solution(puzzles[key], nogood), (key, bin(nogood))
+    assert learned > 50
+
+
+def test_backjumping_on_and_off_give_the_same_answer():
+    saved = fc.use_backjumping
+    try:
+        for key, puzzle in iter_puzzles(PUZZLES):
+            statuses = []
+            for fc.use_backjumping in (True, False):
+                result = solve_puzzle(copy.deepcopy(puzzle), 'H2', rng=random.Random(0), node_limit=50000)
+                assert not result.is_solved() or is_solved(result.solution)
+                statuses.append(result.status)
+            assert statuses == [SolveResult.SOLVED] * 2, key
+    finally:
+        fc.use_backjumping = saved
@@ -0,0 +1,68 @@
+import forward_checking as fc
+from forward_checking import *
+
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+class Crash(Exception):
+    pass
+
+
+def started_state():
+    puzzle = dict(iter_puzzles(PUZZLES))[10]
+    empty_cells, wall_cells, index = prepare_puzzle(puzzle)
+    state = BitboardState(puzzle, empty_cells, index)
+    assert start_search(state)
+    return state
+
+
+def crash_after(checkpoint, nodes):
+    """
+    Run the search with checkpoints every 100 nodes, and stop it dead (not through its budget) after nodes
+    """
+
+    def crash():
+        if budget.nodes >= nodes:
+            raise Crash()
+        return False
+
+    budget = SearchBudget(20000, cancel=crash)
+    try:
+        fc.forward_checking_iterative(started_state(), 'H2', random.Random(10), None, checkpoint, 100, budget)
+    except Crash:
+        pass
+
+
+def test_resumed_search_ends_like_an_uninterrupted_one(tmp_path):
+    budget = SearchBudget(20000)
+    uninterrupted = fc.forward_checking_iterative(started_state(), 'H2', random.Random(10), budget=budget)
+    assert isinstance(uninterrupted, BitboardState) and budget.nodes > 400
+
+    checkpoint = str(tmp_path / 'search.ckpt')
+
+    crash_after(checkpoint, 300)
+
+    resumed_budget = SearchBudget()
+    resumed = fc.resume_search(checkpoint, random.Random(99), 100, resumed_budget)
+
+    assert isinstance(resumed, BitboardState)
+    assert resumed.bulbs == uninterrupted.bulbs
+    assert resumed_budget.nodes == budget.nodes
+
+
+def test_resume_leaves_the_module_settings_alone(tmp_path):
+    checkpoint = str(tmp_path / 'search.ckpt')
+
+    crash_after(checkpoint, 300)
+
+    saved = fc.use_propagation, fc.probe_limit, fc.use_cell_queue
+    fc.use_propagation, fc.probe_limit, fc.use_cell_queue = False, 3, False
+    try:
+        resumed = fc.resume_search(checkpoint, random.Random(99), 100, SearchBudget())
+        assert (fc.use_propagation, fc.probe_limit, fc.use_cell_queue) == (False, 3, False)
+        # the search went on with the settings it was saved with
+        assert (resumed.context.use_propagation, resumed.context.probe_limit, resumed.context.use_cell_queue) == saved
+    finally:
+        fc.use_propagation, fc.probe_limit, fc.use_cell_queue = saved
@@ -0,0 +1,52 @@
+from forward_checking import *
+
+import copy
+import os
+import threading
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def solve_all(puzzles):
+    return [solve_puzzle(copy.deepcopy(puzzle), 'H2', rng=random.Random(key), node_limit=20000)
+            for key, puzzle in puzzles]
+
+
+def test_threads_solving_different_puzzles_do_not_share_their_search():
+    puzzles = list(iter_puzzles(PUZZLES))
+    halves = (puzzles[0::2], puzzles[1::2])
+    alone = [solve_all(half) for half in halves]
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     # switch threads as often as possible, so that the searches interleave
+    try:
+        side_by_side = [None, None]
+        errors = []
+
+        def run(i):
+            try:
+                side_by_side[i] = solve_all(halves[i])
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    for expected, got in zip(alone, side_by_side):
+        assert [(result.status, result.nodes) for result in got] == \
+               [(result.status, result.nodes) for result in expected]
+
+
+def test_solve_puzzle_fills_in_the_context_it_is_given():
+    puzzle = dict(iter_puzzles(PUZZLES))[12]
+    context = SearchContext()
+    result = solve_puzzle(puzzle, 'H2', rng=random.Random(0), context=context)
+
+    assert result.status == SolveResult.SOLVED
+    assert context.nogoods.learned > 0
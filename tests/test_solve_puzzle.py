@@ -0,0 +1,30 @@
+from forward_checking import *
+
+
+def cells(lines):
+    return [[Cell(row, col, value) for col, value in enumerate(line)] for row, line in enumerate(lines)]
+
+
+def test_puzzle_with_more_rows_than_columns_is_solved():
+    # the numbered wall is in the last column, where a check sized by the row count once read past the row
+    result = solve_puzzle(cells(['_1', '__', '__']), 'H1')
+
+    assert result.status == SolveResult.SOLVED
+    assert result.solution[0][0].is_bulb() or result.solution[1][1].is_bulb()
+
+
+def test_cell_engine_solves_puzzles_that_are_not_square():
+    for lines in (['_1', '__', '__'], ['___1', '____'], ['_1__', '____', '_0__'], ['_1____', '______']):
+        result = solve_puzzle(cells(lines), 'H1', engine='cell')
+
+        assert result.status == SolveResult.SOLVED, lines
+        assert [len(row) for row in result.solution] == [len(line) for line in lines]
+
+
+def test_puzzle_grid_is_only_read():
+    puzzle = cells(['_1_', '___', '___'])
+    before = grid_text(puzzle)
+    result = solve_puzzle(puzzle, 'H2')
+
+    assert result.status == SolveResult.SOLVED
+    assert grid_text(puzzle) == before
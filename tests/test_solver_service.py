@@ -0,0 +1,94 @@
+from SolverService import *
+
+PUZZLE = '3 3\n_1_\n___\n___\n'
+
+
+async def exchange(service, lines):
+    reader = asyncio.StreamReader()
+    reader.feed_data(b''.join(line + b'\n' for line in lines))
+    reader.feed_eof()
+    written = []
+
+    class Writer:
+        def write(self, data):
+            written.append(data)
+
+        async def drain(self):
+            pass
+
+        def close(self):
+            pass
+
+    await service.handle(reader, Writer())
+    return [json.loads(line) for line in b''.join(written).splitlines()]
+
+
+async def run_requests(*batches):
+    service = SolverService(workers=1)
+    await service.start()
+    try:
+        answers = [await exchange(service, lines) for lines in batches]
+        return answers, service.solving
+    finally:
+        service.close()
+
+
+def test_bad_seconds_is_answered_and_does_not_block_the_puzzle():
+    bad = json.dumps({'id': 1, 'puzzle': PUZZLE, 'seconds': '5'}).encode('ascii')
+    good = json.dumps({'id': 2, 'puzzle': PUZZLE}).encode('ascii')
+    (first, second), solving = asyncio.run(run_requests([bad], [good]))
+
+    assert first == [{'status': SolveResult.ABORTED, 'error': 'bad request: seconds must be a number >= 0',
+                      'id': 1}]
+    assert second[0]['status'] == SolveResult.SOLVED and second[0]['id'] == 2
+    assert solving == {}
+
+
+def test_every_line_gets_an_answer():
+    lines = [b'not json', b'[1, 2]', json.dumps({'puzzle': PUZZLE, 'node_limit': 0}).encode('ascii'),
+             json.dumps({'puzzle': 7}).encode('ascii')]
+    (answers,), solving = asyncio.run(run_requests(lines))
+
+    assert len(answers) == len(lines)
+    assert all(answer['status'] == SolveResult.ABORTED for answer in answers)
+    assert solving == {}
+
+
+def hard_puzzle():
+    # 24x24, 901 nodes with H2
+    puzzle = dict(iter_puzzles(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                                            'lightupPuzzles.txt')))[10]
+    return '{} {}\n'.format(len(puzzle), len(puzzle[0])) + ''.join(
+        ''.join(cell.get_cell_value() for cell in row) + '\n' for row in puzzle)
+
+
+def test_repeat_asking_for_more_nodes_is_solved_on_its_own():
+    puzzle = hard_puzzle()
+    lines = [json.dumps({'id': 1, 'puzzle': puzzle, 'heuristic': 'H2', 'node_limit': 10}).encode('ascii'),
+             json.dumps({'id': 2, 'puzzle': puzzle, 'heuristic': 'H2'}).encode('ascii'),
+             json.dumps({'id': 3, 'puzzle': puzzle, 'heuristic': 'H2', 'node_limit': 5}).encode('ascii')]
+    (answers,), solving = asyncio.run(run_requests(lines))
+
+    status = {answer['id']: answer['status'] for answer in answers}
+    assert status == {1: SolveResult.NODE_LIMIT, 2: SolveResult.SOLVED, 3: SolveResult.NODE_LIMIT}
+    assert solving == {}
+
+
+def test_request_going_away_does_not_fail_the_ones_that_joined_it():
+    async def run():
+        service = SolverService(workers=1)
+        await service.start()
+        try:
+            request = {'puzzle': hard_puzzle(), 'heuristic': 'H2'}
+            owner = asyncio.create_task(service.solve(request))
+            await asyncio.sleep(0)
+            joiner = asyncio.create_task(service.solve(dict(request)))
+            await asyncio.sleep(0)
+            owner.cancel()
+            return await joiner, service.counts['joined']
+        finally:
+            service.close()
+
+    answer, joined = asyncio.run(run())
+    assert answer['status'] == SolveResult.SOLVED
+    assert joined == 1
@@ -0,0 +1,39 @@
+import forward_checking as fc
+from forward_checking import *
+
+import copy
+import os
+
+PUZZLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lightupPuzzles.txt')
+
+
+def test_table_keeps_the_last_hash_of_each_slot():
+    table = TranspositionTable(5)
+    assert table.memory_bytes() == 8 * 8
+
+    table.store(0x13)
+    assert table.contains(0x13) and not table.contains(0x23) and not table.contains(0)
+    table.store(0x23)       # same slot: replaces 0x13
+    assert table.contains(0x23) and not table.contains(0x13)
+    assert (table.stores, table.overwrites, table.hits, table.lookups) == (2, 1, 2, 5)
+
+    table.clear()
+    assert not table.contains(0x23) and table.stores == 0
+
+
+def test_restarts_skip_the_states_earlier_runs_failed_on():
+    # Exact repeats only come from restarts, and only without the nogoods of backjumping: those make the
+    # later runs prune states further than the ones stored
+    saved = fc.use_transposition, fc.use_backjumping, fc.use_components
+    fc.use_backjumping, fc.use_components = False, False
+    try:
+        puzzle = dict(iter_puzzles(PUZZLES))[11]
+        for fc.use_transposition in (False, True):
+            context = SearchContext()
+            result = solve_puzzle(copy.deepcopy(puzzle), 'H2', 'restarts', 50000, rng=random.Random(0),
+                                  context=context)
+            assert result.is_solved() and is_solved(result.solution)
+    finally:
+        fc.use_transposition, fc.use_backjumping, fc.use_components = saved
+
+    assert context.transposition_table.hits > 0
@@ -1,28 +1,101 @@
 import os
+import sys
+import mmap
 from CellState import *
 from Cell import *
 
 
 def read_file(filename):
-    file = open(os.getcwd() + '/data/' + filename)
+    """
+    Read every puzzle of a file in data/
+    :param filename: Str - name of the file in data/
+    :return: dict - {puzzle number: List[List[Cell]]}
+    """
     puzzle_dict = {}
-    count = 0
-    for line in file:
-        if line[0] != "#":
-            line = line.split()
-            rows, cols = int(line[0].strip()), int(line[1].strip())
-            puzzle_dict[count] = [['' for x in range(cols)] for y in range(rows)]
-
-            for row in range(rows):
-                line = file.readline()
-                for col in range(cols):
-                    cell = Cell(row, col, line[col])
-                    puzzle_dict[count][row][col] = cell
-            count += 1
+    for count, puzzle in iter_puzzles(os.getcwd() + '/data/' + filename):
+        puzzle_dict[count] = puzzle
 
     return puzzle_dict
 
 
+def puzzle_path(filename):
+    """
+    Return the given path if it exists, else the file of that name in data/ (where read_file looks)
+    :param filename: Str - a path, a name in data/, or "-" for stdin
+    :return: Str
+    """
+    if filename == '-' or os.path.exists(filename):
+        return filename
+    return os.getcwd() + '/data/' + filename
+
+
+def iter_puzzles(source, use_mmap=False):
+    """
+    Yield the puzzles of a file one at a time, without loading the whole file
+    Lines starting with "#" (puzzle markers, "# Solution" blocks) are skipped on their first byte.
+    :param source: Str - path of the file, or "-" for stdin; or an open binary file
+    :param use_mmap: bool - memory-map the file instead of reading it through a buffer
+    :return: generator of (int, List[List[Cell]]) - the puzzle number and the puzzle
+    """
+    if not isinstance(source, str):
+        yield from parse_puzzle_lines(iter(source.readline, b''))
+    elif source == '-':
+        yield from parse_puzzle_lines(iter(sys.stdin.buffer.readline, b''))
+    elif use_mmap:
+        with open(source, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from parse_puzzle_lines(iter(mapped.readline, b''))
+    else:
+        with open(source, 'rb', buffering=1 << 20) as file:
+            yield from parse_puzzle_lines(file)
+
+
+def parse_puzzle_lines(lines, count=0):
+    """
+    Turn an iterator over the lines of a puzzle file (as bytes) into puzzles, one at a time
+    :param lines: iterator of bytes
+    :param count: int - number of the first puzzle
+    :return: generator of (int, List[List[Cell]])
+    """
+    for line in lines:
+        if line[:1] == b'#' or not line.strip():
+            continue
+        header = line.split()
+        rows, cols = int(header[0]), int(header[1])
+        puzzle = [['' for x in range(cols)] for y in range(rows)]
+
+        for row in range(rows):
+            line = next(lines).decode('ascii')
+            for col in range(cols):
+                puzzle[row][col] = Cell(row, col, line[col])
+
+        yield count, puzzle
+        count += 1
+
+
+def puzzle_text(rows, cols, clues, bulbs=None):
+    """
+    Write a puzzle in the format read_file reads, with its solution as a "# Solution" block if given
+    :param rows: int
+    :param cols: int
+    :param clues: List[int] - for each flat index, the wall's value, or -1 for an open cell
+    :param bulbs: int - the bulbs of its solution as a bitboard, or None
+    :return: Str
+    """
+    grid = [''.join(str(clues[row * cols + col]) if clues[row * cols + col] >= 0 else CellState.EMPTY
+                    for col in range(cols)) for row in range(rows)]
+    text = '# Start of puzzle\n{} {}\n'.format(rows, cols) + ''.join(line + '\n' for line in grid)
+    text += '# End of puzzle\n'
+    if bulbs is not None:
+        text += '#  Solution\n'
+        for row in range(rows):
+            text += '#   {}\n'.format(''.join(
+                CellState.BULB if (bulbs >> (row * cols + col)) & 1 else grid[row][col] for col in range(cols)))
+    return text + '\n'
+
+
 # Modified
 def print_puzzle(puzzle):
     """
@@ -30,22 +103,35 @@ def print_puzzle(puzzle):
     :param puzzle: List[List[Cell]]
     :return: N/A
     """
-    for row in range(len(puzzle)):
-        for col in range(len(puzzle[0])):
-            if col == len(puzzle[0]) - 1:
-                print(puzzle[row][col].get_cell_value())
-            else:
-                print(puzzle[row][col].get_cell_value(), end='')
+    sys.stdout.write(grid_text(puzzle))
+
+
+def grid_text(puzzle):
+    """
+    :param puzzle: List[List[Cell]]
+    :return: Str - the grid, one line per row
+    """
+    return ''.join(''.join([cell.get_cell_value() for cell in row]) + '\n' for row in puzzle)
 
 
 # Modified
-def light_up_puzzle(curr_state):
+def light_up_puzzle(curr_state, index=None):
     """
     Given the current state of the puzzle, with newly placed bulbs
     light up all cells in the same row and col that is not obstructed by wall
     :param curr_state: List[List[Cell]] - the current state of the puzzle
+    :param index: SegmentIndex - if given, light every segment that holds a bulb instead of walking rays
     :return: NA
     """
+    if index is not None:
+        cols = index.cols
+        for cells in index.segment_cells:
+            if any(curr_state[position // cols][position % cols].is_bulb() for position in cells):
+                for position in cells:
+                    if curr_state[position // cols][position % cols].is_empty():
+                        curr_state[position // cols][position % cols].set_cell_value(CellState.LIGHT)
+        return
+
     # Iterate through each cell in the current state
     for row in range(len(curr_state)):
         for col in range(len(curr_state[row])):
@@ -80,15 +166,19 @@ def unlit_puzzle(curr_state):
 
 
 # Modified
-def num_cells_lighten(curr_state, row, col):
+def num_cells_lighten(curr_state, row, col, index=None):
     """
     Given the position [row,col] of a bulb, count the number of cells that that bulb can light up
     Return number of cells the bulb at [row,col] can light up
     :param curr_state: the current state of the puzzle
     :param row: row number of given cell
     :param col: col number of given cell
+    :param index: SegmentIndex - if given, read the precomputed count
     :return: int
     """
+    if index is not None:
+        return index.visible_count[row * index.cols + col]
+
     count = 0
 
     # Iterate on the 4 directions of this cell
@@ -116,7 +206,7 @@ def count_adjacent_bulbs(puzzle, row, col):
 
     count = 0
     rows = len(puzzle)
-    cols = len(puzzle)
+    cols = len(puzzle[0])
 
     if row > 0 and puzzle[row - 1][col].is_bulb():  # down
         count += 1
@@ -131,15 +221,19 @@ def count_adjacent_bulbs(puzzle, row, col):
 
 
 # Modified
-def count_adjacent_walls(puzzle, row, col):
+def count_adjacent_walls(puzzle, row, col, index=None):
     """
     Count how many walls surround the given cell at [row, col]
     and return this number
     :param puzzle: List[List[Cell]] - Current state of the puzzle
     :param row: row number of the given cell
     :param col: col number of the given cell
+    :param index: SegmentIndex - if given, read the precomputed count
     :return: int
     """
+    if index is not None:
+        return index.adjacent_walls[row * index.cols + col]
+
     num_walls = 0
     rows = len(puzzle)
     cols = len(puzzle[0])
@@ -157,7 +251,7 @@ def count_adjacent_walls(puzzle, row, col):
 
 
 # Modified
-def edge_corner_constraints(puzzle, row, col):
+def edge_corner_constraints(puzzle, row, col, index=None):
     """
     Check if the given cell at [row, col] is in edge/corner
         - not an edge/corner = 0 (no constraint)
@@ -166,8 +260,12 @@ def edge_corner_constraints(puzzle, row, col):
     :param puzzle: List[List[Cell]] - Current state of the puzzle
     :param row: row number of the given cell
     :param col: col number of the given cell
+    :param index: SegmentIndex - if given, read the precomputed score
     :return: int
     """
+    if index is not None:
+        return index.edge_constraints[row * index.cols + col]
+
     constraints = 0
     rows = len(puzzle)
     cols = len(puzzle[0])
@@ -182,15 +280,16 @@ def edge_corner_constraints(puzzle, row, col):
 
 
 # Modified
-def is_map_lit_entirely(curr_state):
+def is_map_lit_entirely(curr_state, index=None):
     """
     Return True if map is lit up entirely, False otherwise
     :param curr_state: List[List[str]] - the current state of the puzzle
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
     :return: bool
     """
 
     is_lit_up = True
-    light_up_puzzle(curr_state)
+    light_up_puzzle(curr_state, index)
 
     # Iterate through all cells to look for any empty cell that is NOT lit up
     # if we see such cell, solution is not complete
@@ -217,12 +316,13 @@ def is_in_bounds(curr_state, row, col):
 
 
 # Modified
-def is_valid_bulb(curr_state, row, col):
+def is_valid_bulb(curr_state, row, col, index=None):
     """
     Given a cell, check to see if this cell can "see" another bulb directly
     :param curr_state: List[List[Cell]] - the current state of the puzzle
     :param row: int - the row number of the cell
     :param col: int - the col number of the cell
+    :param index: SegmentIndex - if given, only look through the cell's row and column segments
     :return: bool
     """
 
@@ -232,6 +332,15 @@ def is_valid_bulb(curr_state, row, col):
     if not (is_in_bounds(curr_state, row, col) and curr_state[row][col].domain_contain(CellState.BULB)):
         return False
 
+    if index is not None:
+        cols = index.cols
+        position = row * cols + col
+        for segment_id in (index.row_segment[position], index.col_segment[position]):
+            for other in index.segment_cells[segment_id]:
+                if other != position and curr_state[other // cols][other % cols].is_bulb():
+                    return False
+        return True
+
     # Now check if this bulb "see" another bulb
     for x_direct, y_direct in directions:
         row_temp, col_temp = row + x_direct, col + y_direct
@@ -244,15 +353,16 @@ def is_valid_bulb(curr_state, row, col):
 
 
 # Modified
-def is_solved(curr_state):
+def is_solved(curr_state, index=None):
     """
     Check if the current state of the puzzle is a solved state (all requirements are satisfied)
     Return True if solved, False otherwise
     :param curr_state: List[List[Cell]] - the current state of the puzzle
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
     :return: bool
     """
     rows = len(curr_state)
-    cols = len(curr_state)
+    cols = len(curr_state[0])
 
     # Check for any violation of rules
     for row in range(rows):
@@ -264,21 +374,22 @@ def is_solved(curr_state):
                     return False
 
             # If the cell is a bulb, and it's not a valid placement
-            if curr_state[row][col].is_bulb() and not is_valid_bulb(curr_state, row, col):
+            if curr_state[row][col].is_bulb() and not is_valid_bulb(curr_state, row, col, index):
                 return False
 
     # Check if the entire puzzle is lit up
-    is_all_light_up = is_map_lit_entirely(curr_state)
+    is_all_light_up = is_map_lit_entirely(curr_state, index)
 
     return is_all_light_up
 
 
 # Modified
-def is_state_valid(curr_state):
+def is_state_valid(curr_state, index=None):
     """
     Check if for each wall cell, the number of bulbs placed around it is <= the value of the wall
     Check if each bulb we have placed is valid (no 2 bulbs should directly "see" each other)
     :param curr_state: The current state of the puzzle
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
     :return: bool
     """
     rows = len(curr_state)
@@ -295,7 +406,7 @@ def is_state_valid(curr_state):
                     return False
 
             # If a bulb we place "see" another bulb (invalid placement), return False
-            elif curr_state[row][col].is_bulb() and not is_valid_bulb(curr_state, row, col):
+            elif curr_state[row][col].is_bulb() and not is_valid_bulb(curr_state, row, col, index):
                 #print("2 bulbs see each other")
                 return False
 
@@ -336,7 +447,7 @@ def get_wall_cells(puzzle):
     return wall_cells
 
 
-def place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value):
+def place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value, index=None):
     """
     Special walls are walls which we know exactly how we should place bulbs around it
     (i.e. a wall of value 4 should have 4 bulbs around it, a wall of value 3 and is on an edge should have 3 bulbs around it)
@@ -345,6 +456,7 @@ def place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value):
     :param col: int - col index of the cell
     :param empty_cells: List[List[int]] - positions of empty cells
     :param wall_value: List[List[int]] - positions of wall cells
+    :param index: SegmentIndex - line-of-sight index of the puzzle, optional
     :return:
     """
 
@@ -353,9 +465,9 @@ def place_bulbs_around_special_wall(puzzle, row, col, empty_cells, wall_value):
 
     for x_direct, y_direct in directions:
         x_temp, y_temp = row + x_direct, col + y_direct
-        if is_valid_bulb(puzzle, x_temp, y_temp):
+        if is_valid_bulb(puzzle, x_temp, y_temp, index):
             puzzle[x_temp][y_temp].set_cell_value(CellState.BULB)
-            domain_change(puzzle, x_temp, y_temp, CellState.BULB)
+            domain_change(puzzle, x_temp, y_temp, CellState.BULB, index)
             count_bulb_placed += 1
 
             # Cells that we already placed bulbs on should no longer be in list of empty cell
@@ -387,7 +499,7 @@ def available_spots_match_wall_value(puzzle, row, col, wall_value):
     return count == wall_value
 
 
-def domain_change(puzzle, row, col, value):
+def domain_change(puzzle, row, col, value, index=None):
     """
     # With the row-col position of a chosen cell and the new value of that cell, if the new value is Bulb
     # then modifying all the Empty cells that the chosen cell could "see" by excluding Bulb out of their domain
@@ -396,6 +508,7 @@ def domain_change(puzzle, row, col, value):
     :param row: int - row index of the cell that got assigned variable
     :param col: int - col index of the cell that got assigned variable
     :param value: the value of the variable (either Bulb or Empty)
+    :param index: SegmentIndex - if given, walk the cell's row and column segments instead of the 4 rays
     :return: NA
     """
 
@@ -405,7 +518,15 @@ def domain_change(puzzle, row, col, value):
     print_domain(domain)
     '''
 
-    if value == CellState.BULB:
+    if value == CellState.BULB and index is not None:
+        cols = index.cols
+        position = row * cols + col
+        for segment_id in (index.row_segment[position], index.col_segment[position]):
+            for other in index.segment_cells[segment_id]:
+                if other != position:
+                    puzzle[other // cols][other % cols].remove_bulb_from_domain()
+
+    elif value == CellState.BULB:
 
         travel_dist = 1
 